@@ -0,0 +1,47 @@
+# benchmarks/bench_cascade.py
+# Times cascade deletes of clients (about ten flights each) on stores of
+# growing size, to show the cost follows the flights removed rather than
+# the length of the Flight list.
+# Run: python benchmarks/bench_cascade.py [deletes]
+
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from bench_memory import make_records
+from records import RecordStore, delete_record
+
+YEAR_START = datetime(2025, 1, 1)
+
+
+def bench_cascade(deletes):
+    """
+    Print the mean time of a client cascade delete for a few store sizes
+    :param deletes: the number of clients deleted per store
+    """
+    for flight_count in (10_000, 100_000, 1_000_000):
+        records = make_records(flight_count)
+        # make_records gives every flight one of 12 dates; spread them over
+        # the year as real departure times are
+        step = timedelta(days=365) / flight_count
+        for i, flight in enumerate(records["Flight"]):
+            flight["Date"] = (YEAR_START + i * step).isoformat(timespec="seconds")
+        store = RecordStore(records, compact=True)
+        client_ids = [client["ID"] for client in store["Client"]]
+        step = max(len(client_ids) // deletes, 1)
+        doomed = client_ids[::step][:deletes]
+        removed = sum(len(store.flights_for_client(client_id)) for client_id in doomed)
+        # The first removal numbers the Flight list once
+        delete_record(store, "Client", client_id=client_ids[-1])
+        start = time.perf_counter()
+        for client_id in doomed:
+            delete_record(store, "Client", client_id=client_id)
+        elapsed = time.perf_counter() - start
+        print(f"{flight_count:9} flights  {len(doomed)} cascades of {removed / len(doomed):4.1f} flights "
+              f"{elapsed / len(doomed) * 1000:7.3f} ms each")
+
+
+if __name__ == "__main__":
+    bench_cascade(int(sys.argv[1]) if len(sys.argv) > 1 else 100)
@@ -0,0 +1,55 @@
+# benchmarks/bench_create.py
+# Times sequential create_record calls against an indexed RecordStore.
+# Run: python benchmarks/bench_create.py [count] [flight_count]
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from records import RecordStore, create_record
+
+
+def bench_create(count):
+    """
+    Create count clients one at a time and return the elapsed seconds
+    :param count: the number of clients to create
+    :return: the elapsed wall clock time
+    """
+    store = RecordStore({"Client": [], "Airline": [], "Flight": []})
+    start = time.perf_counter()
+    for i in range(count):
+        create_record(store, {"Name": f"Client {i}", "City": "London"}, "Client")
+    elapsed = time.perf_counter() - start
+    assert store["Client"][-1]["ID"] == count
+    return elapsed
+
+
+def bench_create_flights(count, parents=10_000):
+    """
+    Create count flights one at a time between existing clients and
+    airlines, with dates out of order, and return the elapsed seconds
+    :param count: the number of flights to create
+    :param parents: the number of clients and of airlines
+    :return: the elapsed wall clock time
+    """
+    store = RecordStore({"Client": [{"ID": i} for i in range(1, parents + 1)],
+                         "Airline": [{"ID": i} for i in range(1, parents + 1)], "Flight": []})
+    start = time.perf_counter()
+    for i in range(count):
+        flight = {"Client_ID": i % parents + 1, "Airline_ID": str(i % parents + 1),
+                  "Date": f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}T09:00:00", "Start City": "London", "End City": "Paris"}
+        create_record(store, flight, "Flight")
+    # The first query merges the flights into the date index
+    assert store.count_flights("2025-01-01", "2026-01-01") == count
+    elapsed = time.perf_counter() - start
+    return elapsed
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    elapsed = bench_create(count)
+    print(f"{count} create_record calls: {elapsed:.2f}s ({count / elapsed:,.0f} records/s)")
+    flight_count = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+    elapsed = bench_create_flights(flight_count)
+    print(f"{flight_count} Flight create_record calls: {elapsed:.2f}s ({flight_count / elapsed:,.0f} records/s)")
@@ -0,0 +1,45 @@
+# benchmarks/bench_export.py
+# Times export_records to each format, then runs it again under tracemalloc
+# to show the memory the export itself allocates.
+# Run: python benchmarks/bench_export.py [flight_count]
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from bench_memory import make_records
+from export import export_records
+from records import RecordStore
+
+
+def bench_export(flight_count):
+    """
+    Print the time and peak allocations of a few exports of flight_count flights
+    :param flight_count: the number of flights
+    """
+    store = RecordStore(make_records(flight_count), compact=True)
+    exports = [
+        ("flights.csv", ["Flight"], {}),
+        ("flights.jsonl", ["Flight"], {"date_range": ("2025-03-01", "2025-04-01"), "city": "Madrid"}),
+        ("clients.jsonl", ["Client"], {"id_range": (1000, 50000)}),
+        ("backup.json.gz", ["Client", "Airline", "Flight"], {}),
+    ]
+    with tempfile.TemporaryDirectory() as directory:
+        for name, record_types, filters in exports:
+            path = os.path.join(directory, name)
+            start = time.perf_counter()
+            count = export_records(store, path, record_types, **filters)
+            elapsed = time.perf_counter() - start
+            tracemalloc.start()
+            export_records(store, path, record_types, **filters)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{name:16} {count:9} records {elapsed:7.2f}s  peak {peak / 1024 / 1024:6.1f} MiB")
+
+
+if __name__ == "__main__":
+    flight_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    bench_export(flight_count)
@@ -0,0 +1,40 @@
+# benchmarks/bench_flights.py
+# Times date range and route queries against the sorted flight indexes.
+# Run: python benchmarks/bench_flights.py [flight_count]
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from bench_memory import make_records
+from records import RecordStore
+
+
+def bench_flights(flight_count):
+    """
+    Print the time to index flight_count flights and to run a few queries
+    :param flight_count: the number of flights
+    """
+    records = make_records(flight_count)
+    start = time.perf_counter()
+    store = RecordStore(records)
+    print(f"Indexed {flight_count} flights in {time.perf_counter() - start:.2f}s")
+
+    queries = [
+        ("count, one month", lambda: store.count_flights("2025-03-01", "2025-04-01")),
+        ("count, London to Berlin", lambda: store.count_flights(start_city="London", end_city="Berlin")),
+        ("page 10 from London, one month", lambda: store.query_flights("2025-03-01", "2025-04-01", "London",
+                                                                      offset=450, limit=50)),
+        ("scan, one month from London", lambda: [f for f in records["Flight"] if f.get("Start City") == "London"
+                                                 and "2025-03-01" <= f.get("Date") < "2025-04-01"][450:500]),
+    ]
+    for name, query in queries:
+        start = time.perf_counter()
+        query()
+        print(f"{name:32} {(time.perf_counter() - start) * 1000:9.3f}ms")
+
+
+if __name__ == "__main__":
+    flight_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    bench_flights(flight_count)
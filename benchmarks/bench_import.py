@@ -0,0 +1,73 @@
+# benchmarks/bench_import.py
+# Times bulk_import of generated CSV and JSON Lines files with 1, 2, 4 and 8
+# worker processes.
+# Run: python benchmarks/bench_import.py [row_count] [worker_count ...]
+
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from bulk_import import bulk_import, ImportReport
+from records import RecordStore
+
+CITIES = ["London", "Manchester", "New York", "Birmingham", "Paris", "Berlin", "Madrid", "Rome"]
+CLIENT_COLUMNS = ["ID", "Type", "Name", "Address Line 1", "Address Line 2", "Address Line 3",
+                  "City", "State", "Zip Code", "Country", "Phone Number"]
+
+
+def write_files(directory, row_count):
+    """
+    Write one client per ten rows to clients.csv and the other rows as
+    flights to flights.jsonl, one row in a thousand invalid
+    :param directory: where to write the files
+    :param row_count: the total number of rows
+    :return: the paths of the two files
+    """
+    clients = max(row_count // 10, 1)
+    clients_path = os.path.join(directory, "clients.csv")
+    flights_path = os.path.join(directory, "flights.jsonl")
+    with open(clients_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(CLIENT_COLUMNS)
+        for i in range(1, clients + 1):
+            writer.writerow([i, "Client", f"Client {i}", f"{i} High Street", "Flat 1", "Floor 2",
+                             CITIES[i % len(CITIES)], "State", f"ZP{i % 1000}", "UK", f"+44 20 {i:08d}"])
+    with open(flights_path, "w") as f:
+        f.write(json.dumps({"Type": "Airline", "ID": 1, "Company Name": "Airline 1"}) + "\n")
+        for i in range(row_count - clients - 1):
+            client_id = i % clients + 1 if i % 1000 else 0
+            f.write(json.dumps({"Type": "Flight", "Client_ID": client_id, "Airline_ID": 1,
+                                "Date": f"2025-{i % 12 + 1:02d}-15T09:00:00",
+                                "Start City": CITIES[i % len(CITIES)], "End City": CITIES[(i + 3) % len(CITIES)]}) + "\n")
+    return clients_path, flights_path
+
+
+def bench_import(paths, row_count, workers):
+    """
+    Import the files into an empty store
+    :return: the seconds taken
+    """
+    store = RecordStore({"Client": [], "Airline": [], "Flight": []})
+    report = ImportReport()
+    start = time.perf_counter()
+    for path in paths:
+        bulk_import(store, path, report=report, workers=workers)
+    elapsed = time.perf_counter() - start
+    print(f"{workers} workers: {row_count} rows in {elapsed:.2f}s ({row_count / elapsed:,.0f} rows/s); "
+          f"{report.summary()}")
+    return elapsed
+
+
+if __name__ == "__main__":
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    worker_counts = [int(arg) for arg in sys.argv[2:]] or [1, 2, 4, 8]
+    print(f"{os.cpu_count()} CPUs")
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_files(directory, row_count)
+        times = {workers: bench_import(paths, row_count, workers) for workers in worker_counts}
+    for workers, elapsed in times.items():
+        print(f"{workers} workers: {times[worker_counts[0]] / elapsed:.2f}x")
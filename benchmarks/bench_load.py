@@ -0,0 +1,66 @@
+# benchmarks/bench_load.py
+# Compares peak RSS and time of load_records with and without streaming.
+# Run: python benchmarks/bench_load.py [record_count]
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), '../src'))
+sys.path.insert(0, SRC)
+
+
+def write_records_file(file_path, count):
+    """
+    Write a records file with count records, half clients and half flights
+    :param file_path: where to write the file
+    :param count: the total number of records
+    """
+    clients = count // 2
+    records = {
+        "Client": [{"ID": i, "Type": "Client", "Name": f"Client {i}", "Address Line 1": f"{i} High Street",
+                    "Address Line 2": "", "Address Line 3": "", "City": "London", "State": "Greater London",
+                    "Zip Code": "SW1A 1AA", "Country": "UK", "Phone Number": "+44 20 1234 5678"}
+                   for i in range(1, clients + 1)],
+        "Airline": [{"ID": 1, "Type": "Airline", "Company Name": "British Airways"}],
+        "Flight": [{"Client_ID": i % clients + 1, "Airline_ID": 1, "Date": "2025-10-15T09:00:00",
+                    "Start City": "London", "End City": "New York"} for i in range(count - clients)],
+    }
+    with open(file_path, 'w') as f:
+        json.dump(records, f, indent=4)
+
+
+def measure(file_path, streaming):
+    """
+    Load the file in a fresh interpreter and return (seconds, peak RSS in MB)
+    :param file_path: the records file
+    :param streaming: whether to use the streaming loader
+    """
+    code = (
+        "import resource, sys, time\n"
+        f"sys.path.insert(0, {SRC!r})\n"
+        "from storage import load_records\n"
+        "start = time.perf_counter()\n"
+        f"records = load_records({file_path!r}, streaming={streaming})\n"
+        "elapsed = time.perf_counter() - start\n"
+        "peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss\n"
+        "print(elapsed, peak / (1024 * 1024 if sys.platform == 'darwin' else 1024))\n"
+    )
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    elapsed, peak_mb = output.split()[-2:]
+    return float(elapsed), float(peak_mb)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, "records.json")
+        write_records_file(file_path, count)
+        size_mb = os.path.getsize(file_path) / (1024 * 1024)
+        print(f"{count} records, {size_mb:.0f} MB file")
+        for streaming in (False, True):
+            elapsed, peak_mb = measure(file_path, streaming)
+            label = "streaming" if streaming else "json.load"
+            print(f"{label:>10}: {elapsed:.2f}s, peak RSS {peak_mb:.0f} MB")
@@ -0,0 +1,62 @@
+# benchmarks/bench_memory.py
+# Compares the memory used by dict records and the compact slotted records.
+# Run: python benchmarks/bench_memory.py [flight_count]
+
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from compact import to_compact
+
+CITIES = ["London", "Manchester", "New York", "Birmingham", "Paris", "Berlin", "Madrid", "Rome"]
+
+
+def make_records(flight_count):
+    """
+    Build dict records shaped like data/test_records.json, one client per
+    ten flights
+    :param flight_count: the number of flights
+    """
+    clients = max(flight_count // 10, 1)
+    return {
+        "Client": [{"ID": i, "Type": "Client", "Name": f"Client {i}", "Address Line 1": f"{i} High Street",
+                    "Address Line 2": "", "Address Line 3": "", "City": CITIES[i % len(CITIES)],
+                    "State": "State", "Zip Code": f"ZP{i % 1000}", "Country": "UK",
+                    "Phone Number": f"+44 20 {i:08d}"} for i in range(1, clients + 1)],
+        "Airline": [{"ID": i, "Type": "Airline", "Company Name": f"Airline {i}"} for i in range(1, 51)],
+        "Flight": [{"Client_ID": i % clients + 1, "Airline_ID": i % 50 + 1, "Date": f"2025-{i % 12 + 1:02d}-15T09:00:00",
+                    "Start City": CITIES[i % len(CITIES)], "End City": CITIES[(i + 3) % len(CITIES)]}
+                   for i in range(flight_count)],
+    }
+
+
+def measure(build):
+    """
+    :param build: a function building the records
+    :return: the bytes held by the records it returns
+    """
+    tracemalloc.start()
+    records = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del records
+    return size
+
+
+def build_compact(flight_count):
+    # Convert type by type so the dicts can be freed as we go
+    records = {}
+    for record_type, values in make_records(flight_count).items():
+        records[record_type] = [to_compact(record_type, record) for record in values]
+        values.clear()
+    return records
+
+
+if __name__ == "__main__":
+    flight_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    dict_bytes = measure(lambda: make_records(flight_count))
+    compact_bytes = measure(lambda: build_compact(flight_count))
+    print(f"{flight_count} flights, {flight_count // 10} clients")
+    print(f"   dicts: {dict_bytes / 2**20:.0f} MB")
+    print(f" compact: {compact_bytes / 2**20:.0f} MB ({compact_bytes / dict_bytes:.0%} of dicts)")
@@ -0,0 +1,66 @@
+# benchmarks/bench_search.py
+# Times building the text index and search-as-you-type queries over many clients.
+# Run: python benchmarks/bench_search.py [client_count]
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from records import RecordStore, create_record, delete_record, update_record
+
+FIRST_NAMES = ["Emma", "James", "Olivia", "Liam", "Sophia", "Noah", "Amelia", "Oliver", "Isla", "Arjun",
+               "Mei", "Carlos", "Fatima", "Lukas", "Chloe", "Hiroshi", "Zara", "Mateo", "Priya", "Ethan"]
+LAST_NAMES = ["Thompson", "Patel", "Smith", "Garcia", "Nguyen", "Mueller", "Rossi", "Kowalski", "Okafor",
+              "Tanaka", "Johnson", "Brown", "Silva", "Dubois", "Kim", "Jensen", "Walsh", "Haddad"]
+CITIES = ["London", "Manchester", "New York", "Birmingham", "Paris", "Berlin", "Madrid", "Rome"]
+QUERIES = ["e", "em", "emm", "emma", "emma t", "emma tho", "omps", "lon", "+44 20 1234", "4420123",
+           "sw1", "patel manch", "zzz"]
+
+
+def make_store(count, seed=1):
+    """
+    Build a RecordStore of count clients with varied names and phone numbers
+    :param count: the number of clients
+    :param seed: the random seed, so runs are comparable
+    """
+    rng = random.Random(seed)
+    clients = [{"ID": i, "Type": "Client",
+                "Name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                "City": rng.choice(CITIES), "Zip Code": f"SW{rng.randrange(100)} {rng.randrange(10)}AA",
+                "Phone Number": f"+44 20 {rng.randrange(10 ** 8):08d}"} for i in range(1, count + 1)]
+    return RecordStore({"Client": clients, "Airline": [], "Flight": []})
+
+
+def bench_search(count):
+    """
+    Print the time to index count clients, the slowest of a few runs of
+    each query and the cost of incremental updates
+    :param count: the number of clients
+    """
+    store = make_store(count)
+    start = time.perf_counter()
+    store.build_text_index()
+    print(f"Indexed {count} clients in {time.perf_counter() - start:.2f}s")
+
+    for query in QUERIES:
+        timings = []
+        for _ in range(5):
+            start = time.perf_counter()
+            found = store.search_text("Client", query)
+            timings.append(time.perf_counter() - start)
+        print(f"{query!r:16} {len(found):4} results  {max(timings) * 1000:7.2f}ms")
+
+    start = time.perf_counter()
+    for i in range(1000):
+        create_record(store, {"Name": f"New Client {i}", "City": "Leeds", "Phone Number": f"0113 {i:06d}"}, "Client")
+        new_id = store["Client"][-1]["ID"]
+        update_record(store, "Client", {"Name": f"Renamed {i}"}, client_id=new_id)
+        delete_record(store, "Client", client_id=new_id)
+    print(f"1000 create/update/delete cycles: {(time.perf_counter() - start) * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    bench_search(count)
@@ -0,0 +1,77 @@
+# benchmarks/bench_server.py
+# Serves generated records with server.py and times concurrent clients:
+# paging through every flight, and creating clients from several threads
+# with and without group commits (commit_delay 0 still groups the edits
+# queued while a commit is being written).
+# Run: python benchmarks/bench_server.py [flight_count] [clients]
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from backends import JsonBackend, RemoteBackend
+from bench_memory import make_records
+from records import RecordStore
+from server import RecordServer
+
+WRITES = 400
+
+
+def run_server(server):
+    """
+    Start a server on a free port on its own event loop thread
+    :return: (RemoteBackend for it, function that stops it)
+    """
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    listener = asyncio.run_coroutine_threadsafe(server.start("127.0.0.1", 0), loop).result()
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(server.stop(), loop).result()
+        loop.call_soon_threadsafe(listener.close)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+
+    return RemoteBackend(f"http://127.0.0.1:{listener.sockets[0].getsockname()[1]}"), stop
+
+
+def bench_server(flight_count, clients):
+    """
+    Print the paging and write throughput of a server over flight_count flights
+    :param flight_count: the number of flights
+    :param clients: the number of client threads writing at once
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "records.json")
+        with open(path, "w") as f:
+            json.dump(make_records(flight_count), f)
+        for commit_delay in (0, 0.005):
+            backend = JsonBackend(path, os.path.join(directory, f"journal{commit_delay}.jsonl"))
+            server = RecordServer(backend, RecordStore(make_records(flight_count), compact=True), commit_delay)
+            remote, stop = run_server(server)
+            if commit_delay == 0:
+                start = time.perf_counter()
+                count = sum(len(records) for records in remote.load().values() if isinstance(records, list))
+                elapsed = time.perf_counter() - start
+                print(f"load over HTTP   {count:9} records {elapsed:7.2f}s")
+            start = time.perf_counter()
+            with ThreadPoolExecutor(clients) as pool:
+                list(pool.map(lambda n: remote.request("POST", "/records/Client", {"Name": f"Agent {n}"}),
+                              range(WRITES)))
+            elapsed = time.perf_counter() - start
+            print(f"commit_delay {commit_delay:<5} {WRITES} creates from {clients} threads {elapsed:6.2f}s  "
+                  f"{WRITES / elapsed:7.0f}/s  {server.commits} commits, largest {server.largest_commit}")
+            stop()
+
+
+if __name__ == "__main__":
+    flight_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    bench_server(flight_count, clients)
@@ -0,0 +1,97 @@
+# benchmarks/datagen.py
+# Synthetic records shaped like data/test_records.json, for the benchmarks.
+# Names, addresses, cities and routes are recombined from the sample file
+# with a fixed seed, so the same counts always give the same records.
+# Run: python benchmarks/datagen.py flight_count output.json
+
+import json
+import os
+import random
+import sys
+
+SAMPLE_PATH = os.path.join(os.path.dirname(__file__), '../data/test_records.json')
+
+
+def load_sample(path=SAMPLE_PATH):
+    """
+    :return: the sample records the generated ones are modelled on
+    """
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def generate_records(client_count, airline_count, flight_count, seed=0, sample=None):
+    """
+    Build the nested records dict with the given number of each type
+    :param client_count: the number of clients, with IDs 1 to client_count
+    :param airline_count: the number of airlines, with IDs 1 to airline_count
+    :param flight_count: the number of flights, each of an existing client
+        and airline, dated over 2025 and 2026
+    :param seed: the random seed
+    :param sample: the records to model on, data/test_records.json if None
+    :return: the records dict, with the "Next ID" sequence set
+    """
+    sample = sample or load_sample()
+    rng = random.Random(seed)
+    clients = sample["Client"]
+    first_names = sorted({client["Name"].split()[0] for client in clients})
+    last_names = sorted({client["Name"].split()[-1] for client in clients})
+    companies = [airline["Company Name"] for airline in sample["Airline"]]
+    routes = [(flight["Start City"], flight["End City"]) for flight in sample["Flight"]]
+
+    records = {"Client": [], "Airline": [], "Flight": []}
+    for client_id in range(1, client_count + 1):
+        address = rng.choice(clients)
+        records["Client"].append({
+            "ID": client_id,
+            "Type": "Client",
+            "Name": f"{rng.choice(first_names)} {rng.choice(last_names)}",
+            "Address Line 1": f"{rng.randint(1, 999)} {address['Address Line 1'].split(' ', 1)[-1]}",
+            "Address Line 2": address["Address Line 2"],
+            "Address Line 3": address["Address Line 3"],
+            "City": address["City"],
+            "State": address["State"],
+            "Zip Code": address["Zip Code"],
+            "Country": address["Country"],
+            "Phone Number": f"{address['Phone Number'][:-4]}{rng.randint(0, 9999):04d}",
+        })
+    for airline_id in range(1, airline_count + 1):
+        company = companies[(airline_id - 1) % len(companies)]
+        suffix = (airline_id - 1) // len(companies)
+        records["Airline"].append({
+            "ID": airline_id,
+            "Type": "Airline",
+            "Company Name": f"{company} {suffix}" if suffix else company,
+        })
+    if client_count and airline_count:
+        for _ in range(flight_count):
+            start_city, end_city = rng.choice(routes)
+            records["Flight"].append({
+                "Client_ID": rng.randint(1, client_count),
+                "Airline_ID": rng.randint(1, airline_count),
+                "Type": "Flight",
+                "Date": f"{rng.choice((2025, 2026))}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+                        f"T{rng.randint(0, 23):02d}:{rng.choice((0, 15, 30, 45)):02d}:00",
+                "Start City": start_city,
+                "End City": end_city,
+            })
+    records["Next ID"] = {"Client": client_count + 1, "Airline": airline_count + 1}
+    return records
+
+
+def scale_counts(flight_count):
+    """
+    The counts used for a benchmark scale: one client per ten flights and
+    one airline per thousand, as in bench_memory.py
+    :return: (client_count, airline_count, flight_count)
+    """
+    return max(flight_count // 10, 1), max(flight_count // 1000, 10), flight_count
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        raise SystemExit("Usage: python benchmarks/datagen.py flight_count output.json")
+    counts = scale_counts(int(sys.argv[1]))
+    with open(sys.argv[2], "w", encoding='utf-8') as out:
+        json.dump(generate_records(*counts), out)
+    print(f"Wrote {counts[0]} clients, {counts[1]} airlines and {counts[2]} flights to {sys.argv[2]}")
@@ -0,0 +1,204 @@
+# benchmarks/run_benchmarks.py
+# Times the records.py and storage.py hot paths on generated data at 1k,
+# 100k and 1M flights, writes the results as JSON and compares them with a
+# stored baseline. Exits with status 1 if an operation got slower than the
+# baseline by more than the tolerance.
+# Run: python benchmarks/run_benchmarks.py [--scales 1k 100k 1m] [--save-baseline]
+
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from datagen import generate_records, scale_counts
+from paged_view import row_values
+from records import (RecordStore, airline_passengers, bulk_delete_records, bulk_update_records, client_itinerary,
+                     create_record, delete_record, search_records, update_record)
+from storage import load_records, save_records
+
+SCALES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+RESULTS_PATH = os.path.join(os.path.dirname(__file__), 'results.json')
+
+# Calls made by each timed operation
+CALLS = 1000
+# Deletes compact the record list, so fewer are made
+DELETE_CALLS = 100
+# Rows the GUI builds per page (PagedTreeview visible plus buffer rows)
+PAGE_ROWS = 30
+# A result more than this fraction slower than the baseline is a regression
+TOLERANCE = 0.5
+# Times below this many seconds are timer noise and are not compared
+NOISE_FLOOR = 0.002
+
+
+def best_time(operation, repeat):
+    """
+    :param operation: a function taking the repeat number; each repeat must
+        be given fresh targets if the operation changes the records
+    :return: the fastest of repeat runs in seconds
+    """
+    best = None
+    for number in range(repeat):
+        # As timeit does, keep a collection over millions of records out of the timing
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            operation(number)
+            elapsed = time.perf_counter() - start
+        finally:
+            gc.enable()
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_scale(flight_count, repeat, seed=0):
+    """
+    Time every operation at one scale
+    :param flight_count: the number of flights, see datagen.scale_counts
+    :param repeat: the number of runs of each operation
+    :return: {operation name: seconds}
+    """
+    client_count, airline_count, _ = scale_counts(flight_count)
+    records = generate_records(client_count, airline_count, flight_count, seed)
+    rng = random.Random(seed)
+    results = {}
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "records.json")
+        results["save_records"] = best_time(lambda _: save_records(records, path, backups=0), repeat)
+        results["load_records"] = best_time(lambda _: load_records(path), repeat)
+
+    start = time.perf_counter()
+    store = RecordStore(records)
+    results["RecordStore index"] = time.perf_counter() - start
+
+    client_ids = [rng.randint(1, client_count) for _ in range(CALLS)]
+    results["search_records Client"] = best_time(
+        lambda _: [search_records(store, client_id, "Client") for client_id in client_ids], repeat)
+    results["search_records Flight"] = best_time(
+        lambda _: [search_records(store, client_id, "Flight") for client_id in client_ids], repeat)
+    # The client and airline searches of the GUI
+    results["client_itinerary"] = best_time(
+        lambda _: [client_itinerary(store, client_id) for client_id in client_ids], repeat)
+    airline_ids = [rng.randint(1, airline_count) for _ in range(DELETE_CALLS)]
+    results["airline_passengers"] = best_time(
+        lambda _: [airline_passengers(store, airline_id) for airline_id in airline_ids], repeat)
+
+    new_client = {key: value for key, value in records["Client"][0].items() if key != "ID"}
+    results["create_record Client"] = best_time(
+        lambda _: [create_record(store, dict(new_client), "Client") for _ in range(CALLS)], repeat)
+    flight = records["Flight"][0]
+    new_flights = [dict(flight, Client_ID=str(client_id)) for client_id in client_ids]
+    results["create_record Flight"] = best_time(
+        lambda _: [create_record(store, dict(data), "Flight") for data in new_flights], repeat)
+    results["update_record Client"] = best_time(
+        lambda number: [update_record(store, "Client", {"City": f"City {number}"}, client_id=client_id)
+                        for client_id in client_ids], repeat)
+
+    # refresh_treeview builds the values of one page of rows per redraw
+    clients = store["Client"]
+    offsets = [rng.randrange(max(len(clients) - PAGE_ROWS, 1)) for _ in range(CALLS)]
+    results["row_values page"] = best_time(
+        lambda _: [[row_values("Client", record) for record in clients[offset:offset + PAGE_ROWS]]
+                   for offset in offsets], repeat)
+    results["row_values all Flight"] = best_time(
+        lambda _: [row_values("Flight", record) for record in store["Flight"]], repeat)
+
+    # Deletes need different targets on every run, and leave most records
+    flight_targets = [[(f["Client_ID"], f["Airline_ID"]) for f in rng.sample(store["Flight"], DELETE_CALLS)]
+                      for _ in range(repeat)]
+    results["delete_record Flight"] = best_time(
+        lambda number: [delete_record(store, "Flight", client_id=client_id, airline_id=airline_id)
+                        for client_id, airline_id in flight_targets[number]], repeat)
+    # A cancelled airline: every flight of one airline in the first half of 2025
+    airlines = rng.sample(range(1, airline_count + 1), repeat)
+    results["bulk_update_records Flight"] = best_time(
+        lambda number: bulk_update_records(store, "Flight", {"End City": "Cancelled"},
+                                           where={"Airline_ID": airlines[number]}), repeat)
+    results["bulk_delete_records Flight"] = best_time(
+        lambda number: bulk_delete_records(store, "Flight", where={"Airline_ID": airlines[number]},
+                                           end_date="2025-07-01"), repeat)
+    per_run = min(DELETE_CALLS, client_count // (2 * repeat))
+    client_targets = rng.sample(range(1, client_count + 1), per_run * repeat)
+    results["delete_record Client"] = best_time(
+        lambda number: [delete_record(store, "Client", client_id=client_id)
+                        for client_id in client_targets[number * per_run:(number + 1) * per_run]], repeat)
+    return results
+
+
+def compare(results, baseline, tolerance=TOLERANCE, noise_floor=NOISE_FLOOR):
+    """
+    Find the operations slower than the baseline
+    :param results: {scale: {operation: seconds}}
+    :param baseline: the same shape, from an earlier run
+    :return: a list of (scale, operation, baseline seconds, seconds)
+    """
+    regressions = []
+    for scale, timings in results.items():
+        for operation, seconds in timings.items():
+            expected = baseline.get(scale, {}).get(operation)
+            if expected is None or seconds < noise_floor:
+                continue
+            if seconds > expected * (1 + tolerance):
+                regressions.append((scale, operation, expected, seconds))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the records and storage hot paths and compare with a baseline")
+    parser.add_argument("--scales", nargs="+", choices=SCALES, default=list(SCALES))
+    parser.add_argument("--repeat", type=int, default=3, help="runs of each operation, the fastest is kept")
+    parser.add_argument("--output", default=RESULTS_PATH, help="where to write the results JSON")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="the baseline JSON to compare with")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="fraction slower than the baseline allowed, default 0.5")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    args = parser.parse_args()
+
+    results = {}
+    for scale in args.scales:
+        print(f"{scale}:")
+        results[scale] = bench_scale(SCALES[scale], args.repeat)
+        for operation, seconds in results[scale].items():
+            print(f"  {operation:24} {seconds * 1000:10.2f}ms")
+
+    report = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "calls": CALLS,
+        "delete_calls": DELETE_CALLS,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    with open(args.output, "w", encoding='utf-8') as out:
+        json.dump(report, out, indent=2)
+    print(f"Results written to {args.output}")
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding='utf-8') as out:
+            json.dump(report, out, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        raise SystemExit(0)
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --save-baseline to create one")
+        raise SystemExit(0)
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline["results"], args.tolerance)
+    for scale, operation, expected, seconds in regressions:
+        print(f"REGRESSION {scale} {operation}: {expected * 1000:.2f}ms -> {seconds * 1000:.2f}ms")
+    if baseline.get("platform") != report["platform"]:
+        print(f"Baseline was recorded on {baseline.get('platform')}, timings may not be comparable")
+    print(f"{len(regressions)} regressions")
+    raise SystemExit(1 if regressions else 0)
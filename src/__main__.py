@@ -0,0 +1,13 @@
+"""
+python -m src: the command line interface of cli.py
+"""
+
+import os
+import sys
+
+# The modules in src import each other by their plain names
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cli import main
+
+raise SystemExit(main())
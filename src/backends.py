@@ -0,0 +1,624 @@
+"""
+Storage backends for the record management system.
+
+A backend loads the records into an indexed RecordStore, persists single
+edits as they happen and can write a full snapshot. Persisting an edit is
+split in two so the slow part can run off the GUI thread: prepare() copies
+what the edit needs from the records, write() stores prepared edits and may
+run on any thread (see persistence.py). The edits are the
+journal entries described in storage.append_journal, so the GUI does not
+need to know which backend is in use.
+
+JsonBackend keeps the JSON snapshot plus JSON Lines journal of storage.py.
+SQLiteBackend keeps one row per record in a SQLite database, with indexes
+on Client_ID, Airline_ID and Date and foreign keys from flights to their
+client and airline.
+RemoteBackend is a client of the record server of server.py, which several
+GUIs and scripts can share.
+
+The backend is chosen with environment variables:
+RMS_BACKEND    json (default), sqlite or remote
+RMS_DATA_PATH  the JSON snapshot or SQLite database file
+RMS_JOURNAL_PATH  the journal of the JSON backend
+RMS_SERVER_URL  the server of the remote backend
+
+Migrate a JSON file to SQLite with:
+python src/backends.py migrate data/test_records.json records.db
+"""
+
+import argparse
+import json
+import os
+from collections.abc import Mapping
+
+from compact import AIRLINE_FIELDS, CLIENT_FIELDS, FLIGHT_FIELDS, to_compact
+from integrity import DEFAULT_ON_DELETE, NULLIFY, RESTRICT
+from records import RecordStore, SEQUENCE_KEY
+from storage import (STREAM_BATCH_SIZE, compact_journal, load_records, number_journal_entry, save_records,
+                     wait_for_compaction, write_journal)
+
+DEFAULT_DATA_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "test_records.json")
+DEFAULT_JOURNAL_PATH = os.path.join(os.path.dirname(__file__), "record", "record.jsonl")
+DEFAULT_SERVER_URL = "http://127.0.0.1:8765"
+
+# Records asked for per request when loading from a server
+REMOTE_PAGE_SIZE = 10000
+
+
+class StorageBackend:
+    """
+    Interface shared by the backends
+    """
+
+    def load(self, compact=False, progress=None):
+        """
+        :param compact: hold the records in the slotted classes of compact.py
+        :param progress: if given, called with (record type, batch of
+            records) as the records are read, then with (None, None) before
+            they are indexed, so a caller on another thread can show them early
+        :return: the records as a RecordStore
+        """
+        raise NotImplementedError
+
+    def load_stored(self, compact=False):
+        """
+        Read the records as they are stored, without indexing them; a
+        RecordStore moves the ID sequence past the IDs in use, which would
+        hide a stale "Next ID" from check_integrity
+        :param compact: hold the records in the slotted classes of compact.py
+        :return: the nested records dict
+        """
+        return self.load(compact)
+
+    def apply(self, records, entry):
+        """
+        Persist one edit that has already been made to records
+        :param records: the RecordStore the edit was made to
+        :param entry: the journal entry describing the edit
+        :return: True if the edit was saved
+        """
+        try:
+            self.write([self.prepare(records, entry)])
+        except Exception as e:
+            print(f"Error saving edit: {e}")
+            return False
+        self.compact(records)
+        return True
+
+    def prepare(self, records, entry):
+        """
+        Copy what write() needs out of the records, on the thread that made
+        the edit, so later edits cannot change it
+        :param records: the RecordStore the edit was made to
+        :param entry: the journal entry describing the edit
+        :return: the entry to pass to write()
+        """
+        entry = dict(entry)
+        for key in ("record", "data"):
+            if isinstance(entry.get(key), Mapping):
+                entry[key] = dict(entry[key])
+        if isinstance(entry.get("match"), Mapping):
+            entry["match"] = json.loads(json.dumps(entry["match"]))
+        return entry
+
+    def write(self, entries):
+        """
+        Store prepared edits, in order. Safe to call from a worker thread.
+        Raises an exception if they could not be stored.
+        :param entries: entries returned by prepare()
+        """
+        raise NotImplementedError
+
+    def compact(self, records, force=False):
+        """
+        Fold stored edits into the snapshot when that is due; called on the
+        thread that edits the records, unless records is None
+        :param records: the records to snapshot, or None to rebuild the
+            snapshot from the stored edits without reading the records
+        :param force: fold them now, whatever their size, and wait until done
+        """
+
+    def save(self, records):
+        """
+        Write every record, replacing what is stored
+        :param records: the records to save
+        :return: True if the records were saved
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Finish pending writes and release the storage
+        """
+
+
+class JsonBackend(StorageBackend):
+    """
+    The JSON snapshot and append-only journal of storage.py
+    """
+
+    def __init__(self, file_path=DEFAULT_DATA_PATH, journal_path=DEFAULT_JOURNAL_PATH):
+        self.file_path = file_path
+        self.journal_path = journal_path
+
+    def load(self, compact=False, progress=None):
+        # Batches can only be reported while the file is parsed incrementally
+        records = load_records(self.file_path, self.journal_path, streaming=progress is not None,
+                               compact=compact, progress=progress)
+        return records
+
+    def load_stored(self, compact=False):
+        # The snapshot; journaled edits were checked by the CRUD functions
+        return load_records(self.file_path, compact=compact)
+
+    def prepare(self, records, entry):
+        return number_journal_entry(records, super().prepare(records, entry))
+
+    def write(self, entries):
+        write_journal(entries, self.journal_path)
+
+    def compact(self, records, force=False):
+        if force:
+            compact_journal(records, self.file_path, self.journal_path, threshold=0, background=False)
+        else:
+            compact_journal(records, self.file_path, self.journal_path)
+
+    def save(self, records):
+        return save_records(records, self.file_path)
+
+    def close(self):
+        wait_for_compaction()
+
+
+def _column(field):
+    """
+    :param field: a JSON key such as "Address Line 1"
+    :return: its column name, e.g. address_line_1
+    """
+    return field.lower().replace(" ", "_")
+
+
+# Record type -> (table, JSON keys stored in their own columns)
+TABLES = {
+    "Client": ("clients", CLIENT_FIELDS),
+    "Airline": ("airlines", AIRLINE_FIELDS),
+    "Flight": ("flights", FLIGHT_FIELDS),
+}
+
+# Columns without a declared type keep the values exactly as given
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS clients (
+    id INTEGER PRIMARY KEY,
+    type, name, address_line_1, address_line_2, address_line_3,
+    city, state, zip_code, country, phone_number,
+    extra TEXT
+);
+CREATE TABLE IF NOT EXISTS airlines (
+    id INTEGER PRIMARY KEY,
+    type, company_name,
+    extra TEXT
+);
+CREATE TABLE IF NOT EXISTS flights (
+    flight_id INTEGER PRIMARY KEY,
+    client_id INTEGER REFERENCES clients(id) ON DELETE CASCADE,
+    airline_id INTEGER REFERENCES airlines(id) ON DELETE CASCADE,
+    type, date, start_city, end_city,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS flights_client_id ON flights(client_id);
+CREATE INDEX IF NOT EXISTS flights_airline_id ON flights(airline_id);
+CREATE INDEX IF NOT EXISTS flights_date ON flights(date);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    One row per record in a SQLite database.
+    Flights reference their client and airline with foreign keys, which
+    remove a deleted client's or airline's flights with it.
+    Flights have no ID of their own; their row order follows the Flight list.
+    """
+
+    def __init__(self, db_path):
+        # sqlite3 (and urllib for RemoteBackend) is imported by the backend
+        # that uses it, so the JSON backend's start-up does not pay for it
+        import sqlite3
+
+        self.db_path = db_path
+        # write() may run on the persistence worker thread; the worker and
+        # the GUI thread never use the connection at the same time
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(SCHEMA)
+
+    def load(self, compact=False, progress=None):
+        return RecordStore(self._read(compact, progress), compact)
+
+    def load_stored(self, compact=False):
+        return self._read(compact)
+
+    def _read(self, compact, progress=None):
+        """
+        :return: the rows of every table and the stored sequence as the nested records dict
+        """
+        records = {}
+        for record_type, (table, fields) in TABLES.items():
+            columns = [_column(field) for field in fields]
+            order = "flight_id" if table == "flights" else "id"
+            cursor = self.conn.execute(f"SELECT {', '.join(columns)}, extra FROM {table} ORDER BY {order}")
+            if progress is None:
+                rows = (self._row_to_record(fields, row) for row in cursor)
+                if compact:
+                    rows = (to_compact(record_type, record) for record in rows)
+                records[record_type] = list(rows)
+                continue
+            records[record_type] = []
+            while True:
+                batch = [self._row_to_record(fields, row) for row in cursor.fetchmany(STREAM_BATCH_SIZE)]
+                if not batch:
+                    break
+                progress(record_type, batch)
+                if compact:
+                    batch = [to_compact(record_type, record) for record in batch]
+                records[record_type].extend(batch)
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (SEQUENCE_KEY,)).fetchone()
+        if row is not None:
+            records[SEQUENCE_KEY] = json.loads(row[0])
+        if progress is not None:
+            progress(None, None)
+        return records
+
+    @staticmethod
+    def _row_to_record(fields, row):
+        """
+        Build the JSON shaped record from a row; NULL columns are left out
+        """
+        record = {field: value for field, value in zip(fields, row) if value is not None}
+        if row[-1]:
+            record.update(json.loads(row[-1]))
+        return record
+
+    @staticmethod
+    def _record_to_row(fields, record):
+        """
+        Split a record into column values and the JSON of any other keys
+        """
+        extra = {key: value for key, value in record.items() if key not in fields}
+        return [record.get(field) for field in fields] + [json.dumps(extra) if extra else None]
+
+    def prepare(self, records, entry):
+        entry = super().prepare(records, entry)
+        if entry.get("op") == "create" and SEQUENCE_KEY in records:
+            entry[SEQUENCE_KEY] = dict(records[SEQUENCE_KEY])
+        return entry
+
+    def write(self, entries):
+        """
+        Store the edits in one transaction; if one fails none are kept
+        """
+        with self.conn:
+            for entry in entries:
+                op = entry.get("op")
+                record_type = entry.get("type")
+                if record_type not in TABLES:
+                    raise ValueError(f"Unknown record type {record_type}")
+                if op == "create":
+                    self._insert(record_type, [entry["record"]])
+                    self._save_sequence(entry.get(SEQUENCE_KEY))
+                elif op == "update":
+                    self._update(record_type, entry.get("data", {}), entry.get("client_id"), entry.get("airline_id"))
+                elif op == "delete":
+                    self._delete(record_type, entry.get("client_id"), entry.get("airline_id"),
+                                 entry.get("on_delete"))
+                elif op == "bulk_update":
+                    self._bulk_update(record_type, entry.get("data", {}), entry.get("match", {}))
+                elif op == "bulk_delete":
+                    self._bulk_delete(record_type, entry.get("match", {}), entry.get("on_delete"))
+                else:
+                    raise ValueError(f"Unknown journal entry {entry}")
+
+    def _insert(self, record_type, records_to_insert):
+        """
+        Insert records of one type
+        """
+        table, fields = TABLES[record_type]
+        columns = [_column(field) for field in fields] + ["extra"]
+        placeholders = ", ".join("?" * len(columns))
+        self.conn.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+                              (self._record_to_row(fields, record) for record in records_to_insert))
+
+    def _update(self, record_type, data, client_id, airline_id):
+        """
+        Update the row matched the same way update_record matches in memory:
+        by ID for clients and airlines and the first flight with both IDs
+        """
+        table, fields = TABLES[record_type]
+        # update_record keeps the ID and type, so the row must too
+        data = {field: value for field, value in data.items() if field not in ("ID", "Type")}
+        assignments, values = self._assignments(fields, data)
+        if not assignments:
+            return
+        if record_type == "Flight":
+            where = ("flight_id = (SELECT MIN(flight_id) FROM flights"
+                     " WHERE client_id = ? AND airline_id = ?)")
+            values += [int(client_id), int(airline_id)]
+        else:
+            where = "id = ?"
+            values.append(int(client_id if record_type == "Client" else airline_id))
+        self.conn.execute(f"UPDATE {table} SET {', '.join(assignments)} WHERE {where}", values)
+
+    @staticmethod
+    def _assignments(fields, data):
+        """
+        :return: the SET clauses and values writing data to a row, other
+            keys going into the extra JSON
+        """
+        assignments = []
+        values = []
+        for field, value in data.items():
+            if field in fields:
+                assignments.append(f"{_column(field)} = ?")
+                values.append(value)
+        extra = {field: value for field, value in data.items() if field not in fields}
+        if extra:
+            assignments.append("extra = json_patch(COALESCE(extra, '{}'), ?)")
+            values.append(json.dumps(extra))
+        return assignments, values
+
+    @staticmethod
+    def _match_sql(record_type, match):
+        """
+        Translate the criteria of records.match_records into a WHERE clause
+        :return: (clause, values)
+        """
+        fields = TABLES[record_type][1]
+        clauses = []
+        values = []
+        if match.get("ids") is not None:
+            column = "client_id" if record_type == "Flight" else "id"
+            clauses.append(f"{column} IN (SELECT value FROM json_each(?))")
+            values.append(json.dumps([int(record_id) for record_id in match["ids"]]))
+        for field, value in (match.get("where") or {}).items():
+            if field in fields:
+                clauses.append(f"{_column(field)} IS ?")
+            else:
+                clauses.append("json_extract(extra, ?) IS ?")
+                values.append(f'$."{field}"')
+            values.append(value)
+        if record_type == "Flight":
+            if match.get("start_date") is not None:
+                clauses.append("date >= ?")
+                values.append(match["start_date"])
+            if match.get("end_date") is not None:
+                clauses.append("date < ?")
+                values.append(match["end_date"])
+        elif match.get("start_date") is not None or match.get("end_date") is not None:
+            # Only flights have a date
+            clauses.append("0")
+        if not clauses:
+            raise ValueError("A bulk edit needs ids, where or a date range")
+        return " AND ".join(clauses), values
+
+    def _bulk_update(self, record_type, data, match):
+        """
+        Update every row matching the criteria in one statement
+        """
+        table, fields = TABLES[record_type]
+        assignments, values = self._assignments(fields, data)
+        if not assignments:
+            return
+        where, where_values = self._match_sql(record_type, match)
+        self.conn.execute(f"UPDATE {table} SET {', '.join(assignments)} WHERE {where}", values + where_values)
+
+    def _bulk_delete(self, record_type, match, on_delete=None):
+        """
+        Delete every row matching the criteria, applying the delete policy
+        to the flights of all of them at once
+        """
+        import sqlite3
+
+        table = TABLES[record_type][0]
+        where, values = self._match_sql(record_type, match)
+        if record_type != "Flight":
+            column = "client_id" if record_type == "Client" else "airline_id"
+            doomed = f"SELECT id FROM {table} WHERE {where}"
+            on_delete = on_delete or DEFAULT_ON_DELETE
+            if on_delete == NULLIFY:
+                self.conn.execute(f"UPDATE flights SET {column} = NULL WHERE {column} IN ({doomed})", values)
+            elif on_delete == RESTRICT:
+                if self.conn.execute(f"SELECT 1 FROM flights WHERE {column} IN ({doomed}) LIMIT 1", values).fetchone():
+                    raise sqlite3.IntegrityError(f"{record_type} records still have flights")
+        self.conn.execute(f"DELETE FROM {table} WHERE {where}", values)
+
+    def _delete(self, record_type, client_id, airline_id, on_delete=None):
+        """
+        Delete the rows delete_record removes in memory. The foreign keys
+        cascade to the flights; nullify detaches them first and restrict
+        refuses to delete a client or airline that still has flights.
+        """
+        import sqlite3
+
+        if record_type == "Flight":
+            self.conn.execute("DELETE FROM flights WHERE client_id = ? AND airline_id = ?",
+                              (int(client_id), int(airline_id)))
+            return
+        table, column, record_id = (("clients", "client_id", int(client_id)) if record_type == "Client"
+                                    else ("airlines", "airline_id", int(airline_id)))
+        on_delete = on_delete or DEFAULT_ON_DELETE
+        if on_delete == NULLIFY:
+            self.conn.execute(f"UPDATE flights SET {column} = NULL WHERE {column} = ?", (record_id,))
+        elif on_delete == RESTRICT:
+            if self.conn.execute(f"SELECT 1 FROM flights WHERE {column} = ? LIMIT 1", (record_id,)).fetchone():
+                raise sqlite3.IntegrityError(f"{record_type} {record_id} still has flights")
+        self.conn.execute(f"DELETE FROM {table} WHERE id = ?", (record_id,))
+
+    def _save_sequence(self, sequence):
+        """
+        Keep the next ID of each type with the data, as the JSON file does
+        :param sequence: the SEQUENCE_KEY value of the records, or None
+        """
+        if sequence is not None:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                              (SEQUENCE_KEY, json.dumps(sequence)))
+
+    def save(self, records):
+        import sqlite3
+
+        # None is a flight detached by the nullify delete policy
+        client_ids = {record.get("ID") for record in records.get("Client", [])} | {None}
+        airline_ids = {record.get("ID") for record in records.get("Airline", [])} | {None}
+        flights = [flight for flight in records.get("Flight", [])
+                   if flight.get("Client_ID") in client_ids and flight.get("Airline_ID") in airline_ids]
+        skipped = len(records.get("Flight", [])) - len(flights)
+        if skipped:
+            print(f"Skipped {skipped} flights whose client or airline does not exist.")
+        try:
+            with self.conn:
+                self.conn.execute("DELETE FROM flights")
+                self.conn.execute("DELETE FROM clients")
+                self.conn.execute("DELETE FROM airlines")
+                self._insert("Client", [r for r in records.get("Client", []) if "ID" in r])
+                self._insert("Airline", [r for r in records.get("Airline", []) if "ID" in r])
+                self._insert("Flight", flights)
+                self._save_sequence((RecordStore(records) if SEQUENCE_KEY not in records else records).get(SEQUENCE_KEY))
+            return True
+        except sqlite3.Error as e:
+            print(f"Error saving to database: {e}")
+            return False
+
+    def compact(self, records, force=False):
+        # Edits go straight into the tables; only the WAL file can be folded in
+        if force:
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self):
+        self.conn.close()
+
+
+class RemoteBackend(StorageBackend):
+    """
+    The records of a running record server (server.py), over HTTP.
+    load() copies the server's records; edits are made to the copy as with
+    the other backends, then sent to the server as journal entries, which
+    it checks, applies to its own records and saves. Edits made by other
+    clients only show in the copy once it is loaded again.
+    """
+
+    def __init__(self, url=DEFAULT_SERVER_URL, timeout=30):
+        """
+        :param url: the server, e.g. http://127.0.0.1:8765
+        :param timeout: seconds to wait for an answer
+        """
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def request(self, method, path, payload=None):
+        """
+        Send one request to the server. Raises OSError if it could not be
+        answered, with the server's error message if it gave one.
+        :param method: GET, POST, PATCH or DELETE
+        :param path: the path and query, e.g. /records/Client?limit=10
+        :param payload: the JSON body
+        :return: the JSON answer
+        """
+        import urllib.error
+        import urllib.request
+
+        data = json.dumps(payload).encode() if payload is not None else None
+        request = urllib.request.Request(self.url + path, data=data, method=method,
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.load(response)
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.load(e).get("error")
+            except ValueError:
+                message = e.reason
+            raise OSError(f"{method} {path} failed: {e.code} {message}") from None
+
+    def load(self, compact=False, progress=None):
+        records = {}
+        for record_type in ("Client", "Airline", "Flight"):
+            records[record_type] = []
+            cursor = None
+            while True:
+                path = f"/records/{record_type}?limit={REMOTE_PAGE_SIZE}"
+                page = self.request("GET", path + (f"&cursor={cursor}" if cursor else ""))
+                batch = page["records"]
+                if progress is not None and batch:
+                    progress(record_type, batch)
+                if compact:
+                    batch = [to_compact(record_type, record) for record in batch]
+                records[record_type].extend(batch)
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    break
+        records[SEQUENCE_KEY] = self.request("GET", "/stats")[SEQUENCE_KEY]
+        if progress is not None:
+            progress(None, None)
+        return RecordStore(records, compact)
+
+    def write(self, entries):
+        self.request("POST", "/journal", {"entries": entries})
+
+    def compact(self, records, force=False):
+        # The server folds its journal in as it saves; force asks it to now
+        if force:
+            self.request("POST", "/compact")
+
+    def save(self, records):
+        print("The records of a server cannot be replaced; import them on the server instead.")
+        return False
+
+
+def open_backend(environ=os.environ):
+    """
+    Open the backend chosen by the RMS_BACKEND, RMS_DATA_PATH,
+    RMS_JOURNAL_PATH and RMS_SERVER_URL environment variables
+    :param environ: the environment to read
+    :return: a StorageBackend
+    """
+    kind = environ.get("RMS_BACKEND", "json").lower()
+    if kind == "sqlite":
+        return SQLiteBackend(environ.get("RMS_DATA_PATH", "records.db"))
+    if kind == "remote":
+        return RemoteBackend(environ.get("RMS_SERVER_URL", DEFAULT_SERVER_URL))
+    if kind != "json":
+        raise ValueError(f"Unknown backend {kind!r}, expected json, sqlite or remote")
+    return JsonBackend(environ.get("RMS_DATA_PATH", DEFAULT_DATA_PATH),
+                       environ.get("RMS_JOURNAL_PATH", DEFAULT_JOURNAL_PATH))
+
+
+def migrate_json_to_sqlite(json_path, db_path, journal_path=DEFAULT_JOURNAL_PATH):
+    """
+    Copy the records of a JSON file into a SQLite database, with the edits
+    of its journal that have not been compacted into it yet
+    :param json_path: the JSON snapshot, e.g. data/test_records.json
+    :param db_path: the database to create or replace the records of
+    :param journal_path: the journal of the snapshot
+    :return: True if the records were copied
+    """
+    records = JsonBackend(json_path, journal_path).load()
+    backend = SQLiteBackend(db_path)
+    try:
+        return backend.save(records)
+    finally:
+        backend.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record storage backends")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    migrate = subcommands.add_parser("migrate", help="Copy a JSON records file into a SQLite database")
+    migrate.add_argument("json_path")
+    migrate.add_argument("db_path")
+    migrate.add_argument("--journal", default=DEFAULT_JOURNAL_PATH, help="the journal of the JSON file")
+    args = parser.parse_args()
+    if args.command == "migrate":
+        raise SystemExit(0 if migrate_json_to_sqlite(args.json_path, args.db_path, args.journal) else 1)
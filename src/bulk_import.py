@@ -0,0 +1,334 @@
+"""
+Bulk import of clients, airlines and flights from CSV or JSON Lines files.
+
+Rows are read in batches: each batch is parsed and checked with the rules
+of the create form (records.missing_fields, numeric parent IDs, and flight
+dates, which are turned into the ISO form the flight indexes sort by), then
+the clients and airlines of the batch get a block of IDs at once, the
+parents of each flight are looked up, and the records are added to the
+RecordStore. Rejected rows are collected in the report and the import goes
+on.
+
+Parsing and checking a batch does not need the records, so with
+workers > 1 it runs in a ProcessPoolExecutor while this process adds the
+batches in file order. IDs are therefore the same whatever the number of
+workers.
+
+The record type of a row comes from the record_type argument or, if that
+is not given, from the row's "Type" column. An "ID" given for a client or
+airline is not kept; the record gets the next free ID, and flights later in
+the same import that refer to the old ID are pointed at the new one.
+
+From the command line the records are loaded through the configured
+backend (see backends.py), the files imported in order and one snapshot
+saved at the end:
+python src/bulk_import.py clients.csv flights.jsonl --workers 4
+"""
+
+import argparse
+import csv
+import json
+import os
+from collections import deque
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+
+from records import INDEXED_TYPES, SEQUENCE_KEY, RecordStore, missing_fields, validate_input
+
+# Rows validated and added together
+IMPORT_BATCH_SIZE = 10000
+
+# File extension -> format
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+
+class ImportReport:
+    """
+    The outcome of a bulk import.
+    created: {record type: number of records added}
+    rejected: (source, line, reason) for each row that was not imported
+    id_map: {(record type, ID in the file): ID given}
+    """
+
+    def __init__(self, id_map=None):
+        self.created = {"Client": 0, "Airline": 0, "Flight": 0}
+        self.rejected = []
+        self.id_map = {} if id_map is None else id_map
+
+    def __repr__(self):
+        return f"ImportReport(created={self.created}, rejected={len(self.rejected)})"
+
+    def summary(self):
+        """
+        :return: a one line description of the import
+        """
+        created = ", ".join(f"{count} {record_type}" for record_type, count in self.created.items())
+        return f"Imported {created}; rejected {len(self.rejected)} rows"
+
+
+def detect_format(path):
+    """
+    :param path: the file to import
+    :return: csv or jsonl, from the file extension
+    """
+    fmt = FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"Cannot tell the format of {path}, use .csv or .jsonl or pass fmt")
+    return fmt
+
+
+def read_chunks(path, fmt=None, chunk_size=IMPORT_BATCH_SIZE):
+    """
+    Read a file in chunks of unparsed lines, to be parsed by parse_chunk
+    :param path: a CSV file with a header row, or a JSON Lines file
+    :param fmt: csv or jsonl, guessed from the extension if None
+    :param chunk_size: the number of lines in a chunk
+    :return: a generator of (header, lines); header is the CSV column names
+        (None for JSON Lines) and lines a list of (line number, text) for
+        JSON Lines or (line number, values) for CSV
+    """
+    fmt = fmt or detect_format(path)
+    if fmt not in ("csv", "jsonl"):
+        raise ValueError(f"Unknown import format {fmt!r}, expected csv or jsonl")
+    with open(path, newline='', encoding='utf-8') as f:
+        header = None
+        if fmt == "csv":
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return
+            numbered = ((reader.line_num, values) for values in reader if values)
+        else:
+            numbered = ((line_number, line) for line_number, line in enumerate(f, 1) if line.strip())
+        while True:
+            lines = list(islice(numbered, chunk_size))
+            if not lines:
+                return
+            yield header, lines
+
+
+def parse_chunk(header, lines):
+    """
+    Parse the lines of a chunk from read_chunks
+    :return: a list of (line number, row, error); row is None and error
+        says why when a line cannot be read
+    """
+    rows = []
+    if header is not None:
+        width = len(header)
+        for line_number, values in lines:
+            if len(values) > width:
+                rows.append((line_number, None, "more values than columns"))
+            else:
+                # Missing trailing values are None, as csv.DictReader leaves them
+                rows.append((line_number, dict(zip(header, values + [None] * (width - len(values)))), None))
+        return rows
+    for line_number, line in lines:
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            rows.append((line_number, None, f"invalid JSON: {e}"))
+            continue
+        if isinstance(row, Mapping):
+            rows.append((line_number, row, None))
+        else:
+            rows.append((line_number, None, "not a JSON object"))
+    return rows
+
+
+def iter_rows(path, fmt=None):
+    """
+    Read the rows of a file one at a time
+    :param path: a CSV file with a header row, or a JSON Lines file
+    :param fmt: csv or jsonl, guessed from the extension if None
+    :return: a generator of (line number, row, error); row is None and
+        error says why when a line cannot be read
+    """
+    for header, lines in read_chunks(path, fmt):
+        yield from parse_chunk(header, lines)
+
+
+def _normalise_date(value):
+    """
+    :param value: a flight date such as "2025-10-15 09:00" or "2025-10-15"
+    :return: the ISO form the flight indexes sort by, e.g.
+        "2025-10-15T09:00:00", or None if it is not a date
+    """
+    try:
+        return datetime.fromisoformat(value).isoformat()
+    except (TypeError, ValueError):
+        return None
+
+
+def check_chunk(header, lines, record_type=None):
+    """
+    Parse and validate a chunk from read_chunks without touching the
+    records, so it can run in a worker process
+    :param header: the CSV column names, None for JSON Lines
+    :param lines: the lines of the chunk
+    :param record_type: the type of every row, or None to read each row's "Type"
+    :return: (valid, rejected); valid maps each record type to the
+        (line number, record, ID in the file) of its rows in file order,
+        with Client_ID and Airline_ID as ints and the Date in ISO form;
+        rejected is a list of (line number, reason)
+    """
+    valid = {"Client": [], "Airline": [], "Flight": []}
+    rejected = []
+    for line_number, row, error in parse_chunk(header, lines):
+        if error:
+            rejected.append((line_number, error))
+            continue
+        row_type = record_type or row.get("Type")
+        if row_type not in valid:
+            rejected.append((line_number, f"unknown record type {row_type!r}"))
+            continue
+        missing = missing_fields(row_type, row)
+        if missing:
+            rejected.append((line_number, f"missing {', '.join(missing)}"))
+            continue
+        record = dict(row)
+        record["Type"] = row_type
+        source_id = None
+        if row_type == "Flight":
+            reason = None
+            for field in ("Client_ID", "Airline_ID"):
+                parent_id = validate_input(record.get(field))
+                if parent_id is None or parent_id == -1:
+                    reason = f"{field} {record.get(field)!r} is not a number"
+                    break
+                record[field] = parent_id
+            if reason is None and record.get("Date"):
+                date = _normalise_date(record["Date"])
+                if date is None:
+                    reason = f"Date {record['Date']!r} is not an ISO date"
+                record["Date"] = date
+            if reason:
+                rejected.append((line_number, reason))
+                continue
+        else:
+            source_id = validate_input(record.pop("ID", None))
+            if source_id == -1:
+                source_id = None
+        valid[row_type].append((line_number, record, source_id))
+    return valid, rejected
+
+
+def _add_checked(store, valid, source, report):
+    """
+    Add the rows check_chunk passed, giving IDs in file order and checking
+    that the parents of each flight exist
+    """
+    # Parents first, so flights of the chunk can refer to them
+    for row_type in INDEXED_TYPES:
+        rows = valid[row_type]
+        for new_id, (line_number, record, source_id) in zip(store.allocate_ids(row_type, len(rows)), rows):
+            if source_id is not None:
+                report.id_map[(row_type, source_id)] = new_id
+            record["ID"] = new_id
+            store.add_record(row_type, record)
+        report.created[row_type] += len(rows)
+
+    id_map = report.id_map
+    for line_number, record, _ in valid["Flight"]:
+        client_id = id_map.get(("Client", record["Client_ID"]), record["Client_ID"])
+        airline_id = id_map.get(("Airline", record["Airline_ID"]), record["Airline_ID"])
+        if store.get_record("Client", client_id) is None:
+            report.rejected.append((source, line_number, f"no Client with ID {client_id}"))
+            continue
+        if store.get_record("Airline", airline_id) is None:
+            report.rejected.append((source, line_number, f"no Airline with ID {airline_id}"))
+            continue
+        record["Client_ID"] = client_id
+        record["Airline_ID"] = airline_id
+        store.add_record("Flight", record)
+        report.created["Flight"] += 1
+
+
+def _check_in_pool(pool, chunks, record_type, workers):
+    """
+    Check chunks in worker processes, keeping at most two per worker in
+    flight so the file is not read ahead into memory
+    :return: a generator of the check_chunk results in file order
+    """
+    pending = deque()
+    for header, lines in chunks:
+        pending.append(pool.submit(check_chunk, header, lines, record_type))
+        if len(pending) >= workers * 2:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def bulk_import(records_json, path, record_type=None, fmt=None, batch_size=IMPORT_BATCH_SIZE, report=None,
+                workers=1):
+    """
+    Import the rows of a CSV or JSON Lines file into the records
+    :param records_json: a RecordStore, or the nested records dict
+    :param path: the file to import
+    :param record_type: the type of every row, or None to read each row's "Type"
+    :param fmt: csv or jsonl, guessed from the extension if None
+    :param batch_size: the number of lines validated and added together
+    :param report: the ImportReport of an earlier file of the same import,
+        so flights can refer to the clients and airlines it imported
+    :param workers: the number of processes parsing and validating the
+        batches; with more than one the records are still added, and IDs
+        given, in file order by this process, so the result is the same
+    :return: the ImportReport
+    """
+    report = report if report is not None else ImportReport()
+    for missing_type in ("Client", "Airline", "Flight"):
+        records_json.setdefault(missing_type, [])
+    store = records_json if isinstance(records_json, RecordStore) else RecordStore(records_json)
+    # Updating the text index row by row is slower than building it again
+    rebuild_text_index = store.text_index is not None
+    store.text_index = None
+    first_rejected = len(report.rejected)
+    pool = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        chunks = read_chunks(path, fmt, batch_size)
+        if pool is None:
+            checked = (check_chunk(header, lines, record_type) for header, lines in chunks)
+        else:
+            checked = _check_in_pool(pool, chunks, record_type, workers)
+        for valid, rejected in checked:
+            report.rejected.extend((path, line_number, reason) for line_number, reason in rejected)
+            _add_checked(store, valid, path, report)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        # Rows unreadable and rows invalid are found at different times
+        report.rejected[first_rejected:] = sorted(report.rejected[first_rejected:], key=lambda rejected: rejected[1])
+        if rebuild_text_index:
+            store.build_text_index()
+        if store is not records_json:
+            # Keep the sequence with the caller's records so it is saved with them
+            records_json[SEQUENCE_KEY] = store[SEQUENCE_KEY]
+    return report
+
+
+if __name__ == "__main__":
+    from backends import open_backend
+
+    parser = argparse.ArgumentParser(description="Import clients, airlines and flights from CSV or JSON Lines files")
+    parser.add_argument("paths", nargs="+", help="files imported in order, e.g. clients before their flights")
+    parser.add_argument("--type", dest="record_type", choices=("Client", "Airline", "Flight"),
+                        help="the type of every row, instead of each row's Type column")
+    parser.add_argument("--format", dest="fmt", choices=("csv", "jsonl"), help="the format of every file")
+    parser.add_argument("--workers", type=int, default=1, metavar="N",
+                        help="processes parsing and validating rows (default 1)")
+    parser.add_argument("--show-rejected", type=int, default=20, metavar="N", help="print the first N rejected rows")
+    args = parser.parse_args()
+
+    backend = open_backend()
+    records = backend.load()
+    report = ImportReport()
+    for path in args.paths:
+        bulk_import(records, path, args.record_type, args.fmt, report=report, workers=args.workers)
+    for source, line_number, reason in report.rejected[:args.show_rejected]:
+        print(f"{source}:{line_number}: {reason}")
+    print(report.summary())
+    saved = backend.save(records)
+    backend.close()
+    raise SystemExit(0 if saved else 1)
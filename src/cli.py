@@ -0,0 +1,359 @@
+"""
+Command line interface for scripts and batch jobs, without the GUI.
+
+Run from the repository root:
+
+python -m src search Client 3
+python -m src search Client --text "emma lon"
+python -m src create Airline "Company Name=Sky Air"
+python -m src update Client --client-id 3 City=Leeds
+python -m src delete Airline --airline-id 2 --on-delete nullify
+python -m src import clients.csv flights.jsonl --workers 4
+python -m src export flights.csv --type Flight --from 2025-10-01
+python -m src compact
+python -m src check
+python -m src serve --port 8765
+python -m src --backend remote search Client 3
+
+The backend is chosen as for the GUI (RMS_BACKEND, RMS_DATA_PATH,
+RMS_JOURNAL_PATH and RMS_SERVER_URL, see backends.py) or with --backend,
+--data, --journal and --server.
+Records are printed as JSON Lines. Edits are saved through the backend as
+the journal entries the GUI writes, so both see the same data.
+
+Nothing but argparse and json is imported up front: each subcommand imports
+the modules it needs when it runs, so a lookup does not pay for tkinter,
+the import process pool or the export writers.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+RECORD_TYPES = ("Client", "Airline", "Flight")
+
+
+def _field(text):
+    """
+    Parse a FIELD=VALUE argument
+    """
+    field, sep, value = text.partition("=")
+    if not sep or not field:
+        raise argparse.ArgumentTypeError(f"{text!r} is not FIELD=VALUE")
+    return field, value
+
+
+def _id_range(text):
+    """
+    Parse an ID range such as 10-20, see export.parse_id_range
+    """
+    from export import parse_id_range
+    return parse_id_range(text)
+
+
+def open_backend(args):
+    """
+    Open the backend chosen by the environment, overridden by the options
+    :return: a StorageBackend
+    """
+    from backends import open_backend as open_configured
+
+    environ = dict(os.environ)
+    for option, variable in (("backend", "RMS_BACKEND"), ("data", "RMS_DATA_PATH"), ("journal", "RMS_JOURNAL_PATH"),
+                             ("server", "RMS_SERVER_URL")):
+        if getattr(args, option):
+            environ[variable] = getattr(args, option)
+    return open_configured(environ)
+
+
+def print_records(records_list):
+    """
+    Print records as JSON Lines
+    """
+    from compact import to_dict
+
+    for record in records_list:
+        print(json.dumps(to_dict(record) if record is not None else None))
+
+
+def search(args, backend):
+    """
+    Print the record with an ID (the flights of a client for Flight), the
+    records matching --text, or with --join a client's itinerary or an
+    airline's manifest
+    """
+    from records import airline_manifest, client_itinerary, search_records, search_text
+
+    records = backend.load()
+    if args.text is not None:
+        results = search_text(records, args.text, args.record_type, args.limit)
+    elif args.id is None:
+        print("Give an ID or --text")
+        return 2
+    elif args.join and args.record_type in ("Client", "Airline"):
+        join = client_itinerary if args.record_type == "Client" else airline_manifest
+        results = join(records, args.id)
+        if results != -1:
+            other = "airline" if args.record_type == "Client" else "client"
+            from compact import to_dict
+            for flight, record in results:
+                print(json.dumps({"flight": to_dict(flight), other: to_dict(record) if record is not None else None}))
+            return 0
+    else:
+        results = search_records(records, args.id, args.record_type)
+    if results == -2:
+        print(f"No such type {args.record_type}")
+        return 1
+    if results == -1 or not results:
+        print("No record found")
+        return 1
+    print_records(results)
+    return 0
+
+
+def create(args, backend):
+    """
+    Create a record from FIELD=VALUE arguments and save it
+    """
+    from records import create_record, missing_fields
+
+    data = dict(args.fields)
+    # The same rules as the GUI's create form and bulk_import
+    missing = missing_fields(args.record_type, data)
+    if missing:
+        print(f"Missing fields for {args.record_type}: {', '.join(missing)}")
+        return 1
+    records = backend.load()
+    result = create_record(records, data, args.record_type)
+    if result != "Entry has been created successfully":
+        print(f"Could not create the {args.record_type} record ({result})")
+        return 1
+    record = records[args.record_type][-1]
+    if not backend.apply(records, {"op": "create", "type": args.record_type, "record": record}):
+        return 1
+    print_records([record])
+    return 0
+
+
+def update(args, backend):
+    """
+    Update a record from FIELD=VALUE arguments and save it
+    """
+    from records import update_record, validate_input
+
+    records = backend.load()
+    data = dict(args.fields)
+    if args.record_type == "Flight":
+        # A flight may only be moved to an existing client or airline, as
+        # in create_record and bulk_update_records
+        for parent_type, field in (("Client", "Client_ID"), ("Airline", "Airline_ID")):
+            if field in data:
+                parent_id = validate_input(data[field])
+                if records.get_record(parent_type, parent_id) is None:
+                    print(f"No {parent_type} found with {field} {data[field]}")
+                    return 1
+                data[field] = parent_id
+    result = update_record(records, args.record_type, data, client_id=args.client_id, airline_id=args.airline_id)
+    if result == -2:
+        print(f"No such type {args.record_type}")
+        return 1
+    if result != 1:
+        print(f"No {args.record_type} found with that ID")
+        return 1
+    entry = {"op": "update", "type": args.record_type, "data": data,
+             "client_id": args.client_id, "airline_id": args.airline_id}
+    return 0 if backend.apply(records, entry) else 1
+
+
+def delete(args, backend):
+    """
+    Delete a client, airline or the flights of a client with an airline
+    and save the change
+    """
+    from records import ChangeSet, delete_record
+
+    records = backend.load()
+    changes = ChangeSet()
+    result = delete_record(records, args.record_type, client_id=args.client_id, airline_id=args.airline_id,
+                           changes=changes, on_delete=args.on_delete)
+    if result == -3:
+        print("Refused: the record still has flights, use --on-delete cascade or nullify")
+        return 1
+    if not changes:
+        print(f"No {args.record_type} found with that ID")
+        return 1
+    entry = {"op": "delete", "type": args.record_type, "client_id": args.client_id, "airline_id": args.airline_id}
+    if args.record_type != "Flight" and args.on_delete:
+        entry["on_delete"] = args.on_delete
+    if not backend.apply(records, entry):
+        return 1
+    flights = changes.for_type("Flight")
+    print(f"Deleted {len(changes.removed) - len(flights.removed)} {args.record_type} records, "
+          f"{len(flights.removed)} flights; {len(flights.updated)} flights kept without it")
+    return 0
+
+
+def import_files(args, backend):
+    """
+    Import CSV or JSON Lines files and save a snapshot
+    """
+    from bulk_import import ImportReport, bulk_import
+
+    records = backend.load()
+    report = ImportReport()
+    for path in args.paths:
+        bulk_import(records, path, args.record_type, args.fmt, report=report, workers=args.workers)
+    for source, line_number, reason in report.rejected[:args.show_rejected]:
+        print(f"{source}:{line_number}: {reason}")
+    print(report.summary())
+    return 0 if backend.save(records) else 1
+
+
+def export(args, backend):
+    """
+    Export the filtered records to a file or standard output
+    """
+    from export import RECORD_TYPES as EXPORT_TYPES, export_records
+
+    records = backend.load(compact=True)
+    date_range = (args.start_date, args.end_date) if args.start_date or args.end_date else None
+    count = export_records(records, args.path, args.record_types or EXPORT_TYPES, args.fmt,
+                           args.ids, date_range, args.city)
+    print(f"Exported {count} records", file=sys.stderr)
+    return 0
+
+
+def compact(args, backend):
+    """
+    Fold the journal (or SQLite's write-ahead log) into the stored records
+    """
+    records = backend.load(compact=True)
+    backend.compact(records, force=True)
+    print("Compacted")
+    return 0
+
+
+def check(args, backend):
+    """
+    Check the stored records for orphan flights, bad IDs and a stale ID
+    sequence
+    """
+    from collections.abc import Mapping
+    from integrity import check_integrity
+
+    # Not load(): indexing the records would repair a stale sequence first
+    records = backend.load_stored(compact=True)
+    if not isinstance(records, Mapping):
+        records = {"Client": records}
+    found = check_integrity(records)
+    for record_type, position, message in found:
+        where = record_type if position is None else f"{record_type}[{position}]"
+        print(f"{where}: {message}")
+    print(f"{len(found)} problems found")
+    return 1 if found else 0
+
+
+def serve(args, backend):
+    """
+    Serve the records over HTTP to several clients until interrupted, see
+    server.py
+    """
+    import asyncio
+    from server import serve as serve_records
+
+    try:
+        asyncio.run(serve_records(backend, args.host, args.port, args.commit_delay))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def build_parser():
+    """
+    :return: the argparse parser of every subcommand
+    """
+    parser = argparse.ArgumentParser(prog="python -m src", description="Record management without the GUI")
+    parser.add_argument("--backend", choices=("json", "sqlite", "remote"), help="overrides RMS_BACKEND")
+    parser.add_argument("--data", help="the JSON snapshot or SQLite database, overrides RMS_DATA_PATH")
+    parser.add_argument("--journal", help="the journal of the JSON backend, overrides RMS_JOURNAL_PATH")
+    parser.add_argument("--server", help="the server of the remote backend, overrides RMS_SERVER_URL")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    command = subcommands.add_parser("search", help="print records by ID or text")
+    command.add_argument("record_type", choices=RECORD_TYPES)
+    command.add_argument("id", nargs="?", help="the ID, or the Client_ID of flights")
+    command.add_argument("--text", help="search names, cities, phone numbers and zip codes instead")
+    command.add_argument("--limit", type=int, default=100, help="the most --text results (default 100)")
+    command.add_argument("--join", action="store_true",
+                         help="print a client's flights with their airline, or an airline's with their client")
+    command.set_defaults(run=search)
+
+    for name, run, help_text in (("create", create, "create a record"), ("update", update, "update a record")):
+        command = subcommands.add_parser(name, help=help_text)
+        command.add_argument("record_type", choices=RECORD_TYPES)
+        command.add_argument("fields", nargs="+", type=_field, metavar="FIELD=VALUE")
+        if name == "update":
+            command.add_argument("--client-id", type=int)
+            command.add_argument("--airline-id", type=int)
+        command.set_defaults(run=run)
+
+    command = subcommands.add_parser("delete", help="delete a client, an airline or a client's flights with an airline")
+    command.add_argument("record_type", choices=RECORD_TYPES)
+    command.add_argument("--client-id", type=int)
+    command.add_argument("--airline-id", type=int)
+    command.add_argument("--on-delete", choices=("cascade", "restrict", "nullify"),
+                         help="what happens to the flights of a deleted client or airline (default cascade)")
+    command.set_defaults(run=delete)
+
+    command = subcommands.add_parser("import", help="import CSV or JSON Lines files")
+    command.add_argument("paths", nargs="+", help="files imported in order, e.g. clients before their flights")
+    command.add_argument("--type", dest="record_type", choices=RECORD_TYPES,
+                         help="the type of every row, instead of each row's Type column")
+    command.add_argument("--format", dest="fmt", choices=("csv", "jsonl"), help="the format of every file")
+    command.add_argument("--workers", type=int, default=1, metavar="N", help="processes checking rows (default 1)")
+    command.add_argument("--show-rejected", type=int, default=20, metavar="N", help="print the first N rejected rows")
+    command.set_defaults(run=import_files)
+
+    command = subcommands.add_parser("export", help="export records to CSV, JSON Lines or a gzip snapshot")
+    command.add_argument("path", help="the file to write (.csv, .jsonl or .json.gz), - for standard output")
+    command.add_argument("--type", dest="record_types", action="append", choices=RECORD_TYPES,
+                         help="a record type to export, may be repeated; all types if not given")
+    command.add_argument("--format", dest="fmt", choices=("csv", "jsonl", "json.gz"))
+    command.add_argument("--ids", type=_id_range, help="IDs to export, e.g. 10-20 (Client_ID for flights)")
+    command.add_argument("--from", dest="start_date", help="first flight date to export, e.g. 2025-10-01")
+    command.add_argument("--to", dest="end_date", help="flight date to stop before, e.g. 2025-11-01")
+    command.add_argument("--city", help="clients in this city, flights from or to it")
+    command.set_defaults(run=export)
+
+    command = subcommands.add_parser("compact", help="fold the journal into the snapshot")
+    command.set_defaults(run=compact)
+
+    command = subcommands.add_parser("check", help="check the references between flights, clients and airlines")
+    command.set_defaults(run=check)
+
+    command = subcommands.add_parser("serve", help="serve the records over HTTP to several clients")
+    command.add_argument("--host", default="127.0.0.1")
+    command.add_argument("--port", type=int, default=8765)
+    command.add_argument("--commit-delay", type=float, default=0.005, metavar="SECONDS",
+                         help="how long a commit waits for more edits to save with it (default 0.005)")
+    command.set_defaults(run=serve)
+    return parser
+
+
+def main(argv=None):
+    """
+    Run one subcommand
+    :param argv: the arguments, sys.argv[1:] if None
+    :return: the exit status
+    """
+    args = build_parser().parse_args(argv)
+    backend = open_backend(args)
+    try:
+        return args.run(args, backend)
+    finally:
+        backend.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,168 @@
+"""
+Compact in-memory representation of Client, Airline and Flight records.
+
+A plain dict repeats every key ("Address Line 1", "Zip Code", ...) in each
+record. The classes here keep the values of the known fields in __slots__
+instead and intern the strings that repeat across records, such as cities
+and countries. They behave like dicts for the rest of the program: .get(),
+[] access, .update(), .items() and == against a dict all work, and
+to_dict() gives back the exact JSON shape written by storage.py.
+"""
+
+import sys
+from collections.abc import Mapping, MutableMapping
+
+CLIENT_FIELDS = ("ID", "Type", "Name", "Address Line 1", "Address Line 2", "Address Line 3",
+                 "City", "State", "Zip Code", "Country", "Phone Number")
+AIRLINE_FIELDS = ("ID", "Type", "Company Name")
+FLIGHT_FIELDS = ("Client_ID", "Airline_ID", "Type", "Date", "Start City", "End City")
+
+# Field values shared by many records, stored once
+INTERNED_FIELDS = frozenset({"Type", "City", "State", "Country", "Date", "Start City", "End City"})
+
+
+def _slot_names(fields):
+    """
+    Return one slot name per field; field names contain spaces
+    :param fields: the JSON keys of the record type
+    :return: a tuple of valid attribute names
+    """
+    return tuple(f"_f{position}" for position in range(len(fields)))
+
+
+class CompactRecord(MutableMapping):
+    """
+    Base class of the slotted record types.
+    Keys that are not in FIELDS are kept in a small dict so nothing is lost.
+    """
+
+    __slots__ = ("_extra",)
+    FIELDS = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._SLOTS = tuple(zip(cls.FIELDS, _slot_names(cls.FIELDS)))
+        cls._SLOT_FOR = dict(cls._SLOTS)
+
+    def __init__(self, data=()):
+        self._extra = None
+        items = data.items() if isinstance(data, Mapping) else data
+        for key, value in items:
+            self[key] = value
+
+    def __getitem__(self, key):
+        slot = self._SLOT_FOR.get(key)
+        if slot is not None:
+            try:
+                return getattr(self, slot)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        slot = self._SLOT_FOR.get(key)
+        if slot is not None:
+            return getattr(self, slot, default)
+        if self._extra is not None:
+            return self._extra.get(key, default)
+        return default
+
+    def __setitem__(self, key, value):
+        if type(value) is str and key in INTERNED_FIELDS:
+            value = sys.intern(value)
+        slot = self._SLOT_FOR.get(key)
+        if slot is not None:
+            setattr(self, slot, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        slot = self._SLOT_FOR.get(key)
+        if slot is not None:
+            try:
+                delattr(self, slot)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        slot = self._SLOT_FOR.get(key)
+        if slot is not None:
+            return hasattr(self, slot)
+        return self._extra is not None and key in self._extra
+
+    def __iter__(self):
+        for key, slot in self._SLOTS:
+            if hasattr(self, slot):
+                yield key
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    def to_dict(self):
+        """
+        :return: the record as the plain dict stored in the JSON file
+        """
+        return {key: self[key] for key in self}
+
+    def copy(self):
+        """
+        :return: a shallow copy of the record of the same type
+        """
+        return type(self)(self)
+
+
+class CompactClient(CompactRecord):
+    __slots__ = _slot_names(CLIENT_FIELDS)
+    FIELDS = CLIENT_FIELDS
+
+
+class CompactAirline(CompactRecord):
+    __slots__ = _slot_names(AIRLINE_FIELDS)
+    FIELDS = AIRLINE_FIELDS
+
+
+class CompactFlight(CompactRecord):
+    __slots__ = _slot_names(FLIGHT_FIELDS)
+    FIELDS = FLIGHT_FIELDS
+
+
+RECORD_CLASSES = {"Client": CompactClient, "Airline": CompactAirline, "Flight": CompactFlight}
+
+
+def to_compact(record_type, record):
+    """
+    Convert a record dict to the compact class of its type.
+    Records that are already compact, of an unknown type or not dicts are
+    returned unchanged.
+    :param record_type: Client, Airline or Flight
+    :param record: the record to convert
+    :return: the compact record
+    """
+    record_class = RECORD_CLASSES.get(record_type)
+    if record_class is None or isinstance(record, CompactRecord) or not isinstance(record, dict):
+        return record
+    return record_class(record)
+
+
+def to_dict(record):
+    """
+    Convert a compact record back to a plain dict
+    :param record: a compact record or a dict
+    :return: the record as a dict
+    """
+    if isinstance(record, CompactRecord):
+        return record.to_dict()
+    return record
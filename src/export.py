@@ -0,0 +1,290 @@
+"""
+Streaming export of records to CSV, JSON Lines or a gzip compressed JSON
+snapshot.
+
+The records to export are chosen with filters:
+record types, an ID range (the ID of clients and airlines, the Client_ID
+of flights, as search_records matches them), a date range and a city
+(City of clients, Start City or End City of flights).
+
+Records are found through the same RecordStore indexes the searches use
+(get_record, flights_for_client and query_flights) and written one at a
+time by generators, so memory use does not grow with the size of the
+export.
+
+From the command line:
+python src/export.py flights.csv --type Flight --from 2025-10-01 --to 2025-11-01 --city London
+python src/export.py backup.json.gz
+"""
+
+import argparse
+import csv
+import gzip
+import heapq
+import json
+import sys
+from collections.abc import Mapping
+
+from compact import AIRLINE_FIELDS, CLIENT_FIELDS, FLIGHT_FIELDS, to_dict
+from records import SEQUENCE_KEY, RecordStore, date_key
+from storage import JOURNAL_SEQ_KEY
+
+# Columns of the CSV export of each record type
+CSV_COLUMNS = {"Client": CLIENT_FIELDS, "Airline": AIRLINE_FIELDS, "Flight": FLIGHT_FIELDS}
+
+# Flights fetched from the date index at a time
+EXPORT_PAGE_SIZE = 10000
+
+# gzip level of snapshots; 9 is several times slower for a few percent
+EXPORT_COMPRESS_LEVEL = 6
+
+RECORD_TYPES = ("Client", "Airline", "Flight")
+
+
+def detect_format(path):
+    """
+    :param path: the file to write
+    :return: csv, jsonl or json.gz, from the file extension
+    """
+    lowered = path.lower()
+    if lowered.endswith(".csv"):
+        return "csv"
+    if lowered.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    if lowered.endswith(".gz"):
+        return "json.gz"
+    raise ValueError(f"Cannot tell the format of {path}, use .csv, .jsonl or .json.gz or pass fmt")
+
+
+def iter_export(records_json, record_type, id_range=None, date_range=None, city=None):
+    """
+    Yield the records of one type that pass the filters
+    :param records_json: a RecordStore, or the nested records dict
+    :param record_type: Client, Airline or Flight
+    :param id_range: (first, last) IDs to include, either may be None
+    :param date_range: (start, end) flight dates, start included and end excluded
+    :param city: only clients in this city or flights from or to it
+    :return: a generator of records
+    """
+    store = records_json if isinstance(records_json, RecordStore) else RecordStore(records_json)
+    first_id, last_id = id_range or (None, None)
+    if record_type == "Flight":
+        if date_range is None and city is None and first_id is not None and last_id is not None:
+            flights = _flights_for_clients(store, first_id, last_id)
+        else:
+            flights = _flights_by_date(store, date_range or (None, None), city)
+        for flight in flights:
+            if _in_range(flight.get("Client_ID"), first_id, last_id):
+                yield flight
+        return
+
+    if date_range is not None:
+        # Only flights have a date
+        return
+    if first_id is not None and last_id is not None and last_id - first_id < len(store.get(record_type, [])):
+        candidates = (store.get_record(record_type, record_id) for record_id in range(first_id, last_id + 1))
+    else:
+        candidates = iter(store.get(record_type, []))
+    for record in candidates:
+        if not isinstance(record, Mapping):
+            continue
+        if not _in_range(record.get("ID"), first_id, last_id):
+            continue
+        if city is not None and record.get("City") != city:
+            continue
+        yield record
+
+
+def _in_range(value, first, last):
+    """
+    :return: True if value is within [first, last]; a None bound is open
+    """
+    if first is None and last is None:
+        return True
+    if not isinstance(value, int):
+        return False
+    return (first is None or value >= first) and (last is None or value <= last)
+
+
+def _flights_for_clients(store, first_id, last_id):
+    """
+    Yield the flights of the clients with IDs first_id to last_id
+    """
+    if last_id - first_id < len(store.flights_by_client):
+        client_ids = range(first_id, last_id + 1)
+    else:
+        # A range wider than the clients with flights; walk those instead
+        client_ids = sorted(client_id for client_id in store.flights_by_client
+                            if isinstance(client_id, int) and first_id <= client_id <= last_id)
+    for client_id in client_ids:
+        yield from store.flights_for_client(client_id)
+
+
+def _flights_by_date(store, date_range, city):
+    """
+    Yield flights in date order from the sorted indexes, a page at a time
+    """
+    start, end = date_range
+    if city is None:
+        yield from _pages(store, start, end)
+        return
+    # Flights leaving and arriving in the city, merged by date; a flight
+    # from the city to itself is in both and is only yielded once
+    leaving = _pages(store, start, end, start_city=city)
+    arriving = (flight for flight in _pages(store, start, end, end_city=city)
+                if flight.get("Start City") != city)
+    yield from heapq.merge(leaving, arriving, key=lambda flight: date_key(flight.get("Date")))
+
+
+def _pages(store, start, end, start_city=None, end_city=None):
+    """
+    Yield the flights of a query_flights range without copying it all at once
+    """
+    offset = 0
+    while True:
+        page = store.query_flights(start, end, start_city, end_city, offset, EXPORT_PAGE_SIZE)
+        yield from page
+        if len(page) < EXPORT_PAGE_SIZE:
+            return
+        offset += len(page)
+
+
+_encode = json.JSONEncoder(separators=(',', ':')).encode
+
+
+def _json_record(record):
+    return _encode(to_dict(record))
+
+
+def write_csv(records, record_type, out):
+    """
+    Write records of one type as CSV with a header row
+    :param records: an iterable of records
+    :param record_type: their type, which picks the columns
+    :param out: a text file
+    :return: the number of records written
+    """
+    writer = csv.DictWriter(out, fieldnames=CSV_COLUMNS[record_type], extrasaction='ignore')
+    writer.writeheader()
+    count = 0
+    for record in records:
+        writer.writerow(record)
+        count += 1
+    return count
+
+
+def write_jsonl(records, out):
+    """
+    Write records as JSON Lines, one record per line
+    :param records: an iterable of records
+    :param out: a text file
+    :return: the number of records written
+    """
+    count = 0
+    for record in records:
+        out.write(_json_record(record))
+        out.write("\n")
+        count += 1
+    return count
+
+
+def write_snapshot(records_by_type, out, extra=None):
+    """
+    Write records in the shape of the records file: {"Client": [...], ...}
+    :param records_by_type: (record type, iterable of records) pairs
+    :param out: a text file
+    :param extra: other top level values of the records file, such as
+        "Next ID", written after the records
+    :return: the number of records written
+    """
+    count = 0
+    separator = ""
+    out.write("{")
+    for record_type, records in records_by_type:
+        out.write(f'{separator}{json.dumps(record_type)}:[')
+        separator = ","
+        for number, record in enumerate(records):
+            if number:
+                out.write(",")
+            out.write(_json_record(record))
+            count += 1
+        out.write("]")
+    for key, value in (extra or {}).items():
+        out.write(f'{separator}{json.dumps(key)}:{json.dumps(value)}')
+        separator = ","
+    out.write("}\n")
+    return count
+
+
+def export_records(records_json, path, record_types=RECORD_TYPES, fmt=None, id_range=None,
+                   date_range=None, city=None):
+    """
+    Export the filtered records to a file
+    :param records_json: a RecordStore, or the nested records dict
+    :param path: the file to write, "-" for standard output
+    :param record_types: the types to export; CSV takes exactly one
+    :param fmt: csv, jsonl or json.gz, guessed from the extension if None
+    :param id_range: (first, last) IDs to include
+    :param date_range: (start, end) flight dates, end excluded
+    :param city: only clients in this city or flights from or to it
+    :return: the number of records written
+    """
+    fmt = fmt or detect_format(path)
+    store = records_json if isinstance(records_json, RecordStore) else RecordStore(records_json)
+    selected = [(record_type, iter_export(store, record_type, id_range, date_range, city))
+                for record_type in record_types]
+    if fmt == "csv" and len(selected) != 1:
+        raise ValueError("A CSV export holds one record type, choose it with record_types")
+    if fmt not in ("csv", "jsonl", "json.gz"):
+        raise ValueError(f"Unknown export format {fmt!r}, expected csv, jsonl or json.gz")
+
+    if fmt == "json.gz":
+        # Restoring the snapshot must not hand out the IDs of deleted records again
+        extra = {key: store[key] for key in (SEQUENCE_KEY, JOURNAL_SEQ_KEY) if key in store}
+        if path == "-":
+            with gzip.open(sys.stdout.buffer, "wt", EXPORT_COMPRESS_LEVEL, encoding="utf-8") as out:
+                return write_snapshot(selected, out, extra)
+        with gzip.open(path, "wt", EXPORT_COMPRESS_LEVEL, encoding="utf-8") as out:
+            return write_snapshot(selected, out, extra)
+    out = sys.stdout if path == "-" else open(path, "w", newline="", encoding="utf-8")
+    try:
+        if fmt == "csv":
+            return write_csv(selected[0][1], selected[0][0], out)
+        return write_jsonl((record for _, records in selected for record in records), out)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+def parse_id_range(text):
+    """
+    Parse an ID range such as 10-20, 10- or -20
+    """
+    first, _, last = text.partition("-")
+    try:
+        return (int(first) if first else None, int(last) if last else None)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{text!r} is not an ID range such as 10-20") from None
+
+
+if __name__ == "__main__":
+    from backends import open_backend
+
+    parser = argparse.ArgumentParser(description="Export records to CSV, JSON Lines or a compressed JSON snapshot")
+    parser.add_argument("path", help="the file to write (.csv, .jsonl or .json.gz), - for standard output")
+    parser.add_argument("--type", dest="record_types", action="append", choices=RECORD_TYPES,
+                        help="a record type to export, may be repeated; all types if not given")
+    parser.add_argument("--format", dest="fmt", choices=("csv", "jsonl", "json.gz"))
+    parser.add_argument("--ids", type=parse_id_range, help="IDs to export, e.g. 10-20 (Client_ID for flights)")
+    parser.add_argument("--from", dest="start_date", help="first flight date to export, e.g. 2025-10-01")
+    parser.add_argument("--to", dest="end_date", help="flight date to stop before, e.g. 2025-11-01")
+    parser.add_argument("--city", help="clients in this city, flights from or to it")
+    args = parser.parse_args()
+
+    date_range = (args.start_date, args.end_date) if args.start_date or args.end_date else None
+    backend = open_backend()
+    records = backend.load(compact=True)
+    count = export_records(records, args.path, args.record_types or RECORD_TYPES, args.fmt,
+                           args.ids, date_range, args.city)
+    backend.close()
+    print(f"Exported {count} records", file=sys.stderr)
@@ -0,0 +1,266 @@
+"""
+Call counters and latency histograms for the hot paths.
+
+Set RMS_INSTRUMENT=1 to turn it on. When it is off, timed() returns the
+function unchanged and measure() returns a shared do-nothing context
+manager, so the instrumented code runs as if this module did not exist.
+
+records.py and storage.py time all their public functions and RecordStore
+methods through instrument_module(); main.py times its refresh and search
+paths with the @timed decorator and records its start-up stages with
+record(). The numbers are shown in the GUI's Performance panel
+and can be written to a JSON file with dump(), or at exit by setting
+RMS_INSTRUMENT_DUMP to a path:
+
+RMS_INSTRUMENT=1 RMS_INSTRUMENT_DUMP=perf.json python src/main.py
+"""
+
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+
+ENABLED = os.environ.get("RMS_INSTRUMENT", "").lower() in ("1", "true", "yes", "on")
+
+# Upper bounds of the histogram buckets in milliseconds (1-2-5 steps from
+# 1 microsecond to 10 seconds); slower calls go in one last bucket
+BUCKET_BOUNDS_MS = tuple(round(step * 10 ** power, 3) for power in range(-3, 4) for step in (1, 2, 5)) + (10000,)
+
+_NO_OP = nullcontext()
+_lock = threading.Lock()
+
+
+class Metric:
+    """
+    The calls of one instrumented function or block.
+    count: the number of calls
+    total_ms / max_ms: the summed and the longest duration
+    buckets: the number of calls per BUCKET_BOUNDS_MS bucket
+    """
+
+    __slots__ = ("name", "count", "total_ms", "max_ms", "buckets")
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+
+    def add(self, elapsed_ms):
+        """
+        Count one call that took elapsed_ms milliseconds
+        """
+        self.count += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+        self.buckets[bisect_left(BUCKET_BOUNDS_MS, elapsed_ms)] += 1
+
+    def percentile(self, fraction):
+        """
+        :param fraction: e.g. 0.95
+        :return: the upper bound of the bucket holding that fraction of
+            the calls, in milliseconds (the max for the last bucket)
+        """
+        if not self.count:
+            return 0.0
+        wanted = fraction * self.count
+        seen = 0
+        for position, calls in enumerate(self.buckets):
+            seen += calls
+            if seen >= wanted:
+                return BUCKET_BOUNDS_MS[position] if position < len(BUCKET_BOUNDS_MS) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self):
+        """
+        :return: the metric as JSON-ready values
+        """
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.count, 4) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "histogram": {f"<={bound}ms": calls for bound, calls in zip(BUCKET_BOUNDS_MS, self.buckets) if calls},
+            "slower": self.buckets[-1],
+        }
+
+
+# name -> Metric
+metrics = {}
+
+
+def record(name, elapsed_ms):
+    """
+    Count one call of name that took elapsed_ms milliseconds
+    """
+    with _lock:
+        metric = metrics.get(name)
+        if metric is None:
+            metric = metrics[name] = Metric(name)
+        metric.add(elapsed_ms)
+
+
+class _Timer:
+    """
+    The context manager returned by measure() when instrumentation is on
+    """
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record(self.name, (time.perf_counter() - self.start) * 1000)
+        return False
+
+
+def measure(name):
+    """
+    Time a block: with measure("main.refresh_treeview"): ...
+    :param name: the name the time is counted under
+    :return: a context manager
+    """
+    return _Timer(name) if ENABLED else _NO_OP
+
+
+def timed(name=None):
+    """
+    Decorator timing every call of a function. A generator function is
+    timed over the whole iteration of each generator it returns, counting
+    only the time spent inside it and not in the loop consuming it.
+    :param name: the name the time is counted under, module.qualname if None
+    :return: the decorator; it returns the function unchanged when
+        instrumentation is off
+    """
+    def decorate(func):
+        if not ENABLED:
+            return func
+        # Only needed when instrumenting, and slow to import
+        import inspect
+
+        metric_name = name or f"{func.__module__}.{func.__qualname__}"
+        if inspect.isgeneratorfunction(func):
+            wrapper = _timed_generator(func, metric_name)
+            wrapper.__wrapped_for_timing__ = True
+            return wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(metric_name, (time.perf_counter() - start) * 1000)
+        wrapper.__wrapped_for_timing__ = True
+        return wrapper
+    return decorate
+
+
+def _timed_generator(func, metric_name):
+    """
+    :return: a generator function yielding what func yields, counting one
+        call per generator for the time spent in its next() calls
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        generator = func(*args, **kwargs)
+        elapsed = 0.0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(generator)
+                except StopIteration as stop:
+                    return stop.value
+                finally:
+                    elapsed += time.perf_counter() - start
+                yield item
+        finally:
+            generator.close()
+            record(metric_name, elapsed * 1000)
+    return wrapper
+
+
+def instrument_module(module_name, exclude=()):
+    """
+    Time the public functions of a module and the public methods of its
+    classes, replacing them in place. Called at the end of the module, so
+    everything importing from it gets the timed versions.
+    Does nothing when instrumentation is off.
+    :param module_name: the module's __name__
+    :param exclude: names of functions or classes to leave alone
+    """
+    if not ENABLED:
+        return
+    # Only needed when instrumenting, and slow to import
+    import inspect
+
+    module = sys.modules[module_name]
+    for attribute, value in list(vars(module).items()):
+        if attribute.startswith("_") or attribute in exclude or getattr(value, "__module__", None) != module_name:
+            continue
+        if inspect.isfunction(value):
+            setattr(module, attribute, _timed_once(value))
+        elif inspect.isclass(value):
+            for method_name, method in list(vars(value).items()):
+                if not method_name.startswith("_") and inspect.isfunction(method):
+                    setattr(value, method_name, _timed_once(method))
+
+
+def _timed_once(func):
+    """
+    :return: func timed, unless it already is
+    """
+    if getattr(func, "__wrapped_for_timing__", False):
+        return func
+    return timed()(func)
+
+
+def snapshot():
+    """
+    :return: {name: metric values} sorted by total time, slowest first
+    """
+    with _lock:
+        ordered = sorted(metrics.values(), key=lambda metric: metric.total_ms, reverse=True)
+        return {metric.name: metric.to_dict() for metric in ordered}
+
+
+def reset():
+    """
+    Forget all counted calls
+    """
+    with _lock:
+        metrics.clear()
+
+
+def dump(path):
+    """
+    Write the metrics to a JSON file
+    :param path: the file to write
+    :return: True if it was written
+    """
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"enabled": ENABLED, "bucket_bounds_ms": BUCKET_BOUNDS_MS, "metrics": snapshot()}, f, indent=2)
+        return True
+    except OSError as e:
+        print(f"Could not write the metrics to {path}: {e}")
+        return False
+
+
+if ENABLED and os.environ.get("RMS_INSTRUMENT_DUMP"):
+    atexit.register(dump, os.environ["RMS_INSTRUMENT_DUMP"])
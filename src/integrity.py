@@ -0,0 +1,151 @@
+"""
+Referential integrity between flights and the clients and airlines they
+point to.
+
+A flight references a client through Client_ID and an airline through
+Airline_ID. What happens to the flights of a deleted client or airline is
+chosen with an on_delete policy:
+
+cascade   delete the flights too (the default, as the SQLite backend does)
+restrict  refuse to delete a client or airline that still has flights
+nullify   keep the flights and set their Client_ID or Airline_ID to None
+
+The flights are found through the reverse indexes of records.RecordStore,
+so enforcing a policy costs time in the number of flights affected, not in
+the size of the Flight list.
+
+check_integrity() validates a whole set of loaded records in one pass. Run
+it on a file with:
+python src/integrity.py data/test_records.json
+"""
+
+import argparse
+from collections.abc import Mapping
+
+CASCADE = "cascade"
+RESTRICT = "restrict"
+NULLIFY = "nullify"
+ON_DELETE_POLICIES = (CASCADE, RESTRICT, NULLIFY)
+
+# Policy used when a delete does not name one
+DEFAULT_ON_DELETE = CASCADE
+
+# Record type -> the Flight field referencing it
+REFERENCE_FIELDS = {"Client": "Client_ID", "Airline": "Airline_ID"}
+
+
+def dependent_flights(store, record_type, record_id):
+    """
+    :param store: a records.RecordStore
+    :param record_type: Client or Airline
+    :param record_id: the ID of the client or airline
+    :return: a list of the flights referencing it
+    """
+    if record_type == "Client":
+        return list(store.flights_for_client(record_id))
+    if record_type == "Airline":
+        return list(store.flights_for_airline(record_id))
+    return []
+
+
+def enforce_on_delete(store, record_type, record_id, on_delete=DEFAULT_ON_DELETE, changes=None):
+    """
+    Deal with the flights of a client or airline that is about to be deleted
+    :param store: a records.RecordStore
+    :param record_type: Client or Airline
+    :param record_id: the ID of the record being deleted
+    :param on_delete: cascade, restrict or nullify
+    :param changes: a records.ChangeSet to record removed or updated flights in
+    :return: False if restrict forbids the delete, True otherwise
+    """
+    return enforce_on_delete_many(store, record_type, [record_id], on_delete, changes)
+
+
+def enforce_on_delete_many(store, record_type, record_ids, on_delete=DEFAULT_ON_DELETE, changes=None):
+    """
+    Deal with the flights of several clients or airlines about to be
+    deleted together; cascaded flights are removed by their position in
+    the Flight list, found through the store rather than a scan
+    :param store: a records.RecordStore
+    :param record_type: Client or Airline
+    :param record_ids: the IDs of the records being deleted
+    :param on_delete: cascade, restrict or nullify
+    :param changes: a records.ChangeSet to record removed or updated flights in
+    :return: False if restrict forbids any of the deletes, True otherwise
+    """
+    if on_delete not in ON_DELETE_POLICIES:
+        raise ValueError(f"Unknown on_delete policy {on_delete!r}, expected one of {', '.join(ON_DELETE_POLICIES)}")
+    flights = [flight for record_id in record_ids for flight in dependent_flights(store, record_type, record_id)]
+    if not flights:
+        return True
+    if on_delete == RESTRICT:
+        return False
+    if on_delete == CASCADE:
+        store.remove_records("Flight", flights, changes)
+    else:
+        field = REFERENCE_FIELDS[record_type]
+        for flight in flights:
+            store.change_record("Flight", flight, {field: None}, changes)
+    return True
+
+
+def check_integrity(records_json, sequence_key="Next ID"):
+    """
+    Validate loaded records in a single pass over each list
+    :param records_json: the nested records dict
+    :param sequence_key: the key holding the next ID of each type
+    :return: a list of (record_type, position, message) problems, empty if
+        the records are consistent
+    """
+    problems = []
+    ids = {}
+    for record_type in REFERENCE_FIELDS:
+        seen = ids[record_type] = set()
+        for position, record in enumerate(records_json.get(record_type, [])):
+            if not isinstance(record, Mapping):
+                problems.append((record_type, position, "is not a record"))
+                continue
+            record_id = record.get("ID")
+            if record_id is None:
+                problems.append((record_type, position, "has no ID"))
+            elif not isinstance(record_id, int) or isinstance(record_id, bool):
+                problems.append((record_type, position, f"ID {record_id!r} is not a number"))
+            elif record_id in seen:
+                problems.append((record_type, position, f"duplicate ID {record_id}"))
+            else:
+                seen.add(record_id)
+
+    for position, flight in enumerate(records_json.get("Flight", [])):
+        if not isinstance(flight, Mapping):
+            problems.append(("Flight", position, "is not a record"))
+            continue
+        for record_type, field in REFERENCE_FIELDS.items():
+            # None is left behind by the nullify policy and is allowed
+            value = flight.get(field)
+            if value is not None and value not in ids[record_type]:
+                problems.append(("Flight", position, f"{field} {value!r} has no {record_type}"))
+
+    sequence = records_json.get(sequence_key)
+    if isinstance(sequence, Mapping):
+        for record_type, seen in ids.items():
+            next_id = sequence.get(record_type)
+            if next_id is not None and seen and next_id <= max(seen):
+                problems.append((sequence_key, None, f"next {record_type} ID {next_id} is already in use"))
+    return problems
+
+
+if __name__ == "__main__":
+    from storage import load_records
+
+    parser = argparse.ArgumentParser(description="Check the references between flights, clients and airlines")
+    parser.add_argument("file_path")
+    args = parser.parse_args()
+    records = load_records(args.file_path)
+    if not isinstance(records, Mapping):
+        records = {"Client": records}
+    found = check_integrity(records)
+    for record_type, position, message in found:
+        where = record_type if position is None else f"{record_type}[{position}]"
+        print(f"{where}: {message}")
+    print(f"{len(found)} problems found")
+    raise SystemExit(1 if found else 0)
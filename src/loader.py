@@ -0,0 +1,112 @@
+"""
+Background loading for the GUI.
+
+Parsing and indexing a large records file takes seconds, so main.py opens
+its window first and loads the records with a BackgroundLoader. The loader
+reads the records through backend.load() on a worker thread and passes
+every batch to the GUI as it is parsed, so the first page of a section can
+be shown while the rest of the file is still being read. The CRUD
+functions need the indexes, so the store itself is only handed over once
+it is fully indexed.
+
+As with persistence.py, the worker never calls the GUI itself: it queues
+its callbacks, and main.py runs them by calling poll() from root.after().
+"""
+
+import queue
+import threading
+import time
+
+
+class BackgroundLoader:
+    """
+    Loads the records through a backend on a worker thread.
+
+    on_batch(record_type, batch) is called for each batch of records read,
+    on_indexing() once they are all read, then on_loaded(records) with the
+    indexed RecordStore, or on_error(exception) if the load failed, all
+    by poll().
+    counts: the number of records of each type read so far
+    timings: seconds from start until "read" and "loaded"
+    """
+
+    def __init__(self, backend, on_batch=None, on_indexing=None, on_loaded=None, on_error=None,
+                 compact=True, text_index=True):
+        """
+        :param backend: the StorageBackend to load from
+        :param compact: hold the records in the slotted classes of compact.py
+        :param text_index: also build the index used by search_text()
+        """
+        self.backend = backend
+        self.on_batch = on_batch
+        self.on_indexing = on_indexing
+        self.on_loaded = on_loaded
+        self.on_error = on_error
+        self.compact = compact
+        self.text_index = text_index
+        self.records = None
+        self.counts = {}
+        self.timings = {}
+        self._started = time.perf_counter()
+        self._calls = queue.Queue()  # (callback, args), None once finished
+        self._finished = False
+        self._thread = threading.Thread(target=self._run, name="loader", daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout=None):
+        """
+        Wait for the load to finish
+        :param timeout: seconds to wait at most, None to wait as long as needed
+        :return: True if the load has finished
+        """
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def poll(self):
+        """
+        Run the callbacks queued since the last call. Must be called on the
+        GUI thread.
+        :return: True while there is more to come, False once on_loaded or
+            on_error has run
+        """
+        while not self._finished:
+            try:
+                item = self._calls.get_nowait()
+            except queue.Empty:
+                return True
+            if item is None:
+                self._finished = True
+            else:
+                callback, args = item
+                callback(*args)
+        return False
+
+    def _run(self):
+        """Load and index the records, then hand them to the GUI thread."""
+        try:
+            records = self.backend.load(compact=self.compact, progress=self._progress)
+            if self.text_index:
+                records.build_text_index()
+        except Exception as e:
+            print(f"Error loading records: {e}")
+            self._call(self.on_error, e)
+            self._calls.put(None)
+            return
+        self.records = records
+        self.timings["loaded"] = time.perf_counter() - self._started
+        self._call(self.on_loaded, records)
+        self._calls.put(None)
+
+    def _progress(self, record_type, batch):
+        """Called by backend.load() on the worker thread."""
+        if record_type is None:
+            self.timings["read"] = time.perf_counter() - self._started
+            self._call(self.on_indexing)
+            return
+        self.counts[record_type] = self.counts.get(record_type, 0) + len(batch)
+        self._call(self.on_batch, record_type, batch)
+
+    def _call(self, callback, *args):
+        """Queue a callback for poll(), if it was given."""
+        if callback is not None:
+            self._calls.put((callback, args))
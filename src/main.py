@@ -7,19 +7,57 @@
 from dataclasses import fields
 from posixpath import exists
 import tkinter as tk
-from tkinter import ttk, messagebox
-from records import create_record, delete_record, update_record, search_records, validate_input  # import CRUD functions
-from storage import load_records, save_records # import storage functions
+from tkinter import ttk, messagebox, filedialog
+from records import ChangeSet, create_record, delete_record, update_record, search_records, search_text, validate_input, record_key, missing_fields  # import CRUD functions
+from backends import open_backend # import storage backends
+from integrity import DEFAULT_ON_DELETE, ON_DELETE_POLICIES
+from paged_view import PagedTreeview, row_values
+from persistence import PersistenceWorker
+from loader import BackgroundLoader
+import instrumentation
+from instrumentation import timed
 from functools import partial
-import os
-
-# Load records with the correct file path
-FILE_PATH = os.path.join(os.path.dirname(__file__), "data", "test_records.json")
-records = load_records(FILE_PATH)
-
-if not isinstance(records, dict):
-    # If records is a list, convert to dict with all records as "Client"
-    records = {"Client": records, "Airline": [], "Flight": []}
+from collections.abc import Mapping
+import time
+
+# Time-to-first-paint is measured from here
+STARTED = time.perf_counter()
+
+# The backend (JSON file plus journal, SQLite, or a record server) is chosen
+# with the RMS_BACKEND, RMS_DATA_PATH and RMS_SERVER_URL environment
+# variables, see backends.py
+backend = open_backend()
+# Loaded on a background thread once the window is up, see main(). Records
+# are held in the slotted classes of compact.py to save memory, and names,
+# cities, phone numbers and zip codes are indexed for search-as-you-type
+records = None
+
+# Milliseconds to wait after the last keystroke before searching
+SEARCH_DELAY_MS = 150
+
+# Milliseconds between checks for edits the worker has written
+SAVE_POLL_MS = 100
+
+# Milliseconds between checks for records the loader has read
+LOAD_POLL_MS = 20
+
+# Writes edits on a background thread once the records are loaded, see main()
+worker = None
+
+def report_startup(stage):
+    """Print the time from start-up to a stage, and count it when instrumentation is on."""
+    elapsed_ms = (time.perf_counter() - STARTED) * 1000
+    print(f"Startup: {stage} after {elapsed_ms:.0f}ms")
+    if instrumentation.ENABLED:
+        instrumentation.record(f"main.startup.{stage.replace(' ', '_')}", elapsed_ms)
+    return elapsed_ms
+
+def persist(entry):
+    """Save a single edit through the configured backend."""
+    if worker is not None:
+        worker.submit(entry)
+    else:
+        backend.apply(records, entry)
         
 def main():
     """Main function to initialize and run the GUI application."""
@@ -67,6 +105,34 @@ def main():
 
     # Variable to track current section
     current_section = tk.StringVar(value="Client")
+    save_status = tk.StringVar(value="Loading records...")
+    # The first batch of each type, shown until the records are indexed
+    preview = {}
+    first_paint = None
+
+    def on_saved(count):
+        """Called on the Tk thread after the worker has written edits."""
+        save_status.set("All changes saved" if not worker.pending else f"Saving {worker.pending} changes...")
+
+    def on_save_error(error):
+        """Called on the Tk thread when the worker could not write edits."""
+        save_status.set("Changes NOT saved")
+        messagebox.showerror("Save Error", f"Failed to save changes: {error}")
+
+    def poll_worker():
+        """Report the worker's writes on the Tk thread, then check again later."""
+        worker.poll()
+        root.after(SAVE_POLL_MS, poll_worker)
+
+    def on_close():
+        """Write the pending edits before the window goes away."""
+        if worker is not None:
+            save_status.set("Saving...")
+            root.update_idletasks()
+            worker.close()
+        root.destroy()
+
+    root.protocol("WM_DELETE_WINDOW", on_close)
 
     # Create control frame with section selection buttons
     control_frame = tk.Frame(root, bg="#333333")
@@ -98,48 +164,35 @@ def main():
             tree.heading(col, text=col)
 
     def setup_treeview():
-        """Initialize the treeview widget for displaying records."""
-        global tree
-        tree = ttk.Treeview(display_frame, show="headings")
+        """Initialize the paged treeview widget for displaying records."""
+        global tree, view
+        view = PagedTreeview(display_frame)
+        tree = view.tree
         update_treeview_columns()
-        tree.pack(fill="both", expand=True)
+        view.pack(fill="both", expand=True)
+        tk.Label(display_frame, textvariable=view.count_var, fg="white", bg="#333333").pack()
 
     setup_treeview()
 
+    @timed("main.refresh_treeview")
     def refresh_treeview():
-        """Refresh treeview to display records for the current section."""
-        for item in tree.get_children():
-            tree.delete(item)
+        """Refresh treeview to display records for the current section.
+        Only the visible rows are built, the rest are filled in on scrolling."""
         update_treeview_columns()
         record_type = current_section.get()
-        for record in records[record_type]:
-            if isinstance(record, dict):
-                if record_type == "Airline":
-                    values = (
-                        record.get("ID", ""),
-                        record.get("Company Name", "")
-                    )
-                elif record_type == "Flight":
-                    values = (
-                        f"C:{record.get('Client_ID', '')}/A:{record.get('Airline_ID', '')}",
-                        record.get("Date", ""),
-                        record.get("Start City", ""),
-                        record.get("End City", "")
-                    )
-                else:  # Client
-                    values = (
-                        record.get("ID", ""),
-                        record.get("Name", ""),
-                        record.get("Address Line 1", ""),
-                        record.get("Address Line 2", ""),
-                        record.get("Address Line 3", ""),
-                        record.get("City", ""),
-                        record.get("State", ""),
-                        record.get("Zip Code", ""),
-                        record.get("Country", ""),
-                        record.get("Phone Number", "")
-                    )
-                tree.insert("", "end", values=values)
+        # While loading, show the first batch read of the section
+        rows = records[record_type] if records is not None else preview.get(record_type, [])
+        view.set_rows(rows, partial(row_values, record_type), partial(record_key, record_type))
+
+    @timed("main.show_changes")
+    def show_changes(changes):
+        """Update only the treeview rows touched by a create, update or delete."""
+        record_type = current_section.get()
+        if view.rows is records[record_type]:
+            view.apply_changes(changes.for_type(record_type))
+        else:
+            # Search results are on screen, go back to the section list
+            refresh_treeview()
 
    
     # Create form frame for search functionality
@@ -156,6 +209,7 @@ def main():
     id_entry = tk.Entry(form_frame)
     id_entry.grid(row=1, column=1, padx=5, pady=10)
 
+    @timed("main.submit_search")
     def submit_search():
         """Search for records by ID and display results in treeview."""
         selected_type = type_var_popup.get()
@@ -177,9 +231,8 @@ def main():
             messagebox.showerror("Invalid Type", "No such type in the database.")
             return
         
-        # Clear current treeview
-        for row in tree.get_children():
-            tree.delete(row)
+        # Rows for the treeview, shown once the search is complete
+        rows = []
        
         if selected_type == "Client":
             # Set columns for client display
@@ -190,7 +243,7 @@ def main():
             
             # Insert client records
             for record in results:
-                if isinstance(record, dict):
+                if isinstance(record, Mapping):
                     values = (
                         record.get("ID", ""),
                         record.get("Name", ""),
@@ -203,12 +256,12 @@ def main():
                         record.get("Country", ""),
                         record.get("Phone Number", "")
                     )
-                    tree.insert("", "end", values=values)
+                    rows.append(values)
 
                     # Find and display associated flights
                     client_id_val = int(record.get("ID", 0))  # Convert to int for comparison
-                    flights = [f for f in records["Flight"] if f.get("Client_ID") == client_id_val]
-                    if flights:
+                    itinerary = records.itinerary(client_id_val)
+                    if itinerary:
                         # Temporarily set columns for flight display
                         tree["columns"] = ("Client_ID/Airline_ID", "Date", "Start City", "End City", "Airline Name")
                         for col in tree["columns"]:
@@ -216,8 +269,8 @@ def main():
                             tree.heading(col, text=col)
                         
                         # Insert flight records
-                        for flight in flights:
-                            airline = next((a for a in records["Airline"] if a.get("ID") == flight.get("Airline_ID")), {})
+                        for flight, airline in itinerary:
+                            airline = airline or {}
                             flight_values = (
                                 f"C:{flight.get('Client_ID', '')}/A:{flight.get('Airline_ID', '')}",
                                 flight.get("Date", ""),
@@ -225,7 +278,7 @@ def main():
                                 flight.get("End City", ""),
                                 airline.get("Company Name", "")
                             )
-                            tree.insert("", "end", values=flight_values)
+                            rows.append(flight_values)
                         
                         # Restore client columns
                         tree["columns"] = ("ID", "Name", "Address Line 1", "Address Line 2", "Address Line 3", "City", "State", "Zip Code", "Country", "Phone Number")
@@ -243,18 +296,17 @@ def main():
             
             # Insert airline records
             for record in results:
-                if isinstance(record, dict):
+                if isinstance(record, Mapping):
                     values = (
                         record.get("ID", ""),
                         record.get("Company Name", "")
                     )
-                    tree.insert("", "end", values=values)
+                    rows.append(values)
 
                     # Find and display associated clients via flights
                     airline_id_val = int(record.get("ID", 0))
-                    flights = [f for f in records["Flight"] if f.get("Airline_ID") == airline_id_val]
-                    client_ids = set(f.get("Client_ID") for f in flights)
-                    if client_ids:
+                    passengers = records.passengers(airline_id_val)
+                    if passengers:
                         # Temporarily set columns for client display
                         tree["columns"] = ("Client ID", "Name", "Address Line 1", "City", "Phone Number")
                         for col in tree["columns"]:
@@ -262,17 +314,15 @@ def main():
                             tree.heading(col, text=col)
                         
                         # Insert client records
-                        for client_id in client_ids:
-                            client = next((c for c in records["Client"] if c.get("ID") == client_id), None)
-                            if client:
-                                client_values = (
-                                    f"C:{client.get('ID', '')}",
-                                    client.get("Name", ""),
-                                    client.get("Address Line 1", ""),
-                                    client.get("City", ""),
-                                    client.get("Phone Number", "")
-                                )
-                                tree.insert("", "end", values=client_values)
+                        for client in passengers:
+                            client_values = (
+                                f"C:{client.get('ID', '')}",
+                                client.get("Name", ""),
+                                client.get("Address Line 1", ""),
+                                client.get("City", ""),
+                                client.get("Phone Number", "")
+                            )
+                            rows.append(client_values)
                         
                         # Restore airline columns
                         tree["columns"] = ("ID", "Company Name")
@@ -280,13 +330,51 @@ def main():
                             tree.column(col, width=60 if col == "ID" else 120)
                             tree.heading(col, text=col)
 
-    tk.Button(form_frame, text="Search", command=submit_search).grid(row=2, column=1, pady=10)
+        view.set_rows(rows)
+
+    search_button = tk.Button(form_frame, text="Search", command=submit_search)
+    search_button.grid(row=2, column=1, pady=10)
 
-    # Bind keyboard shortcuts for CRUD operations
-    root.bind("<Alt-c>", lambda e: create_record_popup())
-    root.bind("<Alt-d>", lambda e: delete_record_popup())
-    root.bind("<Alt-u>", lambda e: update_record_popup())
-    root.bind("<Alt-s>", lambda e: submit_search())
+    # Search-as-you-type by name, city, phone number or zip code
+    tk.Label(form_frame, text="Find:", fg="white", bg="#333333").grid(row=3, column=0, sticky="e", pady=10)
+    find_var = tk.StringVar()
+    find_entry = tk.Entry(form_frame, textvariable=find_var)
+    find_entry.grid(row=3, column=1, padx=5, pady=10)
+    pending_search = None
+
+    @timed("main.run_text_search")
+    def run_text_search():
+        """Show the records matching the text in the Find box."""
+        nonlocal pending_search
+        pending_search = None
+        query = find_var.get().strip()
+        selected_type = type_var_popup.get()
+        current_section.set(selected_type)
+        if not query:
+            refresh_treeview()
+            return
+        results = search_text(records, query, selected_type)
+        if results == -2:
+            return
+        update_treeview_columns()
+        view.set_rows(results, partial(row_values, selected_type), partial(record_key, selected_type))
+
+    def schedule_text_search(*args):
+        """Wait until typing pauses before searching, so each keystroke stays cheap."""
+        nonlocal pending_search
+        if pending_search is not None:
+            root.after_cancel(pending_search)
+        pending_search = root.after(SEARCH_DELAY_MS, run_text_search)
+
+    find_var.trace_add("write", schedule_text_search)
+    type_menu.bind("<<ComboboxSelected>>", lambda e: find_var.get().strip() and schedule_text_search())
+
+    def bind_shortcuts():
+        """Bind keyboard shortcuts for CRUD operations, once the records are loaded."""
+        root.bind("<Alt-c>", lambda e: create_record_popup())
+        root.bind("<Alt-d>", lambda e: delete_record_popup())
+        root.bind("<Alt-u>", lambda e: update_record_popup())
+        root.bind("<Alt-s>", lambda e: submit_search())
 
     
     def create_record_popup():
@@ -308,28 +396,31 @@ def main():
         def submit():
             """Handle form submission for creating a new record."""
             record_data = {key: entry.get() for key, entry in entries.items() if key != "ID (Auto)"}
+            # The same rules are applied by bulk_import
+            missing = missing_fields(selected_type, record_data)
             # Require all fields for Client
-            if selected_type == "Client":
-                missing = [key for key, value in record_data.items() if not value]
-                if missing:
-                    messagebox.showwarning("Input Error", f"All fields are required for Client. Missing: {', '.join(missing)}")
-                    return
+            if selected_type == "Client" and missing:
+                messagebox.showwarning("Input Error", f"All fields are required for Client. Missing: {', '.join(missing)}")
+                return
             # Require Company Name for Airline
-            if selected_type == "Airline" and not record_data.get("Company Name"):
+            if selected_type == "Airline" and missing:
                 messagebox.showwarning("Input Error", "Company Name is required for Airline.")
                 return
 
             # Require all fields for Flight
-            if selected_type == "Flight":
-                missing = [key for key, value in record_data.items() if not value]
-                if missing:
-                    messagebox.showwarning("Input Error", f"All fields are required for Flight. Missing: {', '.join(missing)}")
-                    return
+            if selected_type == "Flight" and missing:
+                messagebox.showwarning("Input Error", f"All fields are required for Flight. Missing: {', '.join(missing)}")
+                return
             try:
-                create_record(records, record_data, selected_type.replace('s', ''))  # Map back
-                save_records(records, FILE_PATH)
+                changes = ChangeSet()
+                result = create_record(records, record_data, selected_type.replace('s', ''), changes=changes)  # Map back
+                if result == -1:
+                    messagebox.showerror("Invalid ID", "No Client or Airline exists with the IDs given.")
+                    return
+                if result == "Entry has been created successfully":
+                    persist({"op": "create", "type": selected_type, "record": records[selected_type][-1]})
                 messagebox.showinfo("Success", f"{selected_type} record created!")
-                refresh_treeview()
+                show_changes(changes)
                 create_window.destroy()
             except Exception as exc:
                 messagebox.showerror("Validation Error", str(exc))
@@ -417,6 +508,47 @@ def main():
             entry.grid(row=i+5, column=2, padx=5)
             entries[field] = entry
 
+        def submit_update():
+            """Handle the update of the ticked fields of a Client, Airline or Flight."""
+            data = {field: entries[field].get() for field in updatable_fields if check_vars[field].get()}
+            if not data:
+                messagebox.showwarning("Input Error", "Tick at least one field to update.")
+                return
+            client_id = client_id_entry.get().strip()
+            airline_id = airline_id_entry.get().strip()
+            if flight_var.get():
+                if not client_id or not airline_id:
+                    messagebox.showwarning("Input Error", "Both Client ID and Airline ID must be entered to update a Flight.")
+                    return
+                record_type = "Flight"
+            elif client_id and not airline_id:
+                record_type = "Client"
+            elif airline_id and not client_id:
+                record_type = "Airline"
+            else:
+                messagebox.showwarning("Input Error", "Enter either a Client ID or an Airline ID, or tick Flight.")
+                return
+
+            changes = ChangeSet()
+            result = update_record(records, record_type, data, client_id=client_id, airline_id=airline_id, changes=changes)
+            if result == -2:
+                messagebox.showerror("Invalid Type", "No such type in the database.")
+                return
+            if result != 1:
+                messagebox.showerror("Invalid ID", f"No {record_type} found with that ID.")
+                return
+            persist({"op": "update", "type": record_type, "data": data,
+                     "client_id": validate_input(client_id), "airline_id": validate_input(airline_id)})
+            messagebox.showinfo("Updated", f"{record_type} record updated!")
+            show_changes(changes)
+            update_window.destroy()
+
+        tk.Button(update_window, text="Update", command=submit_update).grid(row=len(updatable_fields)+6, column=2, pady=20)
+        update_window.transient(root)
+        update_window.grab_set()
+        root.wait_window(update_window)
+
+    @timed("main.submit_search")
     def submit_search():
         """Search for records by ID and display results, including flights for clients."""
         selected_type = type_var_popup.get()
@@ -437,9 +569,8 @@ def main():
             messagebox.showerror("Invalid Type", "No such type in the database.")
             return
 
-        # Clear current treeview
-        for row in tree.get_children():
-            tree.delete(row)
+        # Rows for the treeview, shown once the search is complete
+        rows = []
 
         # Use a unified column set to accommodate both client and flight data
         tree["columns"] = ("ID", "Name/Description", "Address Line 1/Date", "Address Line 2/Start City", "Address Line 3/End City", "City/Airline", "State", "Zip Code", "Country", "Phone Number")
@@ -450,7 +581,7 @@ def main():
         if selected_type == "Client":
             # Insert client records
             for record in results:
-                if isinstance(record, dict):
+                if isinstance(record, Mapping):
                     values = (
                         record.get("ID", ""),
                         record.get("Name", ""),
@@ -463,16 +594,13 @@ def main():
                         record.get("Country", ""),
                         record.get("Phone Number", "")
                     )
-                    tree.insert("", "end", values=values)
+                    rows.append(values)
 
                     # Find and display associated flights
                     client_id_val = int(record.get("ID", 0))  # Convert to int for comparison
-                    print(f"Searching flights for Client ID {client_id_val}")
-                    flights = [f for f in records["Flight"] if f.get("Client_ID") == client_id_val or str(f.get("Client_ID")) == str(client_id_val)]
-                    print(f"Flights found: {flights}")
                     try:
-                        for flight in flights:
-                            airline = next((a for a in records["Airline"] if a.get("ID") == flight.get("Airline_ID")), {})
+                        for flight, airline in records.itinerary(client_id_val):
+                            airline = airline or {}
                             flight_values = (
                                 f"F:{flight.get('Client_ID', '')}/{flight.get('Airline_ID', '')}",
                                 f"Flight: {flight.get('Client_ID', '')}/{flight.get('Airline_ID', '')}",
@@ -482,7 +610,7 @@ def main():
                                 airline.get("Company Name", ""),
                                 "", "", "", ""  # Pad with empty strings to match column count
                             )
-                            tree.insert("", "end", values=flight_values)
+                            rows.append(flight_values)
                     except Exception as e:
                         print(f"Error inserting flight data: {str(e)}")
                         messagebox.showerror("Display Error", f"Failed to display flights: {str(e)}")
@@ -490,52 +618,42 @@ def main():
         elif selected_type == "Airline":
             # Insert airline records
             for record in results:
-                if isinstance(record, dict):
+                if isinstance(record, Mapping):
                     values = (
                         record.get("ID", ""),
                         record.get("Company Name", ""),
                         "", "", "", "", "", "", "", ""  # Pad with empty strings
                     )
-                    tree.insert("", "end", values=values)
+                    rows.append(values)
 
                     # Find and display associated clients via flights
                     airline_id_val = int(record.get("ID", 0))
-                    print(f"Searching flights for Airline ID {airline_id_val}")
-                    flights = [f for f in records["Flight"] if f.get("Airline_ID") == airline_id_val or str(f.get("Airline_ID")) == str(airline_id_val)]
-                    print(f"Flights found: {flights}")
-                    client_ids = set(f.get("Client_ID") for f in flights)
                     try:
-                        for client_id in client_ids:
-                            client = next((c for c in records["Client"] if c.get("ID") == client_id or str(c.get("ID")) == str(client_id)), None)
-                            if client:
-                                client_values = (
-                                    f"C:{client.get('ID', '')}",
-                                    client.get("Name", ""),
-                                    client.get("Address Line 1", ""),
-                                    client.get("Address Line 2", ""),
-                                    client.get("Address Line 3", ""),
-                                    client.get("City", ""),
-                                    client.get("State", ""),
-                                    client.get("Zip Code", ""),
-                                    client.get("Country", ""),
-                                    client.get("Phone Number", "")
-                                )
-                                tree.insert("", "end", values=client_values)
+                        for client in records.passengers(airline_id_val):
+                            client_values = (
+                                f"C:{client.get('ID', '')}",
+                                client.get("Name", ""),
+                                client.get("Address Line 1", ""),
+                                client.get("Address Line 2", ""),
+                                client.get("Address Line 3", ""),
+                                client.get("City", ""),
+                                client.get("State", ""),
+                                client.get("Zip Code", ""),
+                                client.get("Country", ""),
+                                client.get("Phone Number", "")
+                            )
+                            rows.append(client_values)
                     except Exception as e:
                         print(f"Error inserting client data: {str(e)}")
                         messagebox.showerror("Display Error", f"Failed to display clients: {str(e)}")
 
-        
-        tk.Button(update_window, text="Update", command=submit_update).grid(row=len(updatable_fields)+6, column=2, pady=20)
-        update_window.transient(root)
-        update_window.grab_set()
-        root.wait_window(update_window)
+        view.set_rows(rows)
 
     def delete_record_popup():
         """Display a pop-up to delete a record by Airline ID, Client ID, or both for Flight."""
         delete_window = tk.Toplevel(root)
         delete_window.title("Delete Record")
-        delete_window.geometry("350x200")
+        delete_window.geometry("350x230")
         delete_window.configure(bg="#333333")
 
         # Instruction for Airline ID
@@ -556,6 +674,11 @@ def main():
         flight_var = tk.BooleanVar()
         tk.Checkbutton(delete_window, text="Delete Flight (requires both IDs)", variable=flight_var, bg="#333333", fg="white").grid(row=5, column=0, columnspan=2, sticky="w")
 
+        # What happens to the flights of a deleted client or airline
+        tk.Label(delete_window, text="Their flights:", fg="white", bg="#333333").grid(row=6, column=0, sticky="e", pady=5)
+        on_delete_var = tk.StringVar(value=DEFAULT_ON_DELETE)
+        ttk.Combobox(delete_window, textvariable=on_delete_var, values=ON_DELETE_POLICIES, state="readonly", width=10).grid(row=6, column=1, sticky="w", padx=5)
+
         def submit_delete():
             """Handle deletion of a record based on provided IDs."""
             airline_id = airline_id_entry.get().strip()
@@ -565,35 +688,48 @@ def main():
             airline_id_val = int(airline_id) if airline_id.isdigit() else None
             client_id_val = int(client_id) if client_id.isdigit() else None
 
+            changes = ChangeSet()
             # Validation
             if is_flight:
                 if not airline_id_val or not client_id_val:
                     messagebox.showwarning("Input Error", "Both Airline ID and Client ID must be entered to delete a Flight.")
                     return
                 # Call backend for flight
-                delete_record(records, "Flight", client_id=client_id_val, airline_id=airline_id_val)
+                delete_record(records, "Flight", client_id=client_id_val, airline_id=airline_id_val, changes=changes)
+                entry = {"op": "delete", "type": "Flight", "client_id": client_id_val, "airline_id": airline_id_val}
                 msg = f"Flight with Airline ID {airline_id_val} and Client ID {client_id_val} deleted."
             else:
                 if not airline_id_val and not client_id_val:
                     messagebox.showwarning("Input Error", "Please enter either Airline ID or Client ID.")
                     return
+                on_delete = on_delete_var.get()
                 if airline_id_val and not client_id_val:
                     # Delete Airline
-                    delete_record(records, "Airline", airline_id=airline_id_val)
+                    result = delete_record(records, "Airline", airline_id=airline_id_val, changes=changes, on_delete=on_delete)
+                    entry = {"op": "delete", "type": "Airline", "airline_id": airline_id_val, "on_delete": on_delete}
                     msg = f"Airline with ID {airline_id_val} deleted."
                 elif client_id_val and not airline_id_val:
                     # Delete Client
-                    delete_record(records, "Client", client_id=client_id_val)
+                    result = delete_record(records, "Client", client_id=client_id_val, changes=changes, on_delete=on_delete)
+                    entry = {"op": "delete", "type": "Client", "client_id": client_id_val, "on_delete": on_delete}
                     msg = f"Client with ID {client_id_val} deleted."
                 else:
                     # If both are filled but flight not ticked, ask user to tick flight or clear one
                     messagebox.showwarning("Input Error", "Tick 'Delete Flight' to delete both, or clear one ID.")
                     return
+                if result == -3:
+                    messagebox.showerror("Delete Refused", "The record still has flights. Delete them first or choose cascade or nullify.")
+                    return
+                flights = changes.for_type("Flight")
+                if flights.removed:
+                    msg += f" {len(flights.removed)} of its flights were deleted."
+                elif flights.updated:
+                    msg += f" {len(flights.updated)} of its flights were kept without it."
 
-            save_records(records, FILE_PATH)
+            persist(entry)
             messagebox.showinfo("Deleted", msg)
-            # Refresh the Treeview to reflect deletion
-            refresh_treeview()
+            # Update only the deleted rows in the Treeview
+            show_changes(changes)
             delete_window.destroy()
 
         tk.Button(delete_window, text="Delete", command=submit_delete).grid(row=5, column=9, pady=12)
@@ -611,11 +747,123 @@ def main():
      # CRUD buttons
     crud_frame = tk.Frame(root, bg="#333333")
     crud_frame.pack(pady=5)
-    tk.Button(crud_frame, text="Create Record", command=create_record_popup, underline=0, font=("Arial", 12)).pack(side=tk.LEFT, padx=5)
-    tk.Button(crud_frame, text="Delete Record", command=delete_record_popup, underline=0, font=("Arial", 12)).pack(side=tk.LEFT, padx=5)
-    tk.Button(crud_frame, text="Update Record", command=update_record_popup, underline=0, font=("Arial", 12)).pack(side=tk.LEFT, padx=5)    
-    
+    crud_buttons = [
+        tk.Button(crud_frame, text="Create Record", command=create_record_popup, underline=0, font=("Arial", 12)),
+        tk.Button(crud_frame, text="Delete Record", command=delete_record_popup, underline=0, font=("Arial", 12)),
+        tk.Button(crud_frame, text="Update Record", command=update_record_popup, underline=0, font=("Arial", 12)),
+    ]
+
+    def performance_popup():
+        """Show the call counts and latencies collected with RMS_INSTRUMENT=1."""
+        perf_window = tk.Toplevel(root)
+        perf_window.title("Performance")
+        perf_window.geometry("900x400")
+        columns = ("Calls", "Total ms", "Mean ms", "p50 ms", "p95 ms", "Max ms")
+        perf_tree = ttk.Treeview(perf_window, columns=columns)
+        perf_tree.heading("#0", text="Function")
+        perf_tree.column("#0", width=300)
+        for col in columns:
+            perf_tree.heading(col, text=col)
+            perf_tree.column(col, width=90, anchor="e")
+        perf_tree.pack(fill="both", expand=True)
+        cache_status = tk.StringVar()
+        tk.Label(perf_window, textvariable=cache_status).pack(pady=2)
+
+        def show_metrics():
+            perf_tree.delete(*perf_tree.get_children())
+            for name, metric in instrumentation.snapshot().items():
+                perf_tree.insert("", "end", text=name, values=(
+                    metric["count"], f"{metric['total_ms']:.1f}", f"{metric['mean_ms']:.3f}",
+                    metric["p50_ms"], metric["p95_ms"], f"{metric['max_ms']:.1f}"))
+            stats = records.query_cache.stats()
+            cache_status.set(f"Query cache: {stats['hits']} hits, {stats['misses']} misses ({stats['stale']} stale), "
+                             f"{stats['evictions']} evictions, {stats['size']}/{stats['maxsize']} results, "
+                             f"hit rate {stats['hit_rate']:.0%}")
+
+        def reset_metrics():
+            instrumentation.reset()
+            show_metrics()
+
+        def save_metrics():
+            path = filedialog.asksaveasfilename(parent=perf_window, defaultextension=".json",
+                                                filetypes=[("JSON", "*.json")])
+            if path and not instrumentation.dump(path):
+                messagebox.showerror("Save Error", f"Could not write {path}", parent=perf_window)
+
+        button_frame = tk.Frame(perf_window)
+        button_frame.pack(pady=5)
+        tk.Button(button_frame, text="Refresh", command=show_metrics).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Reset", command=reset_metrics).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Save JSON...", command=save_metrics).pack(side=tk.LEFT, padx=5)
+        show_metrics()
+
+    if instrumentation.ENABLED:
+        crud_buttons.append(tk.Button(crud_frame, text="Performance", command=performance_popup, font=("Arial", 12)))
+    # Everything that needs the indexed records waits for the load
+    for button in crud_buttons:
+        button.configure(state="disabled")
+        button.pack(side=tk.LEFT, padx=5)
+    search_button.configure(state="disabled")
+    find_entry.configure(state="disabled")
+
+    tk.Label(root, textvariable=save_status, fg="white", bg="#333333").pack(pady=2)
+
+    def on_batch(record_type, batch):
+        """Called on the Tk thread with each batch of records read by the loader."""
+        nonlocal first_paint
+        counts = loader.counts
+        save_status.set(f"Loading records... {counts.get('Client', 0):,} clients, "
+                        f"{counts.get('Airline', 0):,} airlines, {counts.get('Flight', 0):,} flights")
+        if record_type in preview or records is not None:
+            return
+        preview[record_type] = batch
+        if record_type == current_section.get():
+            refresh_treeview()
+            if first_paint is None:
+                root.update_idletasks()
+                first_paint = report_startup("first page")
+
+    def on_indexing():
+        """Called on the Tk thread once every record has been read."""
+        save_status.set("Indexing records...")
+
+    def on_loaded(store):
+        """Called on the Tk thread with the indexed records; enables editing."""
+        global records, worker
+        records = store
+        worker = PersistenceWorker(backend, records, on_saved=on_saved, on_error=on_save_error)
+        poll_worker()
+        preview.clear()
+        refresh_treeview()
+        for button in crud_buttons:
+            button.configure(state="normal")
+        search_button.configure(state="normal")
+        find_entry.configure(state="normal")
+        bind_shortcuts()
+        ready = report_startup("ready")
+        shown = f", first page after {first_paint / 1000:.1f}s" if first_paint is not None else ""
+        save_status.set(f"Loaded {sum(loader.counts.values()):,} records in {ready / 1000:.1f}s{shown}")
+
+    def on_load_error(error):
+        """Called on the Tk thread when the records could not be loaded."""
+        save_status.set("Records NOT loaded")
+        messagebox.showerror("Load Error", f"Failed to load records: {error}")
+
+    root.after_idle(lambda: report_startup("window"))
+    loader = BackgroundLoader(backend, on_batch=on_batch, on_indexing=on_indexing,
+                              on_loaded=on_loaded, on_error=on_load_error)
+
+    def poll_loader():
+        """Show what the loader has read on the Tk thread, until it is done."""
+        if loader.poll():
+            root.after(LOAD_POLL_MS, poll_loader)
+
+    poll_loader()
+
     root.mainloop()
+    if worker is not None:
+        worker.close()
+    backend.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,219 @@
+# src/paged_view.py
+# Virtual scrolling Treeview for the record lists in main.py.
+# Only the rows that fit in the window (plus a small buffer) exist as Tk
+# items; scrolling rewrites the values of those items instead of creating
+# one item per record.
+
+import tkinter as tk
+from collections.abc import Mapping
+from tkinter import ttk
+
+from instrumentation import timed
+
+
+def clamp_offset(offset, total, page_size):
+    """
+    Keep the first visible row inside the row list.
+    :param offset: the requested first row
+    :param total: the number of rows
+    :param page_size: the number of rows shown at once
+    :return: the offset to use
+    """
+    return max(0, min(offset, total - page_size))
+
+
+def scroll_fractions(offset, total, page_size):
+    """
+    Position of the scrollbar slider for the visible window.
+    :return: (first, last) as fractions of the whole list
+    """
+    if total <= 0:
+        return 0.0, 1.0
+    return offset / total, min(offset + page_size, total) / total
+
+
+def row_values(record_type, record):
+    """
+    Return the treeview values of one record of the given type.
+    :param record_type: Client, Airline or Flight
+    :param record: the record
+    :return: a tuple of the values of the type's columns
+    """
+    if not isinstance(record, Mapping):
+        return ()
+    if record_type == "Airline":
+        return (
+            record.get("ID", ""),
+            record.get("Company Name", "")
+        )
+    elif record_type == "Flight":
+        return (
+            f"C:{record.get('Client_ID', '')}/A:{record.get('Airline_ID', '')}",
+            record.get("Date", ""),
+            record.get("Start City", ""),
+            record.get("End City", "")
+        )
+    # Client
+    return (
+        record.get("ID", ""),
+        record.get("Name", ""),
+        record.get("Address Line 1", ""),
+        record.get("Address Line 2", ""),
+        record.get("Address Line 3", ""),
+        record.get("City", ""),
+        record.get("State", ""),
+        record.get("Zip Code", ""),
+        record.get("Country", ""),
+        record.get("Phone Number", "")
+    )
+
+
+class PagedTreeview:
+    """
+    A ttk.Treeview showing a window of a (possibly very large) row list.
+
+    set_rows() takes any sequence supporting len() and slicing, such as
+    records["Client"], and a function turning one row into the values of a
+    Treeview row. The total row count is kept in count_var.
+    """
+
+    def __init__(self, parent, visible_rows=25, buffer_rows=5, row_height=20):
+        self.frame = tk.Frame(parent)
+        self.tree = ttk.Treeview(self.frame, show="headings", height=visible_rows)
+        self.scrollbar = ttk.Scrollbar(self.frame, orient="vertical", command=self._on_scrollbar)
+        self.tree.pack(side=tk.LEFT, fill="both", expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill="y")
+        self.count_var = tk.StringVar(value="0 records")
+
+        self.visible_rows = visible_rows
+        self.buffer_rows = buffer_rows
+        self.row_height = row_height
+        self.rows = []
+        self.row_values = None
+        self.row_key = None
+        self.offset = 0
+        self._visible = {}    # row key -> item, for the rows in the window
+        self._items = []      # pooled Tk item ids, reused while scrolling
+        self._attached = 0    # how many pooled items are currently shown
+
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll_by(-3) or "break")
+        self.tree.bind("<Button-5>", lambda e: self.scroll_by(3) or "break")
+        self.tree.bind("<Prior>", lambda e: self.scroll_by(-self.visible_rows) or "break")
+        self.tree.bind("<Next>", lambda e: self.scroll_by(self.visible_rows) or "break")
+
+    def pack(self, **options):
+        """Pack the frame holding the tree and its scrollbar."""
+        self.frame.pack(**options)
+
+    @property
+    def page_size(self):
+        """Number of Tk items materialised: the visible rows plus the buffer."""
+        return self.visible_rows + self.buffer_rows
+
+    def set_rows(self, rows, row_values=None, row_key=None):
+        """
+        Show a new row list from the top.
+        :param rows: the rows to show
+        :param row_values: turns a row into a tuple of values, rows are used as is if None
+        :param row_key: turns a row into a stable key, needed by apply_changes
+        """
+        self.rows = rows
+        self.row_values = row_values
+        self.row_key = row_key
+        self.offset = 0
+        self.render()
+
+    @timed("paged_view.apply_changes")
+    def apply_changes(self, changes):
+        """
+        Redraw only what a records.ChangeSet touched.
+        The row list is edited in place by the CRUD functions, so an update
+        rewrites the one item showing the record, an insert past the window
+        only moves the scrollbar, and a removal redraws the window, which
+        costs at most page_size Tk calls however long the list is.
+        :param changes: the ChangeSet of edits made to self.rows
+        """
+        if changes.removed:
+            self.render()
+            return
+        for record_type, key, record in changes.updated:
+            item = self._visible.pop(key, None)
+            if item is not None:
+                self.tree.item(item, values=self.row_values(record) if self.row_values else record)
+                self._visible[self.row_key(record)] = item
+        if changes.inserted:
+            if len(self.rows) - len(changes.inserted) < self.offset + self.page_size:
+                self.render()  # the new rows fall inside the window
+            else:
+                self._update_position(len(self.rows), self._attached)
+
+    def scroll_by(self, count):
+        """Move the window by count rows."""
+        self.scroll_to(self.offset + count)
+
+    def scroll_to(self, offset):
+        """Show the rows starting at offset."""
+        offset = clamp_offset(offset, len(self.rows), self.visible_rows)
+        if offset != self.offset:
+            self.offset = offset
+            self.render()
+
+    @timed("paged_view.render")
+    def render(self):
+        """Write the rows of the current window into the pooled items."""
+        total = len(self.rows)
+        self.offset = clamp_offset(self.offset, total, self.visible_rows)
+        window = self.rows[self.offset:self.offset + self.page_size]
+        # A reused item now shows another row, so drop any selection
+        selected = self.tree.selection()
+        if selected:
+            self.tree.selection_remove(*selected)
+
+        self._visible = {}
+        for position, row in enumerate(window):
+            values = self.row_values(row) if self.row_values else row
+            if position < len(self._items):
+                item = self._items[position]
+                self.tree.item(item, values=values)
+                if position >= self._attached:
+                    self.tree.move(item, "", position)
+            else:
+                item = self.tree.insert("", "end", values=values)
+                self._items.append(item)
+            if self.row_key:
+                self._visible[self.row_key(row)] = item
+        # Hide, but keep, the items not needed for a short list
+        if len(window) < self._attached:
+            self.tree.detach(*self._items[len(window):self._attached])
+        self._attached = len(window)
+        self._update_position(total, len(window))
+
+    def _update_position(self, total, shown):
+        """Move the scrollbar and update the row count label."""
+        self.scrollbar.set(*scroll_fractions(self.offset, total, self.visible_rows))
+        if total > shown:
+            self.count_var.set(f"{total} records (showing {self.offset + 1}-{self.offset + shown})")
+        else:
+            self.count_var.set(f"{total} records")
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        """Handle the scrollbar's moveto and scroll commands."""
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * len(self.rows)))
+        elif action == "scroll":
+            step = self.visible_rows if unit == "pages" else 1
+            self.scroll_by(int(amount) * step)
+
+    def _on_mousewheel(self, event):
+        """Scroll three rows per wheel notch."""
+        self.scroll_by(-3 if event.delta > 0 else 3)
+        return "break"
+
+    def _on_resize(self, event):
+        """Fit the number of visible rows to the new height of the tree."""
+        visible_rows = max(1, event.height // self.row_height - 1)  # minus the heading
+        if visible_rows != self.visible_rows:
+            self.visible_rows = visible_rows
+            self.render()
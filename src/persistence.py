@@ -0,0 +1,140 @@
+"""
+Background persistence for the GUI.
+
+Writing to the journal or database can take long enough to freeze the Tk
+window, so main.py hands each edit to a PersistenceWorker instead. The edit
+is prepared on the GUI thread (backends.StorageBackend.prepare), queued, and
+written by a worker thread. Edits made in quick succession are written
+together in one backend.write() call.
+
+Tk widgets may only be used from the thread running the mainloop, so the
+worker never calls the GUI itself: it puts the outcome of each batch on a
+queue, and main.py calls poll() from root.after() to report them. The
+journal is folded into the snapshot by the worker too, from the stored
+edits rather than the records the GUI is editing.
+"""
+
+import queue
+import threading
+
+# Queued by flush() and close() to wake the worker
+_FLUSH = object()
+_STOP = object()
+
+
+class PersistenceWorker:
+    """
+    Writes edits through a backend on a worker thread.
+
+    on_saved(count) and on_error(exception) are called by poll() for each
+    batch that has been written or has failed since the last poll().
+    """
+
+    def __init__(self, backend, records, on_saved=None, on_error=None, coalesce_delay=0.1):
+        """
+        :param backend: the StorageBackend to write to
+        :param records: the RecordStore the edits are made to
+        :param on_saved: called with the number of edits written
+        :param on_error: called with the exception of a failed write
+        :param coalesce_delay: seconds to wait for more edits before writing
+        """
+        self.backend = backend
+        self.records = records
+        self.on_saved = on_saved
+        self.on_error = on_error
+        self.coalesce_delay = coalesce_delay
+        self.pending = 0          # edits submitted but not written yet
+        self._queue = queue.Queue()
+        self._results = queue.Queue()  # (count, exception or None) per batch
+        self._flushed = threading.Condition()
+        self._closing = False
+        self._thread = threading.Thread(target=self._run, name="persistence", daemon=False)
+        self._thread.start()
+
+    def submit(self, entry):
+        """
+        Queue an edit that has just been made to the records.
+        Must be called on the thread that edits the records.
+        :param entry: the journal entry describing the edit
+        """
+        if self._closing:
+            raise RuntimeError("The persistence worker has been closed")
+        prepared = self.backend.prepare(self.records, entry)
+        with self._flushed:
+            self.pending += 1
+        self._queue.put(prepared)
+
+    def flush(self, timeout=None):
+        """
+        Wait until every submitted edit has been written or has failed
+        :param timeout: seconds to wait at most, None to wait as long as needed
+        :return: True if nothing is left to write
+        """
+        with self._flushed:
+            if self.pending:
+                self._queue.put(_FLUSH)
+            return self._flushed.wait_for(lambda: not self.pending, timeout)
+
+    def close(self):
+        """
+        Write the remaining edits and stop the worker thread.
+        Outcomes not yet polled are dropped, as the window they update is
+        usually being destroyed.
+        """
+        if self._closing:
+            return
+        self._closing = True
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def poll(self):
+        """
+        Report the batches written since the last call through on_saved and
+        on_error. Must be called on the GUI thread.
+        """
+        while True:
+            try:
+                count, error = self._results.get_nowait()
+            except queue.Empty:
+                return
+            if error is not None:
+                if self.on_error:
+                    self.on_error(error)
+            elif self.on_saved:
+                self.on_saved(count)
+
+    def _run(self):
+        """Take batches of edits off the queue and write them."""
+        stop = False
+        while not stop:
+            batch = []
+            item = self._queue.get()
+            # Gather whatever else arrives shortly after the first edit
+            while item is not _STOP:
+                if item is not _FLUSH:
+                    batch.append(item)
+                    try:
+                        item = self._queue.get(timeout=self.coalesce_delay)
+                        continue
+                    except queue.Empty:
+                        pass
+                break
+            stop = item is _STOP
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch):
+        """Write one batch and queue the outcome for poll()."""
+        try:
+            self.backend.write(batch)
+            error = None
+        except Exception as e:
+            print(f"Error saving {len(batch)} edits: {e}")
+            error = e
+        with self._flushed:
+            self.pending -= len(batch)
+            self._flushed.notify_all()
+        if error is None:
+            # None: the records are being edited on the GUI thread meanwhile
+            self.backend.compact(None)
+        self._results.put((len(batch), error))
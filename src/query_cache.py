@@ -0,0 +1,89 @@
+"""
+Bounded LRU cache of query results, invalidated by record type versions.
+
+RecordStore in records.py keeps a version counter per record type and bumps
+it on every create, update and delete of that type. Each cached result is
+stored with the versions of the types it was read from (a client itinerary
+reads Flight and Airline), so a lookup only reuses it while none of those
+types has changed since; changes to other types leave it alone.
+
+When the cache holds maxsize results, the least recently used one is
+evicted. stats() reports hits, misses, evictions and stale results for
+sizing the cache to the working set.
+"""
+
+from collections import OrderedDict
+
+# Query results kept by a RecordStore unless it is given another size
+CACHE_SIZE = 1024
+
+
+class QueryCache:
+    """
+    {key: (versions, result)} in least to most recently used order.
+    hits / misses: lookups answered from the cache or computed
+    stale: the misses that found a result for an older version
+    evictions: results dropped to stay within maxsize
+    """
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        """
+        :param maxsize: the most results kept, 0 to cache nothing
+        """
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def cached(self, key, versions, compute):
+        """
+        Return the result stored under key for these versions, or compute
+        and store it
+        :param key: a hashable description of the query, e.g.
+            ("itinerary", 3)
+        :param versions: the current versions of the types the query reads
+        :param compute: called without arguments to run the query
+        :return: the result
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] == versions:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            del self._entries[key]
+            self.stale += 1
+        self.misses += 1
+        result = compute()
+        if self.maxsize > 0:
+            self._entries[key] = (versions, result)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return result
+
+    def clear(self):
+        """
+        Drop every result, keeping the statistics
+        """
+        self._entries.clear()
+
+    def stats(self):
+        """
+        :return: the counters, the current size and the hit rate
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
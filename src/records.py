@@ -7,9 +7,42 @@ Updating records.
 Deleting records
 
 And ensures referential integrity
+
+The CRUD functions accept either the plain nested dict returned by
+storage.load_records or a RecordStore wrapping it. A RecordStore keeps hash
+indexes so lookups by ID are O(1); a plain dict is indexed on the fly.
 """
 
+import operator
 import re
+from bisect import bisect_left, bisect_right, insort
+from collections.abc import Mapping
+from itertools import compress
+
+from compact import to_compact
+from instrumentation import instrument_module
+from integrity import DEFAULT_ON_DELETE, enforce_on_delete, enforce_on_delete_many
+from query_cache import CACHE_SIZE, QueryCache
+from text_index import SEARCH_LIMIT, TextIndex
+
+# Record types that are indexed by the RecordStore
+INDEXED_TYPES = ("Client", "Airline")
+
+# Flight fields the flight indexes are keyed on
+FLIGHT_INDEX_FIELDS = ("Client_ID", "Airline_ID", "Date", "Start City", "End City")
+
+# Key under which the next free ID of each type is saved with the records
+SEQUENCE_KEY = "Next ID"
+
+# Fields that must not be blank when a record is created from the form or
+# imported, by record type
+REQUIRED_FIELDS = {
+    "Client": ("Name", "Address Line 1", "Address Line 2", "Address Line 3", "City", "State",
+               "Zip Code", "Country", "Phone Number"),
+    "Airline": ("Company Name",),
+    "Flight": ("Client_ID", "Airline_ID", "Date", "Start City", "End City"),
+}
+
 
 def validate_input(passed_id):
     """
@@ -28,6 +61,876 @@ def validate_input(passed_id):
         return passed_id
 
 
+def missing_fields(record_type, data):
+    """
+    This function lists the required fields left blank in new record data
+    :param record_type: Client, Airline or Flight
+    :param data: the data of the new record
+    :return: the names of the missing fields, empty if none are missing
+    """
+    return [field for field in REQUIRED_FIELDS.get(record_type, ()) if not data.get(field)]
+
+
+def record_key(record_type, record):
+    """
+    Return a key identifying a record for as long as it is in memory.
+    Clients and Airlines are keyed by ID; Flights have no ID of their own
+    so the identity of the record object is used.
+    :param record_type: the type of the record
+    :param record: the record
+    :return: a string such as "Client:3"
+    """
+    if record_type in INDEXED_TYPES:
+        return f"{record_type}:{record.get('ID')}"
+    return f"{record_type}:{id(record)}"
+
+
+class ChangeSet:
+    """
+    The records inserted, updated and removed by one or more CRUD calls.
+    Each list holds (record_type, key, record) tuples; for updates the key
+    is the one the record had before the update.
+    """
+
+    def __init__(self):
+        self.inserted = []
+        self.updated = []
+        self.removed = []
+
+    def __bool__(self):
+        return bool(self.inserted or self.updated or self.removed)
+
+    def __repr__(self):
+        return (f"ChangeSet(inserted={len(self.inserted)}, updated={len(self.updated)}, "
+                f"removed={len(self.removed)})")
+
+    def for_type(self, record_type):
+        """
+        :param record_type: the type of record to keep
+        :return: a ChangeSet with only the changes to that type
+        """
+        changes = ChangeSet()
+        changes.inserted = [change for change in self.inserted if change[0] == record_type]
+        changes.updated = [change for change in self.updated if change[0] == record_type]
+        changes.removed = [change for change in self.removed if change[0] == record_type]
+        return changes
+
+
+def date_key(value):
+    """
+    Turn a flight date into the string it is sorted by
+    :param value: an ISO date string such as "2025-10-15T09:00:00", a
+        date/datetime or None
+    :return: the ISO string, "" for a missing date
+    """
+    if type(value) is str:
+        return value
+    if value is None:
+        return ""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def _sort_by_date(flights):
+    """
+    :param flights: flights in list order
+    :return: (dates, flights) sorted by date, equal dates in list order
+    """
+    flights = list(flights)
+    dates = [date_key(flight.get("Date")) for flight in flights]
+    # Sorting positions rather than (date, flight) tuples keeps a large
+    # sort cheap; the sort is stable so equal dates keep list order
+    order = sorted(range(len(dates)), key=dates.__getitem__)
+    return [dates[position] for position in order], [flights[position] for position in order]
+
+
+class SortedFlights:
+    """
+    Flights kept in Date order, for range queries in O(log n).
+    dates and flights are parallel lists; flights with the same date keep
+    the order they were added in. Added flights wait in a pending list and
+    are merged in by the next query, so adding many flights in a row costs
+    O(1) each instead of an insert into the middle of a long list.
+    """
+
+    # Pending flights are inserted one by one while there are fewer than
+    # 1/MERGE_RATIO of the sorted ones, otherwise everything is re-sorted
+    MERGE_RATIO = 16
+
+    def __init__(self, flights=()):
+        """
+        :param flights: the flights to start with, in list order
+        """
+        self.dates, self.flights = _sort_by_date(flights)
+        self._pending = []
+
+    def __len__(self):
+        return len(self.flights) + len(self._pending)
+
+    def add(self, flight):
+        """Add a flight after any flights with the same date."""
+        self._pending.append(flight)
+
+    def _merge_pending(self):
+        """Move the pending flights into the sorted lists."""
+        pending = self._pending
+        if not pending:
+            return
+        self._pending = []
+        if len(pending) * self.MERGE_RATIO < len(self.flights):
+            for flight in pending:
+                date = date_key(flight.get("Date"))
+                position = bisect_right(self.dates, date)
+                self.dates.insert(position, date)
+                self.flights.insert(position, flight)
+        else:
+            # The sort is stable, so pending flights go after equal dates
+            self.dates, self.flights = _sort_by_date(self.flights + pending)
+
+    def remove(self, flight):
+        """Remove a flight by identity; it must still hold the date it was added with."""
+        self._merge_pending()
+        date = date_key(flight.get("Date"))
+        first, last = bisect_left(self.dates, date), bisect_right(self.dates, date)
+        # Many flights can share a date; compare their ids in C rather than
+        # the flights in a Python loop
+        try:
+            position = first + list(map(id, self.flights[first:last])).index(id(flight))
+        except ValueError:
+            return
+        del self.dates[position]
+        del self.flights[position]
+
+    def bounds(self, start_date=None, end_date=None):
+        """
+        :param start_date: the first date to include, None for no lower bound
+        :param end_date: the first date to exclude, None for no upper bound
+        :return: the (first, last) positions of the range, last excluded
+        """
+        self._merge_pending()
+        first = 0 if start_date is None else bisect_left(self.dates, date_key(start_date))
+        last = len(self.dates) if end_date is None else bisect_left(self.dates, date_key(end_date))
+        return first, max(first, last)
+
+    def range(self, start_date=None, end_date=None, offset=0, limit=None):
+        """
+        :return: the flights in [start_date, end_date) in date order,
+            skipping offset and returning at most limit of them
+        """
+        first, last = self.bounds(start_date, end_date)
+        first = min(first + offset, last)
+        if limit is not None:
+            last = min(last, first + limit)
+        return self.flights[first:last]
+
+    def count(self, start_date=None, end_date=None):
+        """
+        :return: the number of flights in [start_date, end_date)
+        """
+        first, last = self.bounds(start_date, end_date)
+        return last - first
+
+
+class ListPositions:
+    """
+    Finds records in a list by identity without scanning it, for a list
+    that only grows at the end and loses records through remove().
+    Each record gets the next ticket number when it is added, so tickets
+    follow list order; a record's position is its ticket less the number
+    of removed tickets before it.
+    """
+
+    # Removing more records than this takes one pass over the list instead:
+    # each del moves the rest of the list, about 1/400 of the cost of a
+    # Python-level pass, so past a few hundred records the pass is cheaper
+    POSITIONAL_LIMIT = 256
+
+    # After this many removals the tickets are renumbered from the list
+    REBUILD_AFTER = 4096
+
+    def __init__(self, records_list):
+        """
+        :param records_list: the list to track, changed only through add() and remove() from now on
+        """
+        self.records_list = records_list
+        self.tickets = {id(record): ticket for ticket, record in enumerate(records_list)}
+        self.next_ticket = len(records_list)
+        self.removed = []
+
+    def add(self, record):
+        """Track a record just appended to the list."""
+        self.tickets[id(record)] = self.next_ticket
+        self.next_ticket += 1
+
+    def position(self, record):
+        """
+        :return: the position of the record in the list, None if it is not
+            where its ticket says, e.g. after the list was changed directly
+        """
+        ticket = self.tickets.get(id(record))
+        if ticket is None:
+            return None
+        position = ticket - bisect_left(self.removed, ticket)
+        records_list = self.records_list
+        if position < len(records_list) and records_list[position] is record:
+            return position
+        return None
+
+    def remove(self, records):
+        """
+        Remove records from the list, keeping the order of the others
+        :param records: the records to remove, each once
+        :return: False if a record was not found, leaving the list unchanged
+        """
+        positions = [self.position(record) for record in records]
+        if None in positions:
+            return False
+        for position in sorted(positions, reverse=True):
+            del self.records_list[position]
+        for record in records:
+            insort(self.removed, self.tickets.pop(id(record)))
+        return True
+
+
+class RecordStore(dict):
+    """
+    The nested records dict with hash indexes kept alongside it.
+
+    The Client, Airline and Flight lists stay the source of truth (so the
+    store can be saved with storage.save_records as before) and the indexes
+    are updated by every mutation made through the CRUD functions:
+
+    by_id: {"Client": {ID: record}, "Airline": {ID: record}}
+    flights_by_client: {Client_ID: [flight, ...]}
+    flights_by_airline: {Airline_ID: [flight, ...]}
+    flights_by_date: every flight as a SortedFlights
+    flights_by_route: {(Start City, End City): SortedFlights}
+    flights_by_origin: {Start City: SortedFlights}
+    flights_by_destination: {End City: SortedFlights}
+    passengers_by_airline: {Airline_ID: {Client_ID: number of flights}}
+    flight_positions: a ListPositions over the Flight list, built by the
+        first flight removal, so removing flights takes time proportional
+        to their number rather than a pass over the Flight list; also
+        used by first_flight() to pick among flights by list order
+
+    query_flights() and count_flights() answer date range and route
+    queries from the sorted indexes without walking the Flight list.
+    itinerary(), manifest() and passengers() join flights with their
+    airline or client through the same indexes, in time proportional to
+    the number of rows returned.
+
+    versions counts the changes made to each record type. The joins and
+    search_records() keep their results in a query_cache.QueryCache of
+    cache_size entries, reused until a type they read from changes.
+
+    The next ID of each type is kept under SEQUENCE_KEY so it is saved with
+    the records and IDs are never reused after a delete.
+
+    With compact=True the records are held as the slotted classes from
+    compact.py, which use a fraction of the memory of dicts.
+
+    build_text_index() adds a text_index.TextIndex over client names,
+    cities, phone numbers and zip codes and airline names, which is then
+    kept up to date the same way and searched with search_text().
+    """
+
+    def __init__(self, records_json=None, compact=False, cache_size=CACHE_SIZE):
+        super().__init__(records_json or {})
+        self.compact = compact
+        self.text_index = None
+        self.versions = {record_type: 0 for record_type in ("Client", "Airline", "Flight")}
+        self.query_cache = QueryCache(cache_size)
+        if compact:
+            for record_type in ("Client", "Airline", "Flight"):
+                if record_type in self:
+                    self[record_type] = [to_compact(record_type, record) for record in self[record_type]]
+        self.reindex()
+        self.seed_sequence()
+
+    def seed_sequence(self):
+        """
+        Make sure the next ID of each type is past every ID already in use
+        """
+        sequence = dict(self.get(SEQUENCE_KEY) or {})
+        for record_type in INDEXED_TYPES:
+            highest = max(self.by_id[record_type], default=0)
+            sequence[record_type] = max(sequence.get(record_type, 1), highest + 1)
+        self[SEQUENCE_KEY] = sequence
+
+    def allocate_id(self, record_type):
+        """
+        Reserve the next ID for a record type
+        :param record_type: Client or Airline
+        :return: the new ID
+        """
+        sequence = self[SEQUENCE_KEY]
+        new_id = sequence[record_type]
+        sequence[record_type] = new_id + 1
+        return new_id
+
+    def allocate_ids(self, record_type, count):
+        """
+        Reserve a block of consecutive IDs for a record type
+        :param record_type: Client or Airline
+        :param count: the number of IDs
+        :return: a range of the new IDs
+        """
+        sequence = self[SEQUENCE_KEY]
+        first = sequence[record_type]
+        sequence[record_type] = first + count
+        return range(first, first + count)
+
+    def reindex(self):
+        """
+        Rebuild every index from the record lists
+        """
+        for record_type in self.versions:
+            self.versions[record_type] += 1
+        self.by_id = {record_type: {} for record_type in INDEXED_TYPES}
+        self.flights_by_client = {}
+        self.flights_by_airline = {}
+        self.passengers_by_airline = {}
+        # The sorted indexes are built in one go below rather than flight by flight
+        self.flights_by_date = None
+        self.flight_positions = None
+        for record_type in INDEXED_TYPES:
+            for record in self.get(record_type, []):
+                self._index(record_type, record)
+        flights = [flight for flight in self.get("Flight", []) if isinstance(flight, Mapping)]
+        for flight in flights:
+            self._index("Flight", flight)
+        self.flights_by_date = SortedFlights(flights)
+        self.flights_by_route = _group_sorted(self.flights_by_date, _route)
+        self.flights_by_origin = _group_sorted(self.flights_by_date, lambda flight: flight.get("Start City"))
+        self.flights_by_destination = _group_sorted(self.flights_by_date, lambda flight: flight.get("End City"))
+        if self.text_index is not None:
+            self.build_text_index()
+
+    def build_text_index(self):
+        """
+        Index the text fields of every client and airline for search_text()
+        """
+        text_index = TextIndex()
+        text_index.rebuild(self)
+        self.text_index = text_index
+
+    def _index(self, record_type, record):
+        """
+        Add a single record to the indexes
+        :param record_type: the type of the record
+        :param record: the record to index
+        """
+        if not isinstance(record, Mapping):
+            return
+        if record_type in self.by_id:
+            if "ID" in record:
+                self.by_id[record_type][record["ID"]] = record
+                if self.text_index is not None:
+                    self.text_index.add(record_type, record)
+        elif record_type == "Flight":
+            self.flights_by_client.setdefault(record.get("Client_ID"), []).append(record)
+            self.flights_by_airline.setdefault(record.get("Airline_ID"), []).append(record)
+            _count_passenger(self.passengers_by_airline, record, 1)
+            if self.flights_by_date is not None:
+                self.flights_by_date.add(record)
+                _add_to_sorted(self.flights_by_route, _route(record), record)
+                _add_to_sorted(self.flights_by_origin, record.get("Start City"), record)
+                _add_to_sorted(self.flights_by_destination, record.get("End City"), record)
+
+    def _unindex(self, record_type, record, buckets=True):
+        """
+        Remove a single record from the indexes
+        :param record_type: the type of the record
+        :param record: the record to remove
+        :param buckets: also remove a flight from flights_by_client and
+            flights_by_airline; remove_records does that for all at once
+        """
+        if not isinstance(record, Mapping):
+            return
+        if record_type in self.by_id:
+            if self.by_id[record_type].get(record.get("ID")) is record:
+                del self.by_id[record_type][record["ID"]]
+                if self.text_index is not None:
+                    self.text_index.remove(record_type, record)
+        elif record_type == "Flight":
+            if buckets:
+                _remove_from_multimap(self.flights_by_client, record.get("Client_ID"), record)
+                _remove_from_multimap(self.flights_by_airline, record.get("Airline_ID"), record)
+            _count_passenger(self.passengers_by_airline, record, -1)
+            self.flights_by_date.remove(record)
+            _remove_from_sorted(self.flights_by_route, _route(record), record)
+            _remove_from_sorted(self.flights_by_origin, record.get("Start City"), record)
+            _remove_from_sorted(self.flights_by_destination, record.get("End City"), record)
+
+    def get_record(self, record_type, record_id):
+        """
+        Look up a Client or Airline by its ID
+        :param record_type: Client or Airline
+        :param record_id: the ID of the record
+        :return: the record or None if it does not exist
+        """
+        return self.by_id.get(record_type, {}).get(record_id)
+
+    def flights_for_client(self, client_id):
+        """
+        :param client_id: the ID of the client
+        :return: the flights booked by the client
+        """
+        return self.flights_by_client.get(client_id, [])
+
+    def flights_for_airline(self, airline_id):
+        """
+        :param airline_id: the ID of the airline
+        :return: the flights operated by the airline
+        """
+        return self.flights_by_airline.get(airline_id, [])
+
+    def cached_query(self, key, record_types, compute):
+        """
+        Run a query through the query cache
+        :param key: a hashable description of the query
+        :param record_types: the types the query reads
+        :param compute: runs the query
+        :return: the result, shared with the cache, so it must not be changed
+        """
+        versions = tuple(self.versions.get(record_type, 0) for record_type in record_types)
+        return self.query_cache.cached(key, versions, compute)
+
+    def _join(self, flights, record_type, field):
+        """
+        :return: (flight, record) pairs in date order, the record of
+            record_type found by the flight's field, None if it does not exist
+        """
+        by_id = self.by_id[record_type]
+        flights = sorted(flights, key=lambda flight: date_key(flight.get("Date")))
+        return [(flight, by_id.get(flight.get(field))) for flight in flights]
+
+    def itinerary(self, client_id):
+        """
+        :param client_id: the ID of the client
+        :return: (flight, airline) pairs for the client's flights in date
+            order, airline None if it no longer exists
+        """
+        return list(self.cached_query(
+            ("itinerary", client_id), ("Flight", "Airline"),
+            lambda: self._join(self.flights_for_client(client_id), "Airline", "Airline_ID")))
+
+    def manifest(self, airline_id):
+        """
+        :param airline_id: the ID of the airline
+        :return: (flight, client) pairs for the airline's flights in date
+            order, client None if it no longer exists
+        """
+        return list(self.cached_query(
+            ("manifest", airline_id), ("Flight", "Client"),
+            lambda: self._join(self.flights_for_airline(airline_id), "Client", "Client_ID")))
+
+    def passengers(self, airline_id):
+        """
+        :param airline_id: the ID of the airline
+        :return: the clients with at least one flight on the airline, each
+            once, in the order of their first booking
+        """
+        clients = self.by_id["Client"]
+        return list(self.cached_query(
+            ("passengers", airline_id), ("Flight", "Client"),
+            lambda: [clients[client_id] for client_id in self.passengers_by_airline.get(airline_id, ())
+                     if client_id in clients]))
+
+    def search_text(self, record_type, query, limit=SEARCH_LIMIT):
+        """
+        Find clients or airlines by the start or any part of the words in
+        their text fields, building the text index on first use
+        :param record_type: Client or Airline
+        :param query: the text typed by the user, e.g. "emma lon" or "020 1234"
+        :param limit: the most records to return
+        :return: the matching records
+        """
+        if self.text_index is None:
+            self.build_text_index()
+        by_id = self.by_id.get(record_type, {})
+        ids = self.text_index.search(record_type, query, by_id.get, limit)
+        return [by_id[record_id] for record_id in ids]
+
+    def _flights_index(self, start_city=None, end_city=None):
+        """
+        :return: the SortedFlights holding the flights between the cities,
+            any city standing for None
+        """
+        if start_city is not None and end_city is not None:
+            return self.flights_by_route.get((start_city, end_city), SortedFlights())
+        if start_city is not None:
+            return self.flights_by_origin.get(start_city, SortedFlights())
+        if end_city is not None:
+            return self.flights_by_destination.get(end_city, SortedFlights())
+        return self.flights_by_date
+
+    def query_flights(self, start_date=None, end_date=None, start_city=None, end_city=None,
+                      offset=0, limit=None):
+        """
+        Find flights by date range and route, in date order
+        :param start_date: the first date to include, e.g. "2025-10-13"
+        :param end_date: the first date to exclude, e.g. "2025-10-20"
+        :param start_city: only flights leaving this city
+        :param end_city: only flights arriving in this city
+        :param offset: the number of matching flights to skip, for paging
+        :param limit: the most flights to return, None for all
+        :return: the matching flights
+        """
+        return self._flights_index(start_city, end_city).range(start_date, end_date, offset, limit)
+
+    def count_flights(self, start_date=None, end_date=None, start_city=None, end_city=None):
+        """
+        Count the flights query_flights would return without a limit
+        :return: the number of matching flights
+        """
+        return self._flights_index(start_city, end_city).count(start_date, end_date)
+
+    def match_records(self, record_type, ids=None, where=None, start_date=None, end_date=None):
+        """
+        Find the records matching every given criterion, starting from the
+        narrowest index: the ID maps for ids, the Client_ID / Airline_ID
+        maps or the date and route indexes for flights
+        :param record_type: Client, Airline or Flight
+        :param ids: IDs to match; the Client_ID of flights, as search_records
+        :param where: {field: value} pairs the records must equal
+        :param start_date: the first flight date to match, e.g. "2025-10-13"
+        :param end_date: the first flight date not to match
+        :return: the matching records, each once
+        """
+        where = where or {}
+        dated = start_date is not None or end_date is not None
+        if record_type == "Flight":
+            if ids is not None:
+                candidates = [flight for client_id in dict.fromkeys(ids)
+                              for flight in self.flights_for_client(client_id)]
+            elif "Client_ID" in where:
+                candidates = self.flights_for_client(where["Client_ID"])
+            elif "Airline_ID" in where:
+                candidates = self.flights_for_airline(where["Airline_ID"])
+            elif dated or "Start City" in where or "End City" in where:
+                candidates = self.query_flights(start_date, end_date, where.get("Start City"), where.get("End City"))
+            else:
+                candidates = self[record_type]
+        elif dated:
+            # Only flights have a date
+            return []
+        elif ids is not None:
+            candidates = [record for record in map(self.by_id[record_type].get, dict.fromkeys(ids))
+                          if record is not None]
+        else:
+            candidates = self.get(record_type, [])
+
+        matches = []
+        for record in candidates:
+            if not isinstance(record, Mapping):
+                continue
+            if dated:
+                date = date_key(record.get("Date"))
+                if (start_date is not None and date < start_date) or (end_date is not None and date >= end_date):
+                    continue
+            if all(record.get(field) == value for field, value in where.items()):
+                matches.append(record)
+        return matches
+
+    def add_record(self, record_type, record, changes=None):
+        """
+        Append a record to its list and index it
+        :param record_type: the type of the record
+        :param record: the record to add
+        :param changes: a ChangeSet to record the insert in
+        :return: the record as stored
+        """
+        if self.compact:
+            record = to_compact(record_type, record)
+        self.versions[record_type] = self.versions.get(record_type, 0) + 1
+        self[record_type].append(record)
+        if record_type == "Flight" and self.flight_positions is not None:
+            self.flight_positions.add(record)
+        self._index(record_type, record)
+        if changes is not None:
+            changes.inserted.append((record_type, record_key(record_type, record), record))
+        return record
+
+    def change_record(self, record_type, record, data, changes=None):
+        """
+        Update a record in place and move it in the indexes if a key changed
+        :param record_type: the type of the record
+        :param record: the record to update
+        :param data: the fields to update the record with
+        :param changes: a ChangeSet to record the update in
+        """
+        key = record_key(record_type, record)
+        self.versions[record_type] = self.versions.get(record_type, 0) + 1
+        if record_type == "Flight" and isinstance(record, Mapping) and self.flights_by_date is not None:
+            self._change_flight(record, data)
+        else:
+            self._unindex(record_type, record)
+            try:
+                record.update(data)
+            finally:
+                self._index(record_type, record)
+        if changes is not None:
+            changes.updated.append((record_type, key, record))
+
+    def _change_flight(self, flight, data):
+        """
+        Update a flight in place, moving it only in the indexes whose key
+        fields change, so it keeps its place in the others
+        """
+        changed = {field for field in FLIGHT_INDEX_FIELDS if field in data and data[field] != flight.get(field)}
+        if not changed:
+            flight.update(data)
+            return
+        dated = "Date" in changed
+        multimaps = [(groups, field) for field, groups in (("Client_ID", self.flights_by_client),
+                                                           ("Airline_ID", self.flights_by_airline))
+                     if field in changed]
+        # A date change moves the flight within every sorted index
+        sorted_groups = [(groups, key) for moved, groups, key in (
+            (dated or "Start City" in changed or "End City" in changed, self.flights_by_route, _route),
+            (dated or "Start City" in changed, self.flights_by_origin, lambda f: f.get("Start City")),
+            (dated or "End City" in changed, self.flights_by_destination, lambda f: f.get("End City"))) if moved]
+        for groups, field in multimaps:
+            _remove_from_multimap(groups, flight.get(field), flight)
+        if multimaps:
+            _count_passenger(self.passengers_by_airline, flight, -1)
+        if dated:
+            self.flights_by_date.remove(flight)
+        for groups, key in sorted_groups:
+            _remove_from_sorted(groups, key(flight), flight)
+        try:
+            flight.update(data)
+        finally:
+            for groups, field in multimaps:
+                groups.setdefault(flight.get(field), []).append(flight)
+            if multimaps:
+                _count_passenger(self.passengers_by_airline, flight, 1)
+            if dated:
+                self.flights_by_date.add(flight)
+            for groups, key in sorted_groups:
+                _add_to_sorted(groups, key(flight), flight)
+
+    def remove_record(self, record_type, record, changes=None):
+        """
+        Remove a record from its list and from the indexes
+        :param record_type: the type of the record
+        :param record: the record to remove
+        :param changes: a ChangeSet to record the removal in
+        """
+        self.versions[record_type] = self.versions.get(record_type, 0) + 1
+        self._unindex(record_type, record)
+        if record_type == "Flight":
+            self._remove_flights([record])
+        else:
+            _remove_from_list(self[record_type], record)
+        if changes is not None:
+            changes.removed.append((record_type, record_key(record_type, record), record))
+
+    def remove_records(self, record_type, records_to_remove, changes=None):
+        """
+        Remove several records of one type; flights by their position (see
+        ListPositions), clients and airlines in a single pass over their list
+        :param record_type: the type of the records
+        :param records_to_remove: the records to remove
+        :param changes: a ChangeSet to record the removals in
+        """
+        doomed = {id(record): record for record in records_to_remove}
+        if not doomed:
+            return
+        self.versions[record_type] = self.versions.get(record_type, 0) + 1
+        for record in doomed.values():
+            self._unindex(record_type, record, buckets=False)
+            if changes is not None:
+                changes.removed.append((record_type, record_key(record_type, record), record))
+        if record_type == "Flight":
+            self._remove_from_buckets(doomed)
+            if len(doomed) <= ListPositions.POSITIONAL_LIMIT:
+                self._remove_flights(list(doomed.values()))
+                return
+        # Keep the records whose id is not doomed; map and compress run the
+        # pass over the list in C, so it stays cheap when few records go
+        records_list = self[record_type]
+        keep = map(operator.not_, map(doomed.__contains__, map(id, records_list)))
+        records_list[:] = list(compress(records_list, keep))
+        if record_type == "Flight":
+            self.flight_positions = None
+
+    def _remove_from_buckets(self, doomed):
+        """
+        Remove flights from flights_by_client and flights_by_airline with one
+        pass over each list they are in, rather than a search per flight; a
+        list is dropped whole when all of its flights go, as a cascaded
+        client's do
+        :param doomed: {id(flight): flight} of the flights to remove
+        """
+        for groups, field in ((self.flights_by_client, "Client_ID"), (self.flights_by_airline, "Airline_ID")):
+            for key in {flight.get(field) for flight in doomed.values() if isinstance(flight, Mapping)}:
+                bucket = groups.get(key)
+                if bucket is None:
+                    continue
+                keep = map(operator.not_, map(doomed.__contains__, map(id, bucket)))
+                bucket[:] = list(compress(bucket, keep))
+                if not bucket:
+                    del groups[key]
+
+    def first_flight(self, flights):
+        """
+        The flight of flights that comes first in the Flight list. The
+        buckets of flights_by_client are not in list order once a flight
+        has moved between them, while a replay after compaction and SQLite's
+        MIN(flight_id) both pick by list order
+        :param flights: flights from the indexes
+        :return: the first of them, None if there are none
+        """
+        if len(flights) < 2:
+            return flights[0] if flights else None
+        found = [self._flight_positions().position(flight) for flight in flights]
+        if None in found:
+            # The list was changed other than through the store; renumber it
+            self.flight_positions = None
+            found = [self._flight_positions().position(flight) for flight in flights]
+        if None in found:
+            wanted = set(map(id, flights))
+            return next((flight for flight in self["Flight"] if id(flight) in wanted), None)
+        return flights[found.index(min(found))]
+
+    def _flight_positions(self):
+        """
+        :return: the ListPositions of the Flight list, built if needed
+        """
+        positions = self.flight_positions
+        if (positions is None or positions.records_list is not self["Flight"]
+                or len(positions.removed) > ListPositions.REBUILD_AFTER):
+            positions = self.flight_positions = ListPositions(self["Flight"])
+        return positions
+
+    def _remove_flights(self, flights):
+        """
+        Remove flights from the Flight list by their position
+        :param flights: the flights to remove, each once
+        """
+        positions = self._flight_positions()
+        if positions.remove(flights):
+            return
+        # The list was changed other than through the store; renumber it
+        positions = self.flight_positions = ListPositions(self["Flight"])
+        if not positions.remove(flights):
+            for flight in flights:
+                _remove_from_list(self["Flight"], flight)
+            self.flight_positions = None
+
+
+def _remove_from_multimap(multimap, key, record):
+    """
+    Remove a record from the list stored under key, dropping empty lists
+    """
+    bucket = multimap.get(key)
+    if bucket is None:
+        return
+    _remove_from_list(bucket, record)
+    if not bucket:
+        del multimap[key]
+
+
+def _count_passenger(passengers, flight, step):
+    """
+    Add step to the flight count of the flight's client under its airline,
+    dropping counts that reach zero
+    """
+    airline_id, client_id = flight.get("Airline_ID"), flight.get("Client_ID")
+    counts = passengers.get(airline_id)
+    if counts is None:
+        counts = passengers[airline_id] = {}
+    count = counts.get(client_id, 0) + step
+    if count > 0:
+        counts[client_id] = count
+    else:
+        counts.pop(client_id, None)
+        if not counts:
+            del passengers[airline_id]
+
+
+def _route(flight):
+    """
+    :return: the (Start City, End City) key of a flight in flights_by_route
+    """
+    return flight.get("Start City"), flight.get("End City")
+
+
+def _group_sorted(by_date, key):
+    """
+    Split flights already in date order into groups that stay in date order
+    :param by_date: the SortedFlights of every flight
+    :param key: returns the group of a flight
+    :return: {key: SortedFlights}
+    """
+    groups = {}
+    for date, flight in zip(by_date.dates, by_date.flights):
+        group = groups.get(key(flight))
+        if group is None:
+            group = groups[key(flight)] = SortedFlights()
+        group.dates.append(date)
+        group.flights.append(flight)
+    return groups
+
+
+def _add_to_sorted(groups, key, flight):
+    """
+    Add a flight to the SortedFlights stored under key, creating it if needed
+    """
+    sorted_flights = groups.get(key)
+    if sorted_flights is None:
+        sorted_flights = groups[key] = SortedFlights()
+    sorted_flights.add(flight)
+
+
+def _remove_from_sorted(groups, key, flight):
+    """
+    Remove a flight from the SortedFlights stored under key, dropping empty ones
+    """
+    sorted_flights = groups.get(key)
+    if sorted_flights is None:
+        return
+    sorted_flights.remove(flight)
+    if not sorted_flights:
+        del groups[key]
+
+
+def _remove_from_list(records_list, record):
+    """
+    Remove a record from a list by identity rather than equality
+    """
+    for position in range(len(records_list) - 1, -1, -1):
+        if records_list[position] is record:
+            del records_list[position]
+            return
+
+
+def _as_store(records_json):
+    """
+    Return records_json if it is already a RecordStore, otherwise a
+    RecordStore sharing the same lists so mutations are seen by the caller.
+    A plain dict is indexed again on every call, as it may have been
+    changed directly since; callers making many calls pass a RecordStore
+    """
+    if isinstance(records_json, RecordStore):
+        return records_json
+    return RecordStore(records_json)
+
+
+def _search_index(store, type_search, id_search):
+    """
+    :return: the Client or Airline with the ID, or the flights of the
+        client with the ID, as a list
+    """
+    if type_search in INDEXED_TYPES:
+        record = store.get_record(type_search, id_search)
+        return [record] if record is not None else []
+    return list(store.flights_for_client(id_search))
+
+
 def search_records(records_json, id_search , type_search):   # Changed default
     """
     This function searches the json list using a specific id and type
@@ -36,21 +939,19 @@ def search_records(records_json, id_search , type_search):   # Changed default
     :param type_search: the entry type,
     :return: the result of the search
     """
-    result = []
-
     id_search = validate_input(id_search)
 
     if id_search != -1:
-    # Searches the list if only the Type is passed
         if type_search in records_json:
-            for element in records_json[type_search]:
-                if element.get("ID") == id_search or element.get("Client_ID") == id_search:
-                    try:
-                        result.append(element)
-                    except AttributeError:
-                        print("Error: Record in not a Json object")
-                    except TypeError:
-                        print("Error: Data must be a Json object")
+            store = _as_store(records_json)
+            if type_search in INDEXED_TYPES or type_search == "Flight":
+                result = list(store.cached_query(("search_records", type_search, id_search), (type_search,),
+                                                 lambda: _search_index(store, type_search, id_search)))
+            else:
+                # Types without an index are scanned
+                result = [element for element in records_json[type_search]
+                          if isinstance(element, Mapping) and
+                          (element.get("ID") == id_search or element.get("Client_ID") == id_search)]
             if not result:
                  # ID Not Found
                 return -1
@@ -59,141 +960,189 @@ def search_records(records_json, id_search , type_search):   # Changed default
         return -2
     return id_search # Invalid ID
 
-def create_record(records_json, data, type_create):
+def search_text(records_json, query, type_search, limit=SEARCH_LIMIT):
+    """
+    This function searches clients or airlines by partial name, city, phone
+    number or zip code (clients) or company name (airlines)
+    :param records_json: the json object
+    :param query: the text to search for
+    :param type_search: Client or Airline
+    :param limit: the most records to return
+    :return: the matching records, an empty list if none match
+    """
+    if type_search not in INDEXED_TYPES or type_search not in records_json:
+        # Invalid Type
+        return -2
+    return _as_store(records_json).search_text(type_search, query, limit)
+
+def query_flights(records_json, start_date=None, end_date=None, start_city=None, end_city=None,
+                  offset=0, limit=None):
+    """
+    This function finds flights by date range and route, in date order
+    :param records_json: the json object
+    :param start_date: the first date to include, e.g. "2025-10-13"
+    :param end_date: the first date to exclude, e.g. "2025-10-20"
+    :param start_city: only flights leaving this city
+    :param end_city: only flights arriving in this city
+    :param offset: the number of matching flights to skip, for paging
+    :param limit: the most flights to return, None for all
+    :return: the matching flights
+    """
+    return _as_store(records_json).query_flights(start_date, end_date, start_city, end_city, offset, limit)
+
+def count_flights(records_json, start_date=None, end_date=None, start_city=None, end_city=None):
+    """
+    This function counts the flights query_flights would return
+    :return: the number of matching flights
+    """
+    return _as_store(records_json).count_flights(start_date, end_date, start_city, end_city)
+
+def client_itinerary(records_json, client_id):
+    """
+    This function lists a client's flights with the airline of each
+    :param records_json: the json object
+    :param client_id: the ID of the client
+    :return: (flight, airline) pairs in date order, -1 if the client does not exist
+    """
+    client_id = validate_input(client_id)
+    store = _as_store(records_json)
+    if client_id == -1 or store.get_record("Client", client_id) is None:
+        return -1
+    return store.itinerary(client_id)
+
+def airline_manifest(records_json, airline_id):
+    """
+    This function lists an airline's flights with the client of each
+    :param records_json: the json object
+    :param airline_id: the ID of the airline
+    :return: (flight, client) pairs in date order, -1 if the airline does not exist
+    """
+    airline_id = validate_input(airline_id)
+    store = _as_store(records_json)
+    if airline_id == -1 or store.get_record("Airline", airline_id) is None:
+        return -1
+    return store.manifest(airline_id)
+
+def airline_passengers(records_json, airline_id):
+    """
+    This function lists the clients flying with an airline, each once
+    :param records_json: the json object
+    :param airline_id: the ID of the airline
+    :return: the clients, -1 if the airline does not exist
+    """
+    airline_id = validate_input(airline_id)
+    store = _as_store(records_json)
+    if airline_id == -1 or store.get_record("Airline", airline_id) is None:
+        return -1
+    return store.passengers(airline_id)
+
+def create_record(records_json, data, type_create, changes=None):
     """
     This function creates a new entry in the json object
     :param records_json: the json object
     :param data: a list of data that needs to be added to the json object
     :param type_create: the type of record that needs to be created
+    :param changes: a ChangeSet that the created record is added to
     :return: result of creation
     """
+    if type_create not in records_json:
+        return -2 # INVALID TYPE
 
-    global client, airline
+    store = _as_store(records_json)
 
     if type_create == 'Flight':
-        # Test if the Client_ID in data is in the json record
-        for element in records_json["Client"]:
-            if element.get("ID") == data.get("Client_ID"):
-                client = True
-                break
-            client = False
-        # Test if the Airline_ID in data is in the json record
-        for element in records_json["Airline"]:
-            if element.get("ID") == data.get("Airline_ID"):
-                airline = True
-                break
-            airline = False
-        # Test the result and append Flights
-        if client is False:
+        # IDs typed into the GUI arrive as strings
+        client_id = validate_input(data.get("Client_ID"))
+        airline_id = validate_input(data.get("Airline_ID"))
+        # Test if the Client_ID and Airline_ID in data are in the json record,
+        # a hash lookup in the ID indexes rather than a scan of the lists
+        if store.get_record("Client", client_id) is None:
             return -1 # Invalid ID
-        if airline is False:
+        if store.get_record("Airline", airline_id) is None:
             return -1 # Invalid ID
-        try:
-            records_json['Flight'].append(data)
-        except AttributeError:
-            print("Error: Record in not a Json object")
-        except TypeError:
-            print("Error: Data must be a Json object")
-        return print(records_json["Flight"])
-
-    # Test the type_create in the json record, if so, append
-    if type_create in records_json:
-        if records_json[type_create] == [{}]:
-            max_id = 0
-        else:
-            max_id = max(r["ID"] for r in records_json[type_create])
+        if client_id != data["Client_ID"] or airline_id != data["Airline_ID"]:
+            data = dict(data, Client_ID=client_id, Airline_ID=airline_id)
+        store.add_record("Flight", data, changes)
+        return "Entry has been created successfully"
 
-        updates_data = {'ID': max_id + 1, 'Type':type_create}
-        try:
-            updates_data.update(data)
-            records_json[type_create].append(updates_data)
-        except AttributeError:
-            print("Error: Record in not a Json object")
-        except TypeError:
-            print("Error: Data must be a Json object")
-    else:
+    if type_create not in INDEXED_TYPES:
         return -2 # INVALID TYPE
 
+    updates_data = {'ID': store.allocate_id(type_create), 'Type':type_create}
+    if store is not records_json:
+        # Keep the sequence with the caller's records so it is saved with them
+        records_json[SEQUENCE_KEY] = store[SEQUENCE_KEY]
+    try:
+        updates_data.update(data)
+        store.add_record(type_create, updates_data, changes)
+    except AttributeError:
+        print("Error: Record in not a Json object")
+    except TypeError:
+        print("Error: Data must be a Json object")
+
     # Tests if the new record has been updated successfully
     if records_json[type_create][-1] == updates_data:
         return "Entry has been created successfully"
     return "Entry has not been created"
 
-def update_record(records_json, type_update, data, client_id=None, airline_id =None):
+def update_record(records_json, type_update, data, client_id=None, airline_id =None, changes=None):
     """
     This function modifies an existing record in the json object
     :param client_id: The ID of the client
     :param airline_id: The ID of the airline
     :param records_json: the json object
     :param type_update: the identification number of the record to update
-    :param data: a list of data to update the entry with
+    :param data: a list of data to update the entry with; ID and Type are ignored
+    :param changes: a ChangeSet that the updated record is added to
     :return: the result of the update
     """
-
     if type_update == 'Client':
-        # Test if the Client_ID in data is in the json record and updates record
-        client_id = validate_input(client_id)
-        if client_id != -1:
-            for element in records_json["Client"]:
-                if element.get("ID") == client_id:
-                    try:
-                        element.update(data)
-                    except AttributeError:
-                        print("Error: Record in not a Json object")
-                    except TypeError:
-                        print("Error: Data must be a Json object")
-                    return 1 # Successful update
-            # ID NOT FOUND
-            return  -1
-        else:
-            return client_id # Invalid ID
-
+        record_id = validate_input(client_id)
     elif type_update == "Airline":
-        # Test if the Airline_ID in data is in the json record and updates record
-        airline_id =  validate_input(airline_id)
-        if airline_id != -1:
-            for element in records_json["Airline"]:
-                if element.get("ID") == airline_id:
-                    try:
-                        element.update(data)
-                    except AttributeError:
-                        print("Error: Record in not a Json object")
-                    except TypeError:
-                        print("Error: Data must be a Json object")
-                    return 1 # Successful update
-                # ID NOT FOUND
-                return -1
-        else:
-            return airline_id # Invalid ID
-
+        record_id = validate_input(airline_id)
     elif type_update == "Flight":
-
-        # Test if the Airline_ID and Client_ID in data in the Json record and updates record
         client_id = validate_input(client_id)
         airline_id = validate_input(airline_id)
-
-        if client_id != -1 and airline_id != -1:
-            for element in records_json["Flight"]:
-                if (element.get("Client_ID") == client_id and
-                        element.get("Airline_ID") == airline_id):
-                    try:
-                        element.update(data)
-                    except AttributeError:
-                        print("Error: Record in not a Json object")
-                    except TypeError:
-                        print("Error: Data must be a Json object")
-                    return 1 # Successful update
-                return -1 # IDs NOT FOUND
+        if client_id == -1 or airline_id == -1:
+            return -1 # Invalid ID
     else:
         return -2 # TYPE NOT FOUND
 
-def delete_record(records_json,type_delete, client_id=None, airline_id = None):
+    store = _as_store(records_json)
+
+    if type_update == "Flight":
+        # Test if the Airline_ID and Client_ID in data in the Json record
+        element = store.first_flight([flight for flight in store.flights_for_client(client_id)
+                                      if flight.get("Airline_ID") == airline_id])
+    else:
+        # Test if the ID in data is in the json record
+        if record_id == -1:
+            return record_id # Invalid ID
+        element = store.get_record(type_update, record_id)
+
+    if element is None:
+        return -1 # ID NOT FOUND
+    if isinstance(data, Mapping) and ("ID" in data or "Type" in data):
+        # The ID and type name the record in the indexes, so they are kept
+        data = {key: value for key, value in data.items() if key not in ("ID", "Type")}
+    try:
+        store.change_record(type_update, element, data, changes)
+    except AttributeError:
+        print("Error: Record in not a Json object")
+    except TypeError:
+        print("Error: Data must be a Json object")
+    return 1 # Successful update
+
+def delete_record(records_json,type_delete, client_id=None, airline_id = None, changes=None, on_delete=None):
     """
     This function deletes an existing record in the json object
     :param airline_id: The ID of the airline
     :param type_delete: the type of record that will be deleted
     :param records_json: the json object
     :param client_id: The ID of the client
+    :param changes: a ChangeSet that the deleted records are added to
+    :param on_delete: what happens to the flights of a deleted client or
+        airline: cascade, restrict or nullify (see integrity.py)
 
     :return: the result of the json manipulation
     """
@@ -202,36 +1151,133 @@ def delete_record(records_json,type_delete, client_id=None, airline_id = None):
         airline_id = validate_input(airline_id)
 
         if client_id != -1 and airline_id != -1:
-            records_json[type_delete] = [element for element in records_json[type_delete] if
-                                         element["Client_ID"] != client_id and
-                                         element["Airline_ID"] != airline_id]
+            store = _as_store(records_json)
+            # Flights booked by the client with the airline
+            store.remove_records(type_delete, [flight for flight in store.flights_for_client(client_id)
+                                               if flight.get("Airline_ID") == airline_id], changes)
         else:
 
             return client_id # IDs NOT FOUND
 
-    elif type_delete == "Client":
-        client_id = validate_input(client_id)
+    elif type_delete in INDEXED_TYPES:
+        record_id = validate_input(client_id if type_delete == "Client" else airline_id)
 
-        if client_id != -1:
-            records_json[type_delete] = [element for element in records_json[type_delete] if
-                                         element["ID"] != client_id]
+        if record_id != -1:
+            store = _as_store(records_json)
+            element = store.get_record(type_delete, record_id)
+            if element is not None:
+                if not enforce_on_delete(store, type_delete, record_id, on_delete or DEFAULT_ON_DELETE, changes):
+                    return -3 # STILL REFERENCED BY FLIGHTS
+                store.remove_record(type_delete, element, changes)
         else:
-            return client_id #ID NOT FOUND
-
-    elif type_delete == "Airline":
-        airline_id = validate_input(airline_id)
-
-        if airline_id != -1:
-            records_json[type_delete] = [element for element in records_json[type_delete] if
-                                         element["ID"] != airline_id]
-        else:
-            return airline_id #ID NOT FOUND
+            return record_id #ID NOT FOUND
     else:
         result = -2
         return result # TYPE NOT FOUND
 
 
+def _cast_ids(ids):
+    """
+    Cast the IDs of a bulk operation with validate_input
+    :return: the IDs as integers, None if not given, or -1 if one is invalid
+    """
+    if ids is None:
+        return None
+    ids = [validate_input(record_id) for record_id in ids]
+    if any(record_id is None or record_id == -1 for record_id in ids):
+        return -1
+    return ids
+
+def match_records(records_json, type_search, ids=None, where=None, start_date=None, end_date=None):
+    """
+    This function finds the records matching a list of IDs and/or field values
+    :param records_json: the json object
+    :param type_search: the entry type
+    :param ids: IDs to match (Client_ID for flights)
+    :param where: {field: value} pairs the records must equal
+    :param start_date: the first flight date to match
+    :param end_date: the first flight date not to match
+    :return: the matching records, -1 for an invalid ID or -2 for an invalid type
+    """
+    if type_search not in ("Client", "Airline", "Flight"):
+        return -2 # INVALID TYPE
+    ids = _cast_ids(ids)
+    if ids == -1:
+        return -1 # Invalid ID
+    return _as_store(records_json).match_records(type_search, ids, where, start_date, end_date)
 
+def bulk_update_records(records_json, type_update, data, ids=None, where=None, start_date=None, end_date=None,
+                        changes=None):
+    """
+    This function applies the same update to every matching record
+    :param records_json: the json object
+    :param type_update: the entry type
+    :param data: the fields to update the records with
+    :param ids: IDs to match (Client_ID for flights)
+    :param where: {field: value} pairs the records must equal,
+        e.g. {"Airline_ID": 3}
+    :param start_date: the first flight date to match
+    :param end_date: the first flight date not to match, e.g. "2025-11-01"
+    :param changes: a ChangeSet that the updated records are added to
+    :return: the ChangeSet, -1 for invalid criteria or data and -2 for an
+        invalid type
+    """
+    if type_update not in ("Client", "Airline", "Flight"):
+        return -2 # TYPE NOT FOUND
+    ids = _cast_ids(ids)
+    # Without any criterion every record would match
+    if ids == -1 or (ids is None and not (where or start_date or end_date)):
+        return -1 # Invalid criteria
+    if not isinstance(data, Mapping) or "ID" in data:
+        return -1 # IDs are not changed
+    store = _as_store(records_json)
+    data = dict(data)
+    if type_update == "Flight":
+        # Flights may only be moved to an existing client or airline
+        for parent_type, field in (("Client", "Client_ID"), ("Airline", "Airline_ID")):
+            if field in data:
+                data[field] = validate_input(data[field])
+                if store.get_record(parent_type, data[field]) is None:
+                    return -1 # Invalid ID
+    changes = changes if changes is not None else ChangeSet()
+    for record in store.match_records(type_update, ids, where, start_date, end_date):
+        store.change_record(type_update, record, data, changes)
+    return changes
 
+def bulk_delete_records(records_json, type_delete, ids=None, where=None, start_date=None, end_date=None,
+                        changes=None, on_delete=None):
+    """
+    This function deletes every matching record in a single pass over each list
+    :param records_json: the json object
+    :param type_delete: the entry type
+    :param ids: IDs to match (Client_ID for flights)
+    :param where: {field: value} pairs the records must equal,
+        e.g. {"Airline_ID": 3}
+    :param start_date: the first flight date to match
+    :param end_date: the first flight date not to match, e.g. "2025-11-01"
+    :param changes: a ChangeSet that the deleted records are added to
+    :param on_delete: what happens to the flights of deleted clients or
+        airlines: cascade, restrict or nullify (see integrity.py)
+    :return: the ChangeSet, -1 for invalid criteria, -2 for an invalid type
+        and -3 if restrict refused the delete, in which case nothing is deleted
+    """
+    if type_delete not in ("Client", "Airline", "Flight"):
+        return -2 # TYPE NOT FOUND
+    ids = _cast_ids(ids)
+    # Without any criterion every record would match
+    if ids == -1 or (ids is None and not (where or start_date or end_date)):
+        return -1 # Invalid criteria
+    store = _as_store(records_json)
+    changes = changes if changes is not None else ChangeSet()
+    matches = store.match_records(type_delete, ids, where, start_date, end_date)
+    if type_delete in INDEXED_TYPES:
+        record_ids = [record.get("ID") for record in matches]
+        if not enforce_on_delete_many(store, type_delete, record_ids, on_delete or DEFAULT_ON_DELETE, changes):
+            return -3 # STILL REFERENCED BY FLIGHTS
+    store.remove_records(type_delete, matches, changes)
+    return changes
 
 
+# Count and time the calls above when RMS_INSTRUMENT is set; the key
+# functions run once per record in a sort and would only measure the timer
+instrument_module(__name__, exclude=("date_key", "record_key"))
@@ -0,0 +1,539 @@
+"""
+Local HTTP/JSON server that owns the records, so several agents (and GUIs)
+can share one data file without overwriting each other's edits.
+
+The server loads the records once through the configured backend and
+answers every request from the in-memory RecordStore. It runs on a single
+asyncio event loop:
+
+- Reads are answered straight from the indexes, so any number of clients
+  can read at once; a read never waits for a write to be saved.
+- A write is checked and applied to the records in one step, without
+  yielding to the loop, so writes are serialised without a lock.
+- Writes are then saved in group commits: the journal entries of the edits
+  made while a commit is being written, or within commit_delay of the
+  first, are written together in one backend.write() call on a worker
+  thread. A write is only answered once its commit is on disk.
+
+Endpoints (bodies and answers are JSON):
+
+GET    /records/{type}?cursor=&limit=    a page of records, see below
+GET    /records/{type}/{id}              a client or airline, or a client's flights
+GET    /records/Client/{id}/itinerary    the client's flights with their airline
+GET    /records/Airline/{id}/manifest    the airline's flights with their client
+GET    /search?type=Client&q=emma+lon    search_text
+GET    /stats                            counts, Next ID, commit and cache statistics
+POST   /records/{type}                   create, body: the record
+PATCH  /records/{type}/{id}              update, body: the fields to change
+DELETE /records/{type}/{id}?on_delete=   delete a client or airline
+PATCH/DELETE /records/Flight/{client_id}/{airline_id}
+POST   /journal                          apply journal entries, body: {"entries": [...]}
+POST   /compact                          fold the journal into the snapshot
+
+List pages hold at most limit records and a next_cursor to pass back for
+the following page (null after the last one). Cursors point after the last
+record returned rather than at a position, so edits made between pages do
+not shift the pages that follow: clients and airlines are listed by ID,
+flights by Date (and may be filtered with from, to, start_city and
+end_city, given again with each cursor).
+
+backends.RemoteBackend talks to this server, so the GUI and the command
+line run as its clients with RMS_BACKEND=remote:
+
+python src/server.py --port 8765
+RMS_BACKEND=remote RMS_SERVER_URL=http://127.0.0.1:8765 python src/main.py
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import time
+from bisect import bisect_right, insort
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from compact import CompactRecord, to_dict
+from records import (INDEXED_TYPES, SEQUENCE_KEY, ChangeSet, airline_manifest, bulk_delete_records,
+                     bulk_update_records, client_itinerary, create_record, date_key, delete_record,
+                     search_records, search_text, update_record, validate_input)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+RECORD_TYPES = ("Client", "Airline", "Flight")
+
+# Records per list page when no limit is asked for, and the most allowed
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 10000
+
+# Seconds a commit waits for more writes to join it
+COMMIT_DELAY = 0.005
+
+# Largest request body accepted, in bytes
+MAX_BODY = 64 * 1024 * 1024
+
+
+class HTTPError(Exception):
+    """
+    A request that cannot be answered; becomes {"error": message}
+    """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _json_default(value):
+    """
+    Let json.dumps write the compact records of compact.py
+    """
+    if isinstance(value, CompactRecord):
+        return to_dict(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def encode_cursor(value):
+    """
+    :return: an opaque cursor string holding a JSON value
+    """
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    :return: the JSON value of a cursor from encode_cursor
+    """
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"Invalid cursor {cursor!r}") from None
+
+
+def _record_id(record):
+    """
+    :return: the ID a client or airline is listed by, 0 if it has none
+    """
+    record_id = record.get("ID")
+    return record_id if type(record_id) is int else 0
+
+
+class RecordServer:
+    """
+    Serves one RecordStore over HTTP.
+    commits / committed: the number of group commits and of entries saved
+    largest_commit: the most entries saved by a single commit
+    """
+
+    def __init__(self, backend, records=None, commit_delay=COMMIT_DELAY):
+        """
+        :param backend: the StorageBackend the records are saved through
+        :param records: the RecordStore to serve, loaded from backend if None
+        :param commit_delay: seconds a commit waits for more writes to join it
+        """
+        self.backend = backend
+        self.records = records if records is not None else backend.load(compact=True)
+        if self.records.text_index is None:
+            self.records.build_text_index()
+        # Client and Airline lists are paged by ID, so they are kept in ID
+        # order: sorted once here, and apply() puts a record created with an
+        # ID below the newest one in its place
+        for record_type in INDEXED_TYPES:
+            records_list = self.records.get(record_type, [])
+            ids = [_record_id(record) for record in records_list]
+            if any(earlier > later for earlier, later in zip(ids, ids[1:])):
+                records_list.sort(key=_record_id)
+        self.commit_delay = commit_delay
+        self.commits = 0
+        self.committed = 0
+        self.largest_commit = 0
+        self.started = time.time()
+        self._queue = None
+        self._committer = None
+
+    # --- HTTP ---------------------------------------------------------------
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """
+        Start listening and committing
+        :return: the asyncio Server; port 0 picks a free port, see its sockets
+        """
+        self._queue = asyncio.Queue()
+        self._committer = asyncio.create_task(self._commit_loop())
+        return await asyncio.start_server(self._serve_connection, host, port)
+
+    async def stop(self):
+        """
+        Wait for the writes already queued to be saved, then stop committing
+        """
+        if self._queue is not None:
+            await self._queue.join()
+        if self._committer is not None:
+            self._committer.cancel()
+
+    async def _serve_connection(self, reader, writer):
+        """Answer the requests of one connection until the client closes it."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                    length = int(headers.get("content-length", 0))
+                    if length > MAX_BODY:
+                        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = await self.handle(method, target, body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": e.message}
+                except ValueError:
+                    status, payload = HTTPStatus.BAD_REQUEST, {"error": "Malformed request"}
+                keep_alive = headers.get("connection", "").lower() != "close" and not request_line.endswith(b"1.0\r\n")
+                data = json.dumps(payload, default=_json_default).encode()
+                writer.write(f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                             f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                             f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle(self, method, target, body=b""):
+        """
+        Answer one request
+        :param method: GET, POST, PATCH or DELETE
+        :param target: the path and query, e.g. /records/Client?limit=10
+        :param body: the JSON body
+        :return: (HTTPStatus, JSON-ready payload)
+        """
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        parts = [part for part in url.path.split("/") if part]
+        data = json.loads(body) if body else None
+        try:
+            return await self._route(method, parts, query, data)
+        except HTTPError:
+            raise
+        except Exception as e:
+            print(f"Error answering {method} {target}: {e}")
+            raise HTTPError(HTTPStatus.INTERNAL_SERVER_ERROR, str(e)) from None
+
+    async def _route(self, method, parts, query, data):
+        """Dispatch a request by its method and path."""
+        if parts == ["stats"] and method == "GET":
+            return HTTPStatus.OK, self.stats()
+        if parts == ["search"] and method == "GET":
+            results = search_text(self.records, query.get("q", ""), query.get("type", "Client"),
+                                  self._limit(query))
+            if results == -2:
+                raise HTTPError(HTTPStatus.NOT_FOUND, "Only Client and Airline can be searched")
+            return HTTPStatus.OK, {"records": results}
+        if parts == ["journal"] and method == "POST":
+            entries = (data or {}).get("entries")
+            if not isinstance(entries, list):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "Expected {\"entries\": [...]}")
+            return HTTPStatus.OK, {"applied": await self.write_entries(entries)}
+        if parts == ["compact"] and method == "POST":
+            await self._queue.join()
+            self.backend.compact(self.records, force=True)
+            return HTTPStatus.OK, {"compacted": True}
+        if not parts or parts[0] != "records" or len(parts) < 2:
+            raise HTTPError(HTTPStatus.NOT_FOUND, "Unknown endpoint")
+        record_type = parts[1]
+        if record_type not in RECORD_TYPES:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"No such type {record_type}")
+        keys = parts[2:]
+
+        if method == "GET":
+            if not keys:
+                return HTTPStatus.OK, self.page(record_type, query)
+            return HTTPStatus.OK, self.get(record_type, keys)
+        if method == "POST" and not keys:
+            if not isinstance(data, dict):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "Expected the record as a JSON object")
+            entry = {"op": "create", "type": record_type, "record": data}
+            await self.write_entries([entry])
+            return HTTPStatus.CREATED, {"record": entry["record"]}
+        if method in ("PATCH", "DELETE") and keys:
+            client_id, airline_id = self._target_ids(record_type, keys)
+            if method == "PATCH":
+                if not isinstance(data, dict):
+                    raise HTTPError(HTTPStatus.BAD_REQUEST, "Expected the fields to change as a JSON object")
+                entry = {"op": "update", "type": record_type, "data": data,
+                         "client_id": client_id, "airline_id": airline_id}
+            else:
+                entry = {"op": "delete", "type": record_type, "client_id": client_id, "airline_id": airline_id}
+                if query.get("on_delete"):
+                    entry["on_delete"] = query["on_delete"]
+            changes = await self.write_entries([entry])
+            return HTTPStatus.OK, changes[0]
+        raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} is not allowed here")
+
+    # --- Reads --------------------------------------------------------------
+
+    def stats(self):
+        """
+        :return: the record counts, the ID sequence and the server's counters
+        """
+        return {
+            "counts": {record_type: len(self.records.get(record_type, [])) for record_type in RECORD_TYPES},
+            SEQUENCE_KEY: self.records.get(SEQUENCE_KEY),
+            "commits": self.commits,
+            "committed": self.committed,
+            "largest_commit": self.largest_commit,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "query_cache": self.records.query_cache.stats(),
+            "uptime": round(time.time() - self.started, 1),
+        }
+
+    @staticmethod
+    def _limit(query):
+        """
+        :return: the limit asked for, within 1 and MAX_PAGE_SIZE
+        """
+        try:
+            limit = int(query.get("limit", PAGE_SIZE))
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "limit must be a number") from None
+        return max(1, min(limit, MAX_PAGE_SIZE))
+
+    def page(self, record_type, query):
+        """
+        :return: {"records": a page of records, "next_cursor": cursor or None}
+        """
+        limit = self._limit(query)
+        cursor = decode_cursor(query["cursor"]) if query.get("cursor") else None
+        if record_type == "Flight":
+            return self._page_flights(query, cursor, limit)
+        records_list = self.records[record_type]
+        first = 0 if cursor is None else bisect_right(records_list, cursor, key=_record_id)
+        page = records_list[first:first + limit]
+        more = first + limit < len(records_list)
+        return {"records": page, "next_cursor": encode_cursor(_record_id(page[-1])) if more and page else None}
+
+    def _page_flights(self, query, cursor, limit):
+        """
+        Page flights in date order. The cursor is the date of the last
+        flight returned and how many flights of that date were returned,
+        so a page starts at the first flight after them.
+        """
+        start_date, skip = cursor if cursor is not None else (query.get("from"), 0)
+        page = self.records.query_flights(start_date, query.get("to"), query.get("start_city"),
+                                          query.get("end_city"), offset=skip, limit=limit + 1)
+        more = len(page) > limit
+        page = page[:limit]
+        next_cursor = None
+        if more and page:
+            last_date = date_key(page[-1].get("Date"))
+            same_date = sum(1 for _ in _trailing(page, last_date))
+            if start_date is not None and last_date == date_key(start_date):
+                # The whole page had the cursor's date, skip past it too
+                same_date += skip
+            next_cursor = encode_cursor([last_date, same_date])
+        return {"records": page, "next_cursor": next_cursor}
+
+    def get(self, record_type, keys):
+        """
+        :return: {"records": [...]} for /records/{type}/{id} and the join views
+        """
+        record_id = validate_input(keys[0])
+        if record_id == -1:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Invalid ID {keys[0]!r}")
+        if len(keys) == 1:
+            results = search_records(self.records, record_id, record_type)
+            if results == -1:
+                raise HTTPError(HTTPStatus.NOT_FOUND, f"No {record_type} with ID {record_id}")
+            return {"records": results}
+        joins = {("Client", "itinerary"): (client_itinerary, "airline"),
+                 ("Airline", "manifest"): (airline_manifest, "client")}
+        if len(keys) != 2 or (record_type, keys[1]) not in joins:
+            raise HTTPError(HTTPStatus.NOT_FOUND, "Unknown endpoint")
+        join, other = joins[record_type, keys[1]]
+        results = join(self.records, record_id)
+        if results == -1:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"No {record_type} with ID {record_id}")
+        return {"records": [{"flight": flight, other: record} for flight, record in results]}
+
+    @staticmethod
+    def _target_ids(record_type, keys):
+        """
+        :return: the (client_id, airline_id) an update or delete path names
+        """
+        ids = [validate_input(key) for key in keys]
+        if -1 in ids or len(ids) != (2 if record_type == "Flight" else 1):
+            raise HTTPError(HTTPStatus.NOT_FOUND, "Unknown endpoint")
+        if record_type == "Flight":
+            return ids[0], ids[1]
+        return (ids[0], None) if record_type == "Client" else (None, ids[0])
+
+    # --- Writes -------------------------------------------------------------
+
+    async def write_entries(self, entries):
+        """
+        Apply journal entries to the records in order and wait until they
+        are saved. An entry that cannot be applied stops the rest; the ones
+        before it are still saved.
+        :return: for each entry, the records it created, updated and removed
+        """
+        results = []
+        waits = []
+        try:
+            for entry in entries:
+                results.append(self.apply(entry))
+                future = asyncio.get_running_loop().create_future()
+                self._queue.put_nowait((self.backend.prepare(self.records, entry), future))
+                waits.append(future)
+        finally:
+            if waits:
+                await asyncio.gather(*waits)
+        return results
+
+    def apply(self, entry):
+        """
+        Make one edit to the records, checking it first; runs without
+        yielding to the event loop, so edits never interleave
+        :param entry: a journal entry, see storage.append_journal
+        :return: the keys of the records created, updated and removed
+        """
+        if not isinstance(entry, dict) or entry.get("type") not in RECORD_TYPES:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Invalid entry {entry!r}")
+        op, record_type = entry.get("op"), entry["type"]
+        changes = ChangeSet()
+        if op == "create":
+            record = entry.get("record")
+            if not isinstance(record, dict):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "A create needs the record")
+            record_id = record.get("ID")
+            if record_type in INDEXED_TYPES and record_id is not None:
+                if type(record_id) is not int:
+                    raise HTTPError(HTTPStatus.BAD_REQUEST, f"Invalid ID {record_id!r}")
+                if self.records.get_record(record_type, record_id) is not None:
+                    raise HTTPError(HTTPStatus.CONFLICT, f"{record_type} {record_id} already exists")
+            result = create_record(self.records, dict(record), record_type, changes)
+            if result != "Entry has been created successfully":
+                raise HTTPError(HTTPStatus.BAD_REQUEST, f"The {record_type} could not be created ({result})")
+            stored = changes.inserted[0][2]
+            if record_type in INDEXED_TYPES:
+                # Keep the sequence past IDs chosen by a client
+                sequence = self.records[SEQUENCE_KEY]
+                sequence[record_type] = max(sequence[record_type], stored["ID"] + 1)
+                records_list = self.records[record_type]
+                if len(records_list) > 1 and _record_id(records_list[-2]) > stored["ID"]:
+                    # A client chose a free ID below the newest one
+                    insort(records_list, records_list.pop(), key=_record_id)
+            entry["record"] = to_dict(stored)
+        elif op == "update":
+            if "ID" in (entry.get("data") or {}):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "The ID of a record cannot be changed")
+            result = update_record(self.records, record_type, entry.get("data") or {},
+                                   client_id=entry.get("client_id"), airline_id=entry.get("airline_id"),
+                                   changes=changes)
+            if result != 1:
+                raise HTTPError(HTTPStatus.NOT_FOUND, f"No {record_type} found with that ID")
+        elif op == "delete":
+            result = delete_record(self.records, record_type, client_id=entry.get("client_id"),
+                                   airline_id=entry.get("airline_id"), changes=changes,
+                                   on_delete=entry.get("on_delete"))
+            if result == -3:
+                raise HTTPError(HTTPStatus.CONFLICT, "The record still has flights")
+            if not changes:
+                raise HTTPError(HTTPStatus.NOT_FOUND, f"No {record_type} found with that ID")
+        elif op in ("bulk_update", "bulk_delete"):
+            match = entry.get("match") or {}
+            if op == "bulk_update":
+                result = bulk_update_records(self.records, record_type, entry.get("data") or {}, **match,
+                                             changes=changes)
+            else:
+                result = bulk_delete_records(self.records, record_type, **match, changes=changes,
+                                             on_delete=entry.get("on_delete"))
+            if result == -3:
+                raise HTTPError(HTTPStatus.CONFLICT, "The records still have flights")
+            if not isinstance(result, ChangeSet):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, f"Invalid {op} ({result})")
+        else:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Unknown op {op!r}")
+        return {"created": [key for _, key, _ in changes.inserted],
+                "updated": [key for _, key, _ in changes.updated],
+                "removed": [key for _, key, _ in changes.removed]}
+
+    async def _commit_loop(self):
+        """Save the queued entries in groups, one backend.write() per group."""
+        loop = asyncio.get_running_loop()
+        while True:
+            group = [await self._queue.get()]
+            if self.commit_delay:
+                await asyncio.sleep(self.commit_delay)
+            while not self._queue.empty():
+                group.append(self._queue.get_nowait())
+            try:
+                await loop.run_in_executor(None, self.backend.write, [entry for entry, _ in group])
+                error = None
+            except Exception as e:
+                print(f"Error saving {len(group)} edits: {e}")
+                error = HTTPError(HTTPStatus.INTERNAL_SERVER_ERROR, f"The edit was made but NOT saved: {e}")
+            for _, future in group:
+                if not future.done():
+                    if error is None:
+                        future.set_result(None)
+                    else:
+                        future.set_exception(error)
+                self._queue.task_done()
+            if error is None:
+                self.commits += 1
+                self.committed += len(group)
+                self.largest_commit = max(self.largest_commit, len(group))
+                self.backend.compact(self.records)
+
+
+def _trailing(page, date):
+    """
+    Yield the flights at the end of a page that have the given date
+    """
+    for flight in reversed(page):
+        if date_key(flight.get("Date")) != date:
+            return
+        yield flight
+
+
+async def serve(backend, host=DEFAULT_HOST, port=DEFAULT_PORT, commit_delay=COMMIT_DELAY):
+    """
+    Load the records and serve them until cancelled
+    """
+    server = RecordServer(backend, commit_delay=commit_delay)
+    listener = await server.start(host, port)
+    address = listener.sockets[0].getsockname()
+    print(f"Serving {sum(server.stats()['counts'].values())} records on http://{address[0]}:{address[1]}")
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    from backends import open_backend
+
+    parser = argparse.ArgumentParser(description="Serve the records over HTTP/JSON to several clients")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--commit-delay", type=float, default=COMMIT_DELAY,
+                        help="seconds a commit waits for more writes to join it")
+    args = parser.parse_args()
+    backend = open_backend()
+    try:
+        asyncio.run(serve(backend, args.host, args.port, args.commit_delay))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        backend.close()
@@ -1,36 +1,592 @@
 import json
 import os
+import re
+import shutil
+import sys
+import threading
+from collections.abc import Mapping
 
-def load_records(file_path='../records.json'):
+from instrumentation import instrument_module
+
+# Key under which the sequence number of the last journal entry is saved
+JOURNAL_SEQ_KEY = "Journal Seq"
+
+# The journal is compacted into the snapshot once it grows past this size
+JOURNAL_COMPACT_BYTES = 1024 * 1024
+
+# Records per batch yielded by iter_records and bytes read per chunk
+STREAM_BATCH_SIZE = 10000
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# Number of previous snapshots kept by save_records
+BACKUP_COUNT = 2
+
+# Suffix of a journal that is being folded into the snapshot
+COMPACTING_SUFFIX = ".compacting"
+
+_compaction_lock = threading.Lock()
+# Held while the journal file is written or moved aside for compaction
+_journal_lock = threading.Lock()
+_compaction_thread = None
+
+def load_records(file_path='../records.json', journal_path=None, streaming=False, compact=False, progress=None):
     """
     Load the nested records from a JSON file if it exists.
     Returns an empty dict if the file doesn't exist or is corrupted.
+    If a journal path is given, the journal is replayed on top of the
+    snapshot and an indexed RecordStore is returned.
+    With streaming=True the file is parsed incrementally by iter_records
+    so the raw text is never held in memory next to the parsed records.
+    With compact=True the records are converted to the slotted classes of
+    compact.py, batch by batch when streaming.
+    When streaming, progress(key, batch) is called with each batch of
+    records as it is parsed, then progress(None, None) once the whole
+    snapshot is read and the journal replay and indexing start. Batches
+    from a corrupted file are reported before its backup is tried.
     """
-    if os.path.exists(file_path):
+    records = _load_snapshot(file_path, streaming, compact, progress)
+    if progress is not None:
+        progress(None, None)
+    if journal_path is None:
+        return records
+    return replay_journal(records, journal_path, compact)
+
+def _load_snapshot(file_path, streaming=False, compact=False, progress=None):
+    """
+    Load the snapshot file written by save_records.
+    If it is missing or corrupted, the newest valid backup is used instead.
+    """
+    for path in [file_path] + backup_paths(file_path):
+        if not os.path.exists(path):
+            if path == file_path:
+                print("No records file found. Trying backups.")
+            continue
         try:
-            with open(file_path, 'r') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            print("Error: Corrupted JSON file. Starting with an empty dict.")
-            return {"Client": [], "Airline": [], "Flight": []}
+            if streaming:
+                batches = iter_records(path)
+                if progress is not None:
+                    batches = _reported(batches, progress)
+                records = _collect_records(batches, compact)
+            else:
+                with open(path, 'r') as f:
+                    records = json.load(f)
+                if compact and isinstance(records, dict):
+                    records = _collect_records(records.items(), compact)
+            if path != file_path:
+                print(f"Recovered records from backup {path}.")
+            return records
+        except (json.JSONDecodeError, ValueError):
+            print(f"Error: Corrupted JSON file {path}.")
         except Exception as e:
-            print(f"Error loading records: {e}")
-            return {"Client": [], "Airline": [], "Flight": []}
-    else:
-        print("No records file found. Starting with an empty dict.")
+            print(f"Error loading records from {path}: {e}")
+    print("No valid records file found. Starting with an empty dict.")
     return {"Client": [], "Airline": [], "Flight": []}
 
-def save_records(records, file_path='../records.json'):
+def iter_records(file_path, batch_size=STREAM_BATCH_SIZE, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Parse a records file incrementally.
+    Yields (key, batch) pairs where batch is a list of at most batch_size
+    records from the "Client", "Airline" or "Flight" array named key.
+    Top level values that are not arrays, such as "Next ID", are yielded
+    as (key, value). A file holding a bare array yields (None, batch).
+    Raises ValueError if the file is not valid JSON.
+    """
+    decoder = json.JSONDecoder()
+    with open(file_path, 'r') as f:
+        stream = _JsonStream(f, chunk_size)
+        if stream.peek() == '[':
+            yield from _iter_array(stream, decoder, None, batch_size)
+            stream.expect_end()
+            return
+        stream.expect('{')
+        if stream.peek() == '}':
+            stream.expect('}')
+        else:
+            while True:
+                key = stream.decode(decoder)
+                stream.expect(':')
+                if stream.peek() == '[':
+                    yield from _iter_array(stream, decoder, key, batch_size)
+                else:
+                    yield key, stream.decode(decoder)
+                if stream.next_char() == '}':
+                    break
+                stream.back_to(',')
+        stream.expect_end()
+
+def _iter_array(stream, decoder, key, batch_size):
+    """
+    Yield the elements of the JSON array at the stream position in batches.
+    An empty array is yielded as a single empty batch.
+    """
+    stream.expect('[')
+    batch = []
+    shapes = {}
+    yielded = False
+    if stream.peek() == ']':
+        stream.expect(']')
+    else:
+        while True:
+            batch.append(_intern_keys(stream.decode(decoder), shapes))
+            if len(batch) >= batch_size:
+                yield key, batch
+                yielded = True
+                batch = []
+            if stream.next_char() == ']':
+                break
+            stream.back_to(',')
+    if batch or not yielded:
+        yield key, batch
+
+def _reported(batches, progress):
+    """
+    Pass the batches of iter_records through, calling progress(key, batch)
+    with each batch of records before it is collected
+    """
+    for key, batch in batches:
+        if isinstance(batch, list):
+            progress(key, batch)
+        yield key, batch
+
+def _intern_keys(record, shapes):
+    """
+    Share the key strings between records with the same keys.
+    Each raw_decode call builds its own key strings, unlike json.load.
+    :param shapes: a cache of key tuple -> shared key tuple
+    """
+    if not isinstance(record, dict):
+        return record
+    shape = tuple(record)
+    keys = shapes.get(shape)
+    if keys is None:
+        keys = shapes[shape] = tuple(sys.intern(key) for key in shape)
+    return dict(zip(keys, record.values()))
+
+def _collect_records(batches, compact=False):
+    """
+    Build the nested records dict from the batches yielded by iter_records.
+    With compact=True each batch is converted before the next is parsed.
+    """
+    from compact import to_compact
+
+    records = {}
+    for key, batch in batches:
+        if key is None:
+            records = records if isinstance(records, list) else []
+            records.extend(batch)
+        elif isinstance(batch, list):
+            if compact:
+                batch = [to_compact(key, record) for record in batch]
+            records.setdefault(key, []).extend(batch)
+        else:
+            records[key] = batch
+    return records
+
+class _JsonStream:
+    """
+    A window over a text file used by iter_records.
+    Only the unparsed tail of the current chunk is kept in memory.
+    """
+
+    _WHITESPACE = re.compile(r'[ \t\n\r]*')
+    _NUMBER_CHARS = frozenset('0123456789.eE+-')
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        """
+        Read the next chunk, dropping the text already parsed.
+        Returns False at the end of the file.
+        """
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """
+        Return the next non whitespace character without consuming it,
+        or '' at the end of the file.
+        """
+        while True:
+            if self.pos < len(self.buf) and self.buf[self.pos] not in ' \t\n\r':
+                return self.buf[self.pos]
+            self.pos = self._WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def next_char(self):
+        """
+        Consume and return the next non whitespace character.
+        """
+        char = self.peek()
+        self.pos += 1
+        return char
+
+    def back_to(self, expected):
+        """
+        Check that the character just consumed was expected.
+        """
+        if self.buf[self.pos - 1:self.pos] != expected:
+            raise ValueError(f"Expected {expected!r} at offset {self.pos - 1} of the current chunk")
+
+    def expect(self, expected):
+        """
+        Consume the next non whitespace character, which must be expected.
+        """
+        if self.next_char() != expected:
+            raise ValueError(f"Expected {expected!r} at offset {self.pos - 1} of the current chunk")
+
+    def expect_end(self):
+        """
+        Check that only whitespace is left in the file.
+        """
+        if self.peek() != '':
+            raise ValueError("Extra data after the records")
+
+    def decode(self, decoder):
+        """
+        Decode the JSON value at the current position, reading more of the
+        file while the value is incomplete.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number cut by the end of the chunk may continue in the next one
+            if self._may_continue(value, end) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def _may_continue(self, value, end):
+        """
+        Return True if the value decoded up to end could be the start of a
+        longer value, e.g. 2 read from a chunk ending in "2." or "25".
+        """
+        if end == len(self.buf):
+            return True
+        return (isinstance(value, (int, float)) and not isinstance(value, bool)
+                and self.buf[end] in self._NUMBER_CHARS)
+
+def backup_paths(file_path, backups=BACKUP_COUNT):
+    """
+    Return the backup file names of a snapshot, newest first.
+    """
+    return [f"{file_path}.{i}" for i in range(1, backups + 1)]
+
+def save_records(records, file_path='../records.json', backups=BACKUP_COUNT):
     """
     Save the nested records dict to a JSON file.
-    Overwrites the file if it exists.
+    The records are written to a temporary file which is flushed to disk and
+    then renamed over the target, so a crash never leaves a truncated file.
+    The previous snapshot is kept as file_path.1, the one before as
+    file_path.2 and so on up to backups copies.
+    Returns True if the records were saved.
     """
+    temp_path = file_path + ".tmp"
     try:
-        with open(file_path, 'w') as f:
-            json.dump(records, f, indent=4)
+        # dumps uses the C encoder, json.dump with indent does not
+        data = json.dumps(records, separators=(',', ':'), default=_to_json)
+        with open(temp_path, 'w') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        _rotate_backups(file_path, backups)
+        os.replace(temp_path, file_path)
+        _fsync_directory(file_path)
         print("Records saved successfully.")
+        return True
     except Exception as e:
         print(f"Error saving records: {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return False
+
+def _rotate_backups(file_path, backups):
+    """
+    Shift file_path.1 .. file_path.(n-1) up by one and keep the current
+    snapshot as file_path.1.
+    The current snapshot is hard linked rather than copied so rotating
+    stays cheap for large files; the target itself is never moved away.
+    """
+    if backups <= 0 or not os.path.exists(file_path):
+        return
+    paths = backup_paths(file_path, backups)
+    for older, newer in zip(reversed(paths[1:]), reversed(paths[:-1])):
+        if os.path.exists(newer):
+            os.replace(newer, older)
+    if os.path.exists(paths[0]):
+        os.remove(paths[0])
+    try:
+        os.link(file_path, paths[0])
+    except OSError:
+        shutil.copy2(file_path, paths[0])
+
+def _fsync_directory(file_path):
+    """
+    Flush the directory entry of a renamed file to disk where supported.
+    """
+    if os.name != "posix":
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(file_path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def append_journal(records, entry, journal_path):
+    """
+    Append a single mutation to the JSON Lines journal instead of rewriting
+    the whole snapshot.
+    Entries look like {"op": "create", "type": "Client", "record": {...}},
+    {"op": "update", "type": "Flight", "data": {...}, "client_id": 1, "airline_id": 2}
+    or {"op": "delete", "type": "Airline", "airline_id": 3, "on_delete": "cascade"}.
+    Bulk edits are one entry holding the criteria of records.match_records:
+    {"op": "bulk_update", "type": "Flight", "match": {"where": {"Airline_ID": 3}}, "data": {...}}
+    or {"op": "bulk_delete", "type": "Flight", "match": {"where": {...}, "end_date": "2025-11-01"}}.
+    Each entry is numbered so a replay skips entries already in the snapshot.
+    Returns True if the entry was written.
+    """
+    entry = number_journal_entry(records, entry)
+    try:
+        write_journal([entry], journal_path)
+    except Exception as e:
+        print(f"Error writing journal: {e}")
+        return False
+    return True
+
+def number_journal_entry(records, entry):
+    """
+    Give an entry the next journal sequence number of the records.
+    This must happen on the thread that edits the records, right after the
+    edit, so a snapshot taken later never misses a numbered edit.
+    Returns the numbered copy of the entry.
+    """
+    entry = dict(entry, seq=records.get(JOURNAL_SEQ_KEY, 0) + 1)
+    records[JOURNAL_SEQ_KEY] = entry["seq"]
+    return entry
+
+def write_journal(entries, journal_path):
+    """
+    Append numbered entries to the journal in one write and flush them to
+    disk. Raises OSError if the journal cannot be written.
+    """
+    # jsonlines is only imported by the journal functions, so loading a
+    # snapshot without a journal does not pay for it
+    import jsonlines
+
+    with _journal_lock:
+        with open(journal_path, 'a') as f:
+            with jsonlines.Writer(f, dumps=_dumps) as writer:
+                writer.write_all(entries)
+            f.flush()
+            os.fsync(f.fileno())
+
+def read_journal(journal_path):
+    """
+    Yield the entries of a journal file.
+    A torn last line left by a crash is skipped.
+    """
+    if not os.path.exists(journal_path):
+        return
+    # Parsed with json rather than jsonlines, which takes longer to import
+    # than a lookup takes to run and is only needed to write the journal
+    with open(journal_path) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(entry, dict):
+                yield entry
+
+def replay_journal(records, journal_path, compact=False):
+    """
+    Apply the journal (and any journal left by an interrupted compaction)
+    to the records loaded from the snapshot.
+    Returns the records as an indexed RecordStore.
+    """
+    from records import RecordStore
+
+    if not isinstance(records, dict):
+        records = {"Client": records, "Airline": [], "Flight": []}
+    for record_type in ("Client", "Airline", "Flight"):
+        records.setdefault(record_type, [])
+    store = records if isinstance(records, RecordStore) else RecordStore(records, compact)
+
+    _replay(store, (journal_path + COMPACTING_SUFFIX, journal_path))
+    return store
+
+def _replay(store, journal_paths):
+    """
+    Apply the entries of the journal files that are newer than the store.
+    """
+    last_seq = store.get(JOURNAL_SEQ_KEY, 0)
+    for path in journal_paths:
+        for entry in read_journal(path):
+            if entry.get("seq", 0) <= last_seq:
+                continue  # Already part of the snapshot
+            apply_journal_entry(store, entry)
+            last_seq = entry["seq"]
+    store[JOURNAL_SEQ_KEY] = last_seq
+    store.seed_sequence()
+
+def apply_journal_entry(store, entry):
+    """
+    Apply one journal entry to a RecordStore using the CRUD functions so a
+    replay matches what happened in memory.
+    """
+    from records import INDEXED_TYPES, SEQUENCE_KEY, bulk_delete_records, bulk_update_records, update_record, delete_record
+
+    op = entry.get("op")
+    record_type = entry.get("type")
+    if op == "create":
+        store.add_record(record_type, entry["record"])
+        if record_type in INDEXED_TYPES and "ID" in entry["record"]:
+            # The ID stays used after a later delete, as it was in memory
+            sequence = store.setdefault(SEQUENCE_KEY, {})
+            sequence[record_type] = max(sequence.get(record_type, 1), entry["record"]["ID"] + 1)
+    elif op == "update":
+        update_record(store, record_type, entry.get("data", {}),
+                      client_id=entry.get("client_id"), airline_id=entry.get("airline_id"))
+    elif op == "delete":
+        delete_record(store, record_type, client_id=entry.get("client_id"),
+                      airline_id=entry.get("airline_id"), on_delete=entry.get("on_delete"))
+    elif op == "bulk_update":
+        bulk_update_records(store, record_type, entry.get("data", {}), **entry.get("match", {}))
+    elif op == "bulk_delete":
+        bulk_delete_records(store, record_type, on_delete=entry.get("on_delete"), **entry.get("match", {}))
+    else:
+        print(f"Error: Unknown journal entry {entry}")
+
+def compact_journal(records, file_path, journal_path, threshold=JOURNAL_COMPACT_BYTES, background=True):
+    """
+    Fold the journal into a new snapshot once it is larger than threshold.
+    The journal is moved aside and a copy of the records is taken on the
+    calling thread; the snapshot is written on a background thread so new
+    entries can be appended meanwhile.
+    With records=None the snapshot is instead rebuilt from the old one and
+    the journal moved aside, which does not touch the records in memory and
+    so may be done from a thread other than the one editing them.
+    Returns the thread writing the snapshot, or None if nothing was started.
+    """
+    global _compaction_thread
+
+    if not os.path.exists(journal_path) or os.path.getsize(journal_path) < threshold:
+        return None
+    if not _compaction_lock.acquire(blocking=False):
+        return None  # A compaction is already running
+
+    try:
+        rotated = journal_path + COMPACTING_SUFFIX
+        with _journal_lock:
+            if os.path.exists(rotated):
+                # Left over from an interrupted compaction, keep its entries
+                with open(journal_path, 'rb') as src, open(rotated, 'ab') as dst:
+                    shutil.copyfileobj(src, dst)
+                os.remove(journal_path)
+            else:
+                os.replace(journal_path, rotated)
+        snapshot = _copy_records(records) if records is not None else None
+    except Exception as e:
+        _compaction_lock.release()
+        print(f"Error compacting journal: {e}")
+        return None
+
+    def write_snapshot():
+        try:
+            saved = snapshot
+            if saved is None:
+                saved = _rebuild_snapshot(file_path, rotated)
+            if saved is not None and save_records(saved, file_path):
+                os.remove(rotated)
+        finally:
+            _compaction_lock.release()
+
+    if not background:
+        write_snapshot()
+        return None
+    _compaction_thread = threading.Thread(target=write_snapshot, name="journal-compaction")
+    _compaction_thread.start()
+    return _compaction_thread
+
+def _rebuild_snapshot(file_path, rotated):
+    """
+    Replay a journal moved aside by compact_journal on the snapshot file.
+    Returns None, keeping the journal, if the replay fails.
+    """
+    from records import RecordStore
+
+    try:
+        records = _load_snapshot(file_path, streaming=True, compact=True)
+        if not isinstance(records, dict):
+            records = {"Client": records, "Airline": [], "Flight": []}
+        for record_type in ("Client", "Airline", "Flight"):
+            records.setdefault(record_type, [])
+        store = RecordStore(records, compact=True)
+        _replay(store, (rotated,))
+        return store
+    except Exception as e:
+        print(f"Error compacting journal: {e}")
+        return None
+
+def _to_json(value):
+    """
+    Serialise records that are not plain dicts, such as the compact classes.
+    """
+    if isinstance(value, Mapping):
+        return dict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _dumps(value):
+    """
+    json.dumps for journal entries that may hold compact records.
+    """
+    return json.dumps(value, default=_to_json)
+
+def wait_for_compaction():
+    """
+    Block until a running background compaction has finished.
+    """
+    if _compaction_thread is not None:
+        _compaction_thread.join()
+
+def _copy_records(records):
+    """
+    Copy the records deep enough that later edits in memory do not change
+    the copy while it is being written.
+    """
+    copied = {}
+    for key, value in records.items():
+        if isinstance(value, list):
+            copied[key] = [dict(record) if isinstance(record, Mapping) else record for record in value]
+        elif isinstance(value, Mapping):
+            copied[key] = dict(value)
+        else:
+            copied[key] = value
+    return copied
+
+
+# Count and time the calls above when RMS_INSTRUMENT is set
+instrument_module(__name__)
+
 
 # Simple test block to verify functionality standalone
 # Run this file directly: python src/storage.py
@@ -0,0 +1,341 @@
+"""
+Inverted index for finding records by the words of their text fields.
+
+Every searchable field is split into lower case words (tokens); phone
+numbers become one token of their digits, so "+44 20 1234" and "44201234"
+match the same number. For each record type the index keeps
+
+postings: {token: ID or set of IDs} the records containing a token
+tokens:   every token in sorted order, so the tokens starting with a
+          prefix are one bisect away
+trigrams: {three letters: set of tokens} for the words of names, cities
+          and company names, so "omps" finds "Thompson"
+
+A query matches a record when each of its words is the start of one of the
+record's tokens, or for words of three or more letters, any part of a name,
+city or company name token. Lookups touch only the matching tokens and stop
+after limit records, so their cost does not grow with the number of
+records. RecordStore in records.py keeps the index up to date on every
+create, update and delete.
+"""
+
+import gc
+import re
+from collections import defaultdict
+from collections.abc import Mapping
+from bisect import bisect_left, insort
+
+# Record type -> fields whose words are searchable
+TEXT_FIELDS = {
+    "Client": ("Name", "City", "Phone Number", "Zip Code"),
+    "Airline": ("Company Name",),
+}
+
+# Fields matched by their digits only, whatever punctuation was typed
+DIGIT_FIELDS = frozenset({"Phone Number"})
+
+# Fields whose tokens can also be found by any part of a word
+TRIGRAM_FIELDS = frozenset({"Name", "City", "Company Name"})
+
+# Records returned by a search when no limit is given
+SEARCH_LIMIT = 200
+
+# A query term matching more tokens than this is checked record by record
+FILTER_TOKENS = 64
+
+_WORD = re.compile(r"[^\W_]+")
+_NOT_DIGIT = re.compile(r"\D")
+_PHONE_PUNCTUATION = str.maketrans("", "", " +-()./")
+_PHONE_LIKE = re.compile(r"[\d\s()+\-./]*\d[\d\s()+\-./]*")
+
+
+def field_tokens(field, value):
+    """
+    Split the value of a field into the tokens it is indexed under
+    :param field: the JSON key, e.g. "Phone Number"
+    :param value: the value of the field
+    :return: a list of lower case tokens
+    """
+    if value is None:
+        return []
+    value = (value if type(value) is str else str(value)).lower()
+    if field in DIGIT_FIELDS:
+        digits = value.translate(_PHONE_PUNCTUATION)
+        if not digits.isdigit():
+            digits = _NOT_DIGIT.sub("", digits)
+        return [digits] if digits else []
+    # Plain words need no regex, which is most of the cost of indexing
+    words = value.split()
+    if all(word.isalnum() for word in words):
+        return words
+    return _WORD.findall(value)
+
+
+def query_terms(query):
+    """
+    Split a search query into the terms every result must match.
+    A query of only digits and phone punctuation is one term of its digits.
+    :param query: the text typed by the user
+    :return: a list of lower case terms
+    """
+    query = query.strip().lower()
+    if _PHONE_LIKE.fullmatch(query):
+        return [_NOT_DIGIT.sub("", query)]
+    return _WORD.findall(query)
+
+
+def _trigrams(token):
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+class TextIndex:
+    """
+    Token postings for the Client and Airline records of a RecordStore
+    """
+
+    def __init__(self, fields=TEXT_FIELDS):
+        """
+        :param fields: record type -> the fields to index
+        """
+        self.fields = fields
+        self.postings = {record_type: {} for record_type in fields}
+        self.tokens = {record_type: [] for record_type in fields}
+        self.trigrams = {record_type: {} for record_type in fields}
+
+    def record_tokens(self, record_type, record):
+        """
+        :return: {token: True if the token can be matched by any part of it}
+        """
+        tokens = {}
+        for field in self.fields.get(record_type, ()):
+            substring = field in TRIGRAM_FIELDS
+            for token in field_tokens(field, record.get(field)):
+                tokens[token] = tokens.get(token, False) or substring
+        return tokens
+
+    def rebuild(self, records_by_type):
+        """
+        Index every record at once; much faster than add() one at a time
+        :param records_by_type: record type -> list of records
+        """
+        # The collector would otherwise walk the growing index again and again
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for record_type, fields in self.fields.items():
+                self._rebuild_type(record_type, fields, records_by_type.get(record_type, []))
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+    def _rebuild_type(self, record_type, fields, records):
+        """Build the postings, token list and trigrams of one record type."""
+        collected = defaultdict(list)
+        substring_tokens = set()
+        records = [record for record in records
+                   if isinstance(record, Mapping) and record.get("ID") is not None]
+        # One field at a time keeps the loop free of per-field checks
+        for field in fields:
+            substring = field in TRIGRAM_FIELDS
+            for record in records:
+                tokens = field_tokens(field, record.get(field))
+                record_id = record["ID"]
+                for token in tokens:
+                    collected[token].append(record_id)
+                if substring:
+                    substring_tokens.update(tokens)
+        postings = {}
+        for token, ids in collected.items():
+            if len(ids) == 1:
+                postings[token] = ids[0]
+            else:
+                ids = set(ids)
+                postings[token] = ids if len(ids) > 1 else ids.pop()
+        trigrams = {}
+        for token in substring_tokens:
+            for trigram in _trigrams(token):
+                trigrams.setdefault(trigram, set()).add(token)
+        self.postings[record_type] = postings
+        self.tokens[record_type] = sorted(postings)
+        self.trigrams[record_type] = trigrams
+
+    def add(self, record_type, record):
+        """
+        Index one record
+        :param record_type: the type of the record
+        :param record: a record with an ID
+        """
+        postings = self.postings.get(record_type)
+        record_id = record.get("ID")
+        if postings is None or record_id is None:
+            return
+        for token, substring in self.record_tokens(record_type, record).items():
+            if token not in postings:
+                insort(self.tokens[record_type], token)
+                if substring:
+                    for trigram in _trigrams(token):
+                        self.trigrams[record_type].setdefault(trigram, set()).add(token)
+            _add_posting(postings, token, record_id)
+
+    def remove(self, record_type, record):
+        """
+        Remove one record; it must still hold the values it was indexed with
+        :param record_type: the type of the record
+        :param record: the record to remove
+        """
+        postings = self.postings.get(record_type)
+        record_id = record.get("ID")
+        if postings is None or record_id is None:
+            return
+        for token in self.record_tokens(record_type, record):
+            if _remove_posting(postings, token, record_id):
+                continue
+            # No record has the token any more
+            tokens = self.tokens[record_type]
+            position = bisect_left(tokens, token)
+            if position < len(tokens) and tokens[position] == token:
+                del tokens[position]
+            trigrams = self.trigrams[record_type]
+            for trigram in _trigrams(token):
+                bucket = trigrams.get(trigram)
+                if bucket is not None:
+                    bucket.discard(token)
+                    if not bucket:
+                        del trigrams[trigram]
+
+    def search(self, record_type, query, lookup, limit=SEARCH_LIMIT):
+        """
+        Find the records of a type matching every term of a query
+        :param record_type: Client or Airline
+        :param query: the text typed by the user
+        :param lookup: returns the record with a given ID
+        :param limit: the most records to return
+        :return: the IDs of the matching records, by matching token order
+        """
+        terms = query_terms(query)
+        if not terms or record_type not in self.postings:
+            return []
+        # The longest term usually matches the fewest tokens
+        driver = max(terms, key=len)
+        others = list(terms)
+        others.remove(driver)
+        postings = self.postings[record_type]
+        # Terms matching few tokens are checked against their IDs, the
+        # others against the tokens of each candidate record
+        filters = []
+        verify = []
+        for term in others:
+            ids = self._term_ids(record_type, term)
+            if ids is None:
+                verify.append(term)
+            else:
+                filters.append(ids)
+        found = []
+        seen = set()
+        for token in self._matching_tokens(record_type, driver):
+            for record_id in _iter_posting(postings[token]):
+                if record_id in seen:
+                    continue
+                seen.add(record_id)
+                if not all(record_id in ids for ids in filters):
+                    continue
+                if verify:
+                    record = lookup(record_id)
+                    if record is None or not self._matches(record_type, record, verify):
+                        continue
+                found.append(record_id)
+                if len(found) >= limit:
+                    return found
+        return found
+
+    def _term_ids(self, record_type, term, max_tokens=FILTER_TOKENS):
+        """
+        :return: the IDs of the records with a token matching term, or None
+            if more than max_tokens tokens match
+        """
+        postings = self.postings[record_type]
+        ids = set()
+        for count, token in enumerate(self._matching_tokens(record_type, term)):
+            if count >= max_tokens:
+                return None
+            posting = postings[token]
+            if isinstance(posting, set):
+                ids |= posting
+            else:
+                ids.add(posting)
+        return ids
+
+    def _matching_tokens(self, record_type, term):
+        """
+        Yield the tokens starting with term, then those containing it
+        """
+        tokens = self.tokens[record_type]
+        position = bisect_left(tokens, term)
+        while position < len(tokens) and tokens[position].startswith(term):
+            yield tokens[position]
+            position += 1
+        if len(term) < 3:
+            return
+        trigrams = self.trigrams[record_type]
+        buckets = []
+        for trigram in _trigrams(term):
+            bucket = trigrams.get(trigram)
+            if bucket is None:
+                return
+            buckets.append(bucket)
+        buckets.sort(key=len)
+        for token in sorted(buckets[0].intersection(*buckets[1:])):
+            if term in token and not token.startswith(term):
+                yield token
+
+    def _matches(self, record_type, record, terms):
+        """
+        Check a record against terms the same way _matching_tokens finds tokens
+        """
+        pending = list(terms)
+        for field in self.fields.get(record_type, ()):
+            substring = field in TRIGRAM_FIELDS
+            for token in field_tokens(field, record.get(field)):
+                pending = [term for term in pending
+                           if not (token.startswith(term) or (substring and len(term) >= 3 and term in token))]
+                if not pending:
+                    return True
+        return False
+
+
+def _add_posting(postings, token, record_id):
+    """
+    Add an ID to a token's posting; a single ID is stored without a set,
+    as most phone numbers and many names belong to one record
+    """
+    current = postings.get(token)
+    if current is None:
+        postings[token] = record_id
+    elif isinstance(current, set):
+        current.add(record_id)
+    elif current != record_id:
+        postings[token] = {current, record_id}
+
+
+def _remove_posting(postings, token, record_id):
+    """
+    Remove an ID from a token's posting
+    :return: False if no record has the token any more
+    """
+    current = postings.get(token)
+    if isinstance(current, set):
+        current.discard(record_id)
+        if len(current) == 1:
+            postings[token] = next(iter(current))
+        return bool(current)
+    if current == record_id:
+        del postings[token]
+        return False
+    return current is not None
+
+
+def _iter_posting(posting):
+    """
+    :return: the IDs of a posting
+    """
+    return posting if isinstance(posting, set) else (posting,)
@@ -0,0 +1,135 @@
+import sys
+import os
+import shutil
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+import pytest
+from backends import JsonBackend, SQLiteBackend, migrate_json_to_sqlite, open_backend
+from records import bulk_delete_records, bulk_update_records, create_record, update_record, delete_record
+from storage import load_records
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), '../data/test_records.json')
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "records.db")
+
+def test_migrate_round_trip(db_path):
+    """Test that migrating the sample data to SQLite keeps every record."""
+    assert migrate_json_to_sqlite(DATA_PATH, db_path)
+    backend = SQLiteBackend(db_path)
+    loaded = backend.load()
+    backend.close()
+    original = load_records(DATA_PATH)
+    for record_type in ("Client", "Airline", "Flight"):
+        assert loaded[record_type] == original[record_type]
+    assert loaded.get_record("Client", 1)["Name"] == original["Client"][0]["Name"]
+
+def test_migrate_includes_journal(db_path, tmp_path):
+    """Test that edits journaled but not yet compacted are migrated too."""
+    json_path = str(tmp_path / "records.json")
+    journal_path = str(tmp_path / "journal.jsonl")
+    shutil.copy(DATA_PATH, json_path)
+    json_backend = JsonBackend(json_path, journal_path)
+    records = json_backend.load()
+    update_record(records, "Client", {"City": "York"}, client_id=1)
+    json_backend.apply(records, {"op": "update", "type": "Client", "data": {"City": "York"}, "client_id": 1})
+    assert migrate_json_to_sqlite(json_path, db_path, journal_path)
+    backend = SQLiteBackend(db_path)
+    assert backend.load().get_record("Client", 1)["City"] == "York"
+    backend.close()
+
+def test_sqlite_single_row_edits(db_path):
+    """Test that journal entries applied to SQLite match the edits in memory."""
+    migrate_json_to_sqlite(DATA_PATH, db_path)
+    backend = SQLiteBackend(db_path)
+    records = backend.load(compact=True)
+
+    create_record(records, {"Name": "Row Client", "City": "Leeds"}, "Client")
+    new_client = records["Client"][-1]
+    backend.apply(records, {"op": "create", "type": "Client", "record": new_client})
+    flight = {"Client_ID": new_client["ID"], "Airline_ID": 1, "Date": "2025-12-01T08:00:00", "Start City": "Leeds", "End City": "Paris"}
+    create_record(records, flight, "Flight")
+    backend.apply(records, {"op": "create", "type": "Flight", "record": flight})
+    # The ID in the data is ignored in memory and in the table alike
+    update = {"ID": 999, "City": "York", "Nickname": "RC"}
+    update_record(records, "Client", update, client_id=new_client["ID"])
+    backend.apply(records, {"op": "update", "type": "Client", "data": update, "client_id": new_client["ID"]})
+    delete_record(records, "Airline", airline_id=12)
+    backend.apply(records, {"op": "delete", "type": "Airline", "airline_id": 12})
+    backend.close()
+
+    backend = SQLiteBackend(db_path)
+    reloaded = backend.load()
+    backend.close()
+    assert reloaded.get_record("Client", new_client["ID"]) == new_client
+    assert reloaded.get_record("Client", new_client["ID"])["Nickname"] == "RC"
+    assert reloaded.get_record("Client", 999) is None
+    assert reloaded.flights_for_client(new_client["ID"]) == [flight]
+    assert reloaded.get_record("Airline", 12) is None
+    assert reloaded.allocate_id("Client") == new_client["ID"] + 1
+
+def test_sqlite_foreign_keys(db_path):
+    """Test that the database refuses flights without a client and cascades deletes."""
+    backend = SQLiteBackend(db_path)
+    records = backend.load()
+    assert not backend.apply(records, {"op": "create", "type": "Flight", "record": {"Client_ID": 9, "Airline_ID": 9}})
+    backend.apply(records, {"op": "create", "type": "Client", "record": {"ID": 1, "Type": "Client"}})
+    backend.apply(records, {"op": "create", "type": "Airline", "record": {"ID": 1, "Type": "Airline"}})
+    backend.apply(records, {"op": "create", "type": "Flight", "record": {"Client_ID": 1, "Airline_ID": 1}})
+    backend.apply(records, {"op": "delete", "type": "Client", "client_id": 1})
+    assert backend.load()["Flight"] == []
+    indexes = {row[0] for row in backend.conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"flights_client_id", "flights_airline_id", "flights_date"} <= indexes
+    backend.close()
+
+def test_sqlite_on_delete_policies(db_path):
+    """Test that the database applies the nullify and restrict delete policies."""
+    backend = SQLiteBackend(db_path)
+    records = backend.load()
+    backend.apply(records, {"op": "create", "type": "Client", "record": {"ID": 1, "Type": "Client"}})
+    backend.apply(records, {"op": "create", "type": "Airline", "record": {"ID": 1, "Type": "Airline"}})
+    backend.apply(records, {"op": "create", "type": "Flight", "record": {"Client_ID": 1, "Airline_ID": 1}})
+    assert not backend.apply(records, {"op": "delete", "type": "Airline", "airline_id": 1, "on_delete": "restrict"})
+    assert backend.apply(records, {"op": "delete", "type": "Airline", "airline_id": 1, "on_delete": "nullify"})
+    loaded = backend.load()
+    assert loaded["Airline"] == []
+    assert loaded["Flight"] == [{"Client_ID": 1}]
+    backend.close()
+
+@pytest.mark.parametrize("kind", ["json", "sqlite"])
+def test_bulk_entries_persist(tmp_path, kind):
+    """Test that a bulk update and a bulk delete are stored as one entry each."""
+    if kind == "sqlite":
+        backend = SQLiteBackend(str(tmp_path / "records.db"))
+    else:
+        backend = JsonBackend(str(tmp_path / "records.json"), str(tmp_path / "records.jsonl"))
+    backend.save({"Client": [{"ID": 1, "Type": "Client"}, {"ID": 2, "Type": "Client"}],
+                  "Airline": [{"ID": 1, "Type": "Airline"}, {"ID": 2, "Type": "Airline"}],
+                  "Flight": [{"Client_ID": 1, "Airline_ID": 1, "Date": "2025-10-01T09:00:00"},
+                             {"Client_ID": 2, "Airline_ID": 1, "Date": "2025-10-05T09:00:00"},
+                             {"Client_ID": 2, "Airline_ID": 2, "Date": "2025-10-02T09:00:00"}]})
+    records = backend.load()
+    for entry in ({"op": "bulk_update", "type": "Flight", "match": {"where": {"Airline_ID": 1}},
+                   "data": {"End City": "Oslo"}},
+                  {"op": "bulk_delete", "type": "Flight", "match": {"where": {"Airline_ID": 1},
+                                                                    "start_date": "2025-10-03"}},
+                  {"op": "bulk_delete", "type": "Airline", "match": {"ids": [2]}, "on_delete": "nullify"}):
+        if entry["op"] == "bulk_update":
+            assert bulk_update_records(records, entry["type"], entry["data"], **entry["match"])
+        else:
+            assert bulk_delete_records(records, entry["type"], on_delete=entry.get("on_delete"), **entry["match"])
+        assert backend.apply(records, entry)
+    loaded = backend.load()
+    assert [f.get("End City") for f in records["Flight"]] == ["Oslo", None]
+    assert sorted((f["Date"], f.get("Airline_ID"), f.get("End City")) for f in loaded["Flight"]) == [
+        ("2025-10-01T09:00:00", 1, "Oslo"), ("2025-10-02T09:00:00", None, None)]
+    assert [a["ID"] for a in loaded["Airline"]] == [1]
+    backend.close()
+
+def test_open_backend(tmp_path, db_path):
+    """Test that the backend is chosen through the environment."""
+    assert isinstance(open_backend({"RMS_BACKEND": "sqlite", "RMS_DATA_PATH": db_path}), SQLiteBackend)
+    backend = open_backend({"RMS_DATA_PATH": str(tmp_path / "records.json"), "RMS_JOURNAL_PATH": str(tmp_path / "records.jsonl")})
+    assert isinstance(backend, JsonBackend)
+    with pytest.raises(ValueError):
+        open_backend({"RMS_BACKEND": "csv"})
@@ -0,0 +1,109 @@
+import sys
+import os
+import json
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+import pytest
+from bulk_import import ImportReport, bulk_import
+from records import RecordStore
+
+CLIENT_HEADER = "ID,Name,Address Line 1,Address Line 2,Address Line 3,City,State,Zip Code,Country,Phone Number\n"
+
+
+@pytest.fixture
+def store():
+    return RecordStore({
+        "Client": [{"ID": 1, "Type": "Client", "Name": "Existing"}],
+        "Airline": [{"ID": 1, "Type": "Airline", "Company Name": "British Airways"}],
+        "Flight": [],
+    })
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+def test_import_csv_clients(tmp_path, store):
+    """Test that valid CSV rows get new IDs and blank required fields are rejected."""
+    path = write(tmp_path, "clients.csv", CLIENT_HEADER +
+                 "7,Ann Lee,1 Road,Flat 2,Block C,Leeds,Yorkshire,LS1 1AA,UK,0113 000\n"
+                 "8,Bob Ray,2 Road,,Block D,York,Yorkshire,YO1 1AA,UK,0190 000\n"
+                 "9,Cat Day,3 Road,Flat 4,Block E,Hull,Yorkshire,HU1 1AA,UK,0148 000,extra\n")
+    report = bulk_import(store, path, record_type="Client")
+    assert report.created["Client"] == 1
+    assert store.get_record("Client", 2)["Name"] == "Ann Lee"
+    assert store.get_record("Client", 2)["Type"] == "Client"
+    assert report.id_map == {("Client", 7): 2}
+    assert [(line, reason) for _, line, reason in report.rejected] == [
+        (3, "missing Address Line 2"), (4, "more values than columns")]
+
+def test_import_jsonl_mixed_types(tmp_path, store):
+    """Test that flights can refer to clients imported earlier and bad lines are skipped."""
+    clients = write(tmp_path, "clients.csv", CLIENT_HEADER +
+                    "50,Ann Lee,1 Road,Flat 2,Block C,Leeds,Yorkshire,LS1 1AA,UK,0113 000\n")
+    flights = write(tmp_path, "flights.jsonl", "\n".join([
+        json.dumps({"Type": "Airline", "ID": 3, "Company Name": "Air France"}),
+        json.dumps({"Type": "Flight", "Client_ID": 50, "Airline_ID": 3, "Date": "2025-10-01T09:00:00",
+                    "Start City": "Leeds", "End City": "Paris"}),
+        json.dumps({"Type": "Flight", "Client_ID": "1", "Airline_ID": 1, "Date": "2025-10-02T09:00:00",
+                    "Start City": "London", "End City": "Paris"}),
+        json.dumps({"Type": "Flight", "Client_ID": 99, "Airline_ID": 1, "Date": "2025-10-03T09:00:00",
+                    "Start City": "London", "End City": "Paris"}),
+        '{"Type": "Flight", "Client_ID": ',
+        json.dumps({"Type": "Boat", "Name": "Ferry"}),
+        json.dumps([1, 2]),
+    ]) + "\n")
+    report = ImportReport()
+    bulk_import(store, clients, record_type="Client", report=report)
+    bulk_import(store, flights, batch_size=2, report=report)
+    assert report.created == {"Client": 1, "Airline": 1, "Flight": 2}
+    assert [(f["Client_ID"], f["Airline_ID"]) for f in store["Flight"]] == [(2, 2), (1, 1)]
+    assert store.flights_for_client(2)[0]["End City"] == "Paris"
+    assert [(line, reason.split(":")[0]) for _, line, reason in report.rejected] == [
+        (4, "no Client with ID 99"), (5, "invalid JSON"), (6, "unknown record type 'Boat'"), (7, "not a JSON object")]
+
+def test_import_into_plain_dict(tmp_path):
+    """Test that importing into the plain records dict keeps the ID sequence with it."""
+    records = {"Airline": [{"ID": 4, "Type": "Airline", "Company Name": "KLM"}]}
+    path = write(tmp_path, "airlines.jsonl", json.dumps({"Company Name": "EasyJet"}) + "\n")
+    bulk_import(records, path, record_type="Airline")
+    assert [a["ID"] for a in records["Airline"]] == [4, 5]
+    assert records["Next ID"]["Airline"] == 6
+    assert records["Flight"] == []
+
+def test_import_rebuilds_text_index(tmp_path, store):
+    """Test that imported clients can be found by the text search."""
+    store.build_text_index()
+    path = write(tmp_path, "clients.csv", CLIENT_HEADER +
+                 ",Zara Quinn,1 Road,Flat 2,Block C,Leeds,Yorkshire,LS1 1AA,UK,0113 000\n")
+    bulk_import(store, path, record_type="Client")
+    assert [c["Name"] for c in store.search_text("Client", "quinn")] == ["Zara Quinn"]
+
+def test_import_normalises_flight_dates(tmp_path, store):
+    """Test that flight dates are stored in ISO form and unreadable dates are rejected."""
+    path = write(tmp_path, "flights.csv", "Client_ID,Airline_ID,Date,Start City,End City\n"
+                 "1,1,2025-10-02 09:30,Leeds,Paris\n"
+                 "1,1,2025-10-01,Leeds,Rome\n"
+                 "1,1,next Tuesday,Leeds,Oslo\n")
+    report = bulk_import(store, path, record_type="Flight")
+    assert [f["Date"] for f in store.query_flights()] == ["2025-10-01T00:00:00", "2025-10-02T09:30:00"]
+    assert [(line, reason) for _, line, reason in report.rejected] == [(4, "Date 'next Tuesday' is not an ISO date")]
+
+def test_parallel_import_matches_serial(tmp_path):
+    """Test that checking batches in worker processes gives the same IDs and rejects."""
+    rows = [json.dumps({"Type": "Client", "ID": i, "Name": f"C{i}", "Address Line 1": "1 Road",
+                        "Address Line 2": "Flat", "Address Line 3": "Block", "City": "Leeds", "State": "Yorks",
+                        "Zip Code": "LS1", "Country": "UK", "Phone Number": "0113"}) for i in range(10, 30)]
+    rows += [json.dumps({"Type": "Flight", "Client_ID": i, "Airline_ID": 1, "Date": f"2025-10-{i:02d}",
+                         "Start City": "Leeds", "End City": "Paris"}) for i in range(5, 31)]
+    rows.insert(7, "not json")
+    path = write(tmp_path, "mixed.jsonl", "\n".join(rows) + "\n")
+    results = []
+    for workers in (1, 2):
+        records = {"Airline": [{"ID": 1, "Type": "Airline", "Company Name": "KLM"}]}
+        report = bulk_import(records, path, batch_size=6, workers=workers)
+        results.append((records, report.created, report.rejected, report.id_map))
+    assert results[0] == results[1]
+    # Client_ID 5 to 9 are new IDs, 10 to 29 file IDs and 30 neither
+    assert results[0][1] == {"Client": 20, "Airline": 0, "Flight": 25}
+    assert [reason for _, _, reason in results[0][2]] == ["invalid JSON: Expecting value: line 1 column 1 (char 0)",
+                                                          "no Client with ID 30"]
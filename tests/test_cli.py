@@ -0,0 +1,108 @@
+import sys
+import os
+import json
+import shutil
+import subprocess
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+import pytest
+from backends import SQLiteBackend, migrate_json_to_sqlite
+from cli import main
+from storage import load_records
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), '../data/test_records.json')
+REPO_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+CLIENT_FIELDS = ["Name=Row Client", "Address Line 1=1 Row Road", "Address Line 2=Flat 2", "Address Line 3=Rowley",
+                 "City=Leeds", "State=West Yorkshire", "Zip Code=LS1 1AA", "Country=UK", "Phone Number=0113 000"]
+
+
+@pytest.fixture
+def data_args(tmp_path):
+    path = str(tmp_path / "records.json")
+    shutil.copy(DATA_PATH, path)
+    return ["--backend", "json", "--data", path, "--journal", str(tmp_path / "journal.jsonl")]
+
+
+def test_search_prints_json_lines(data_args, capsys):
+    """Records are printed one JSON object per line; a missing ID fails."""
+    assert main(data_args + ["search", "Client", "1"]) == 0
+    assert json.loads(capsys.readouterr().out)["ID"] == 1
+    assert main(data_args + ["search", "Airline", "1", "--join"]) == 0
+    rows = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert rows and all(row["flight"]["Airline_ID"] == 1 for row in rows)
+    assert main(data_args + ["search", "Client", "999"]) == 1
+
+
+def test_edits_are_journaled(data_args, capsys):
+    """create, update and delete are saved through the backend and survive a reload."""
+    assert main(data_args + ["create", "Client"] + CLIENT_FIELDS) == 0
+    new_id = json.loads(capsys.readouterr().out)["ID"]
+    assert main(data_args + ["update", "Client", "--client-id", str(new_id), "City=York"]) == 0
+    assert main(data_args + ["delete", "Airline", "--airline-id", "1", "--on-delete", "restrict"]) == 1
+    assert main(data_args + ["delete", "Airline", "--airline-id", "1", "--on-delete", "nullify"]) == 0
+    assert main(data_args + ["compact"]) == 0
+    records = load_records(data_args[3])
+    assert [c["City"] for c in records["Client"] if c["ID"] == new_id] == ["York"]
+    assert all(a["ID"] != 1 for a in records["Airline"])
+    assert main(data_args + ["check"]) == 0
+
+
+def test_create_refuses_missing_fields(data_args, capsys):
+    """create checks the required fields as the GUI does and saves nothing if one is missing."""
+    assert main(data_args + ["create", "Client", "Name=Row Client", "City=Leeds"]) == 1
+    assert "Phone Number" in capsys.readouterr().out
+    assert main(data_args + ["create", "Flight", "Client_ID=1", "Airline_ID=1", "Date=2025-10-15"]) == 1
+    assert not os.path.exists(data_args[5])
+
+
+def test_update_moves_flight_by_integer_ids(data_args, capsys):
+    """update casts the IDs a flight is moved to and refuses a client that does not exist."""
+    flight = ["update", "Flight", "--client-id", "1", "--airline-id", "1"]
+    assert main(data_args + flight + ["Client_ID=999"]) == 1
+    assert "No Client found" in capsys.readouterr().out
+    assert main(data_args + flight + ["Client_ID=2"]) == 0
+    capsys.readouterr()
+    assert main(data_args + ["search", "Flight", "2"]) == 0
+    assert "London" in capsys.readouterr().out
+    assert main(data_args + ["compact"]) == 0
+    assert main(data_args + ["check"]) == 0
+
+
+def test_check_reports_stale_sequence(data_args, tmp_path, capsys):
+    """check reads the stored Next ID, which loading the records would have moved on."""
+    records = load_records(DATA_PATH)
+    records["Next ID"] = {"Client": 2, "Airline": 50}
+    with open(data_args[3], "w") as f:
+        json.dump(records, f)
+    assert main(data_args + ["check"]) == 1
+    assert "next Client ID 2 is already in use" in capsys.readouterr().out
+    db_path = str(tmp_path / "records.db")
+    migrate_json_to_sqlite(DATA_PATH, db_path)
+    backend = SQLiteBackend(db_path)
+    backend.conn.execute("UPDATE meta SET value = ? WHERE key = 'Next ID'", (json.dumps(records["Next ID"]),))
+    backend.conn.commit()
+    backend.close()
+    assert main(["--backend", "sqlite", "--data", db_path, "check"]) == 1
+    assert "next Client ID 2 is already in use" in capsys.readouterr().out
+
+
+def test_lookup_does_not_import_the_gui(data_args):
+    """A search imports neither tkinter nor the import and export modules."""
+    script = ("import sys, runpy; sys.argv = ['src'] + sys.argv[1:]\n"
+              "try: runpy.run_module('src', run_name='__main__')\n"
+              "except SystemExit: pass\n"
+              "print(sorted(name for name in ('tkinter', 'bulk_import', 'export', 'main') if name in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", script] + data_args + ["search", "Client", "1"],
+                            cwd=REPO_PATH, capture_output=True, text=True, check=True)
+    assert result.stdout.splitlines()[-1] == "[]"
+
+
+def test_lookup_skips_unused_imports(data_args, tmp_path):
+    """With an empty journal a search imports neither jsonlines nor the remote and SQLite backends' modules."""
+    open(data_args[5], "w").close()
+    script = ("import sys, runpy; sys.argv = ['src'] + sys.argv[1:]\n"
+              "try: runpy.run_module('src', run_name='__main__')\n"
+              "except SystemExit: pass\n"
+              "print(sorted(name for name in ('jsonlines', 'urllib.request', 'sqlite3') if name in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", script] + data_args + ["search", "Client", "1"],
+                            cwd=REPO_PATH, capture_output=True, text=True, check=True)
+    assert result.stdout.splitlines()[-1] == "[]"
@@ -0,0 +1,82 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+import json
+import pytest
+from compact import CompactClient, CompactFlight, to_compact, to_dict
+from records import RecordStore, create_record, update_record, delete_record, search_records
+from storage import load_records, save_records
+
+@pytest.fixture
+def client():
+    return {
+        "ID": 1,
+        "Type": "Client",
+        "Name": "Compact Client",
+        "Address Line 1": "1 Slot Street",
+        "Address Line 2": "",
+        "Address Line 3": "",
+        "City": "London",
+        "State": "Greater London",
+        "Zip Code": "SW1A 1AA",
+        "Country": "UK",
+        "Phone Number": "555-0000"
+    }
+
+def test_round_trip(client):
+    """Test that a record converts to the compact form and back unchanged."""
+    compact = to_compact("Client", client)
+    assert isinstance(compact, CompactClient)
+    assert compact == client
+    assert to_dict(compact) == client
+    assert list(compact) == list(client)
+
+def test_dict_access(client):
+    """Test the dict style access used by main.py and records.py."""
+    compact = to_compact("Client", client)
+    assert compact.get("City") == "London"
+    assert compact["Zip Code"] == "SW1A 1AA"
+    assert compact.get("Company Name", "") == ""
+    compact.update({"City": "Leeds", "Nickname": "CC"})
+    assert compact["City"] == "Leeds"
+    assert compact.to_dict()["Nickname"] == "CC"
+    with pytest.raises(KeyError):
+        compact["Missing"]
+
+def test_missing_fields_stay_missing():
+    """Test that fields absent from the JSON are not added on conversion."""
+    flight = to_compact("Flight", {"Client_ID": 1, "Airline_ID": 2})
+    assert isinstance(flight, CompactFlight)
+    assert "Date" not in flight
+    assert flight.to_dict() == {"Client_ID": 1, "Airline_ID": 2}
+
+def test_cities_interned():
+    """Test that repeated strings are shared between records."""
+    first = to_compact("Flight", {"Start City": "".join(["Lon", "don"])})
+    second = to_compact("Flight", {"Start City": "".join(["Lond", "on"])})
+    assert first["Start City"] is second["Start City"]
+
+def test_compact_store_crud(client):
+    """Test that the CRUD functions work on a compact RecordStore."""
+    store = RecordStore({"Client": [client], "Airline": [{"ID": 1, "Type": "Airline", "Company Name": "Air"}], "Flight": []}, compact=True)
+    assert isinstance(store["Client"][0], CompactClient)
+    assert create_record(store, {"Name": "Second"}, "Client") == "Entry has been created successfully"
+    assert isinstance(store["Client"][-1], CompactClient)
+    create_record(store, {"Client_ID": 2, "Airline_ID": 1, "Date": "2025-10-01T10:00:00"}, "Flight")
+    assert update_record(store, "Client", {"Name": "Renamed"}, client_id="1") == 1
+    assert search_records(store, "1", "Client")[0]["Name"] == "Renamed"
+    assert search_records(store, "2", "Flight")[0]["Date"] == "2025-10-01T10:00:00"
+    delete_record(store, "Client", client_id="2")
+    assert len(store["Client"]) == 1
+
+def test_compact_save_load(tmp_path, client):
+    """Test that compact records are saved in the same JSON shape."""
+    file_path = str(tmp_path / "records.json")
+    store = RecordStore({"Client": [client], "Airline": [], "Flight": []}, compact=True)
+    save_records(store, file_path)
+    with open(file_path) as f:
+        assert json.load(f)["Client"] == [client]
+    for streaming in (False, True):
+        loaded = load_records(file_path, streaming=streaming, compact=True)
+        assert isinstance(loaded["Client"][0], CompactClient)
+        assert loaded["Client"] == [client]
@@ -0,0 +1,80 @@
+import sys
+import os
+import csv
+import gzip
+import json
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+import pytest
+import export
+from export import export_records, iter_export
+from records import RecordStore
+
+
+@pytest.fixture
+def store():
+    return RecordStore({
+        "Client": [{"ID": 1, "Type": "Client", "Name": "Ann", "City": "Leeds"},
+                   {"ID": 2, "Type": "Client", "Name": "Bob", "City": "York"},
+                   {"ID": 3, "Type": "Client", "Name": "Cat", "City": "Leeds"}],
+        "Airline": [{"ID": 1, "Type": "Airline", "Company Name": "British Airways"}],
+        "Flight": [{"Client_ID": 1, "Airline_ID": 1, "Type": "Flight", "Date": "2025-10-03T10:00:00",
+                    "Start City": "Leeds", "End City": "Paris"},
+                   {"Client_ID": 2, "Airline_ID": 1, "Type": "Flight", "Date": "2025-10-01T10:00:00",
+                    "Start City": "Paris", "End City": "Leeds"},
+                   {"Client_ID": 3, "Airline_ID": 1, "Type": "Flight", "Date": "2025-10-02T10:00:00",
+                    "Start City": "York", "End City": "Paris"},
+                   {"Client_ID": 1, "Airline_ID": 1, "Type": "Flight", "Date": "2025-11-01T10:00:00",
+                    "Start City": "Leeds", "End City": "Leeds"}],
+    })
+
+def test_filter_clients(store):
+    """Test that clients are filtered by ID range and city."""
+    assert [c["Name"] for c in iter_export(store, "Client", id_range=(2, 3))] == ["Bob", "Cat"]
+    assert [c["Name"] for c in iter_export(store, "Client", id_range=(2, None), city="Leeds")] == ["Cat"]
+    assert list(iter_export(store, "Client", date_range=("2025-10-01", None))) == []
+
+def test_filter_flights_by_date_and_city(store, monkeypatch):
+    """Test that flights come in date order, paged, with each city flight once."""
+    monkeypatch.setattr(export, "EXPORT_PAGE_SIZE", 1)
+    flights = iter_export(store, "Flight", date_range=("2025-10-01", "2025-12-01"), city="Leeds")
+    assert [f["Date"][:10] for f in flights] == ["2025-10-01", "2025-10-03", "2025-11-01"]
+    flights = iter_export(store, "Flight", date_range=(None, "2025-11-01"))
+    assert [f["Client_ID"] for f in flights] == [2, 3, 1]
+    assert [f["Date"][:10] for f in iter_export(store, "Flight", id_range=(1, 1))] == ["2025-10-03", "2025-11-01"]
+    # A range far wider than the clients walks the clients with flights
+    assert [f["Client_ID"] for f in iter_export(store, "Flight", id_range=(2, 10 ** 12))] == [2, 3]
+
+def test_export_csv(tmp_path, store):
+    """Test that a CSV export has the columns of its record type."""
+    path = str(tmp_path / "clients.csv")
+    assert export_records(store, path, ["Client"], city="Leeds") == 2
+    with open(path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert [row["Name"] for row in rows] == ["Ann", "Cat"]
+    assert rows[0]["Address Line 1"] == ""
+    with pytest.raises(ValueError):
+        export_records(store, path)
+
+def test_export_jsonl_and_snapshot(tmp_path, store):
+    """Test that JSON Lines and gzip snapshots hold the same records as the store."""
+    path = str(tmp_path / "flights.jsonl")
+    assert export_records(store, path, ["Flight"], id_range=(2, 3)) == 2
+    with open(path) as f:
+        assert [json.loads(line)["Client_ID"] for line in f] == [2, 3]
+
+    path = str(tmp_path / "backup.json.gz")
+    assert export_records(store, path) == 8
+    with gzip.open(path, "rt") as f:
+        snapshot = json.load(f)
+    assert snapshot["Client"] == store["Client"]
+    assert len(snapshot["Flight"]) == 4
+    assert snapshot["Next ID"] == {"Client": 4, "Airline": 2}
+    assert "Journal Seq" not in snapshot  # the store was not loaded with a journal
+
+    store.remove_record("Client", store["Client"][-1])
+    store["Journal Seq"] = 7
+    export_records(store, path)
+    with gzip.open(path, "rt") as f:
+        restored = RecordStore(json.load(f))
+    assert restored["Journal Seq"] == 7
+    assert restored.allocate_id("Client") == 4
@@ -0,0 +1,108 @@
+import sys
+import os
+import json
+import subprocess
+import time
+import types
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+import pytest
+import instrumentation
+from instrumentation import Metric, instrument_module, measure, timed
+
+SRC_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '../src'))
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(instrumentation, "ENABLED", True)
+    instrumentation.reset()
+    yield
+    instrumentation.reset()
+
+def test_disabled_is_a_no_op(monkeypatch):
+    """Test that nothing is wrapped or counted when instrumentation is off."""
+    monkeypatch.setattr(instrumentation, "ENABLED", False)
+    instrumentation.reset()
+    def lookup():
+        return 1
+    assert timed()(lookup) is lookup
+    with measure("block"):
+        pass
+    assert instrumentation.snapshot() == {}
+
+def test_timed_and_measure_count_calls(enabled):
+    """Test that decorated calls and measured blocks are counted, errors included."""
+    @timed("lookup")
+    def lookup(fail=False):
+        if fail:
+            raise ValueError
+        return 1
+    assert lookup() == 1
+    with pytest.raises(ValueError):
+        lookup(fail=True)
+    with measure("block"):
+        pass
+    metrics = instrumentation.snapshot()
+    assert metrics["lookup"]["count"] == 2
+    assert metrics["block"]["count"] == 1
+    assert sum(metrics["lookup"]["histogram"].values()) == 2
+
+def test_generators_are_timed_over_iteration(enabled):
+    """Test that a timed generator counts once, for the time spent producing its items."""
+    @timed("batches")
+    def batches():
+        for number in range(3):
+            time.sleep(0.01)
+            yield number
+    generator = batches()
+    assert instrumentation.snapshot() == {}
+    for number in generator:
+        time.sleep(0.05)  # the consumer's time is not counted
+    metric = instrumentation.snapshot()["batches"]
+    assert metric["count"] == 1
+    assert 30 <= metric["total_ms"] < 150
+
+def test_histogram_percentiles():
+    """Test that percentiles come from the bucket bounds."""
+    metric = Metric("m")
+    for elapsed_ms in (0.5, 0.7, 3, 40000):
+        metric.add(elapsed_ms)
+    assert metric.percentile(0.5) == 1
+    assert metric.percentile(0.75) == 5
+    assert metric.percentile(1.0) == 40000
+    assert metric.to_dict()["slower"] == 1
+
+def test_instrument_module(enabled, tmp_path):
+    """Test that public functions and methods are wrapped once and dumped to JSON."""
+    module = types.ModuleType("fake_records")
+    exec("def find(x):\n    return x\n"
+         "def _private():\n    return 0\n"
+         "def skipped():\n    return 0\n"
+         "class Store:\n    def get(self):\n        return 2\n", module.__dict__)
+    sys.modules["fake_records"] = module
+    try:
+        private = module._private
+        instrument_module("fake_records", exclude=("skipped",))
+        instrument_module("fake_records", exclude=("skipped",))
+        assert module.find(3) == 3 and module.Store().get() == 2 and module.skipped() == 0
+        assert module._private is private
+    finally:
+        del sys.modules["fake_records"]
+    path = str(tmp_path / "perf.json")
+    assert instrumentation.dump(path)
+    with open(path) as f:
+        metrics = json.load(f)["metrics"]
+    assert {name: metric["count"] for name, metric in metrics.items()} == {
+        "fake_records.find": 1, "fake_records.Store.get": 1}
+
+def test_environment_switch(tmp_path):
+    """Test that RMS_INSTRUMENT times the records functions and RMS_INSTRUMENT_DUMP writes them at exit."""
+    path = str(tmp_path / "perf.json")
+    env = dict(os.environ, RMS_INSTRUMENT="1", RMS_INSTRUMENT_DUMP=path)
+    code = ("from records import search_records\n"
+            "search_records({'Client': [{'ID': 1}]}, '1', 'Client')\n")
+    subprocess.run([sys.executable, "-c", code], cwd=SRC_PATH, env=env, check=True)
+    with open(path) as f:
+        metrics = json.load(f)["metrics"]
+    assert metrics["records.search_records"]["count"] == 1
+    assert metrics["records.RecordStore.get_record"]["count"] == 1
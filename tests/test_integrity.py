@@ -0,0 +1,118 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+import pytest
+from integrity import CASCADE, NULLIFY, RESTRICT, check_integrity
+from records import ChangeSet, RecordStore, delete_record
+from storage import load_records
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), '../data/test_records.json')
+
+
+@pytest.fixture
+def store():
+    return RecordStore({
+        "Client": [{"ID": 1, "Type": "Client", "Name": "Ann"}, {"ID": 2, "Type": "Client", "Name": "Bob"}],
+        "Airline": [{"ID": 1, "Type": "Airline", "Company Name": "British Airways"},
+                    {"ID": 2, "Type": "Airline", "Company Name": "Air France"}],
+        "Flight": [{"Client_ID": 1, "Airline_ID": 1, "Date": "2025-10-01T10:00:00"},
+                   {"Client_ID": 2, "Airline_ID": 1, "Date": "2025-10-02T10:00:00"},
+                   {"Client_ID": 1, "Airline_ID": 2, "Date": "2025-10-03T10:00:00"}],
+    })
+
+def test_cascade_deletes_only_dependent_flights(store):
+    """Test that deleting a client removes its flights and nothing else."""
+    changes = ChangeSet()
+    assert delete_record(store, "Client", client_id=1, changes=changes, on_delete=CASCADE) is None
+    assert [(f["Client_ID"], f["Airline_ID"]) for f in store["Flight"]] == [(2, 1)]
+    assert store.flights_for_client(1) == []
+    assert len(changes.for_type("Flight").removed) == 2
+    assert check_integrity(store) == []
+
+def test_cascade_removes_flights_by_position():
+    """Test that cascades on a large store keep the Flight list in order without a pass over it."""
+    from records import create_record
+    store = RecordStore({
+        "Client": [{"ID": i, "Type": "Client"} for i in range(1, 201)],
+        "Airline": [{"ID": 1, "Type": "Airline"}],
+        "Flight": [{"Client_ID": i % 200 + 1, "Airline_ID": 1, "Date": f"2025-10-{i % 28 + 1:02d}", "N": i}
+                   for i in range(20000)],
+    })
+    class PassCountingList(list):
+        passes = 0
+
+        def __iter__(self):
+            PassCountingList.passes += 1
+            return super().__iter__()
+
+    store["Flight"] = PassCountingList(store["Flight"])
+    expected = list(store["Flight"])
+    PassCountingList.passes = 0
+    for client_id in (5, 17, 200):
+        delete_record(store, "Client", client_id=client_id)
+        expected = [f for f in expected if f["Client_ID"] != client_id]
+        create_record(store, {"Client_ID": 1, "Airline_ID": 1, "Date": "2025-11-01"}, "Flight")
+        expected.append(store["Flight"][-1])
+        assert store["Flight"] == expected
+    # One pass numbers the list for the first removal, none after that
+    assert PassCountingList.passes == 1
+    # A list changed behind the store's back is renumbered, not corrupted
+    store["Flight"].pop(0)
+    expected.pop(0)
+    delete_record(store, "Client", client_id=9)
+    assert store["Flight"] == [f for f in expected if f["Client_ID"] != 9]
+    assert store.flights_for_client(9) == []
+
+def test_cascade_is_the_default(store):
+    """Test that a delete without a policy leaves no orphan flights."""
+    delete_record(store, "Airline", airline_id=1)
+    assert [(f["Client_ID"], f["Airline_ID"]) for f in store["Flight"]] == [(1, 2)]
+
+def test_restrict_refuses_referenced_delete(store):
+    """Test that restrict keeps a client with flights and everything else unchanged."""
+    assert delete_record(store, "Client", client_id=2, on_delete=RESTRICT) == -3
+    assert store.get_record("Client", 2) is not None
+    assert len(store["Flight"]) == 3
+    store["Client"].append({"ID": 3, "Type": "Client"})
+    store.reindex()
+    assert delete_record(store, "Client", client_id=3, on_delete=RESTRICT) is None
+
+def test_nullify_detaches_flights(store):
+    """Test that nullify keeps the flights with their reference cleared."""
+    changes = ChangeSet()
+    delete_record(store, "Airline", airline_id=1, changes=changes, on_delete=NULLIFY)
+    assert [f["Airline_ID"] for f in store["Flight"]] == [None, None, 2]
+    assert store.flights_for_airline(1) == []
+    assert len(changes.for_type("Flight").updated) == 2
+    assert check_integrity(store) == []
+
+def test_unknown_policy(store):
+    """Test that a misspelt policy is an error rather than a silent cascade."""
+    with pytest.raises(ValueError):
+        delete_record(store, "Client", client_id=1, on_delete="cascades")
+
+def test_flight_delete_needs_both_ids(store):
+    """Test that a flight delete only removes the flights of that client with that airline."""
+    delete_record(store, "Flight", client_id=1, airline_id=1)
+    assert [(f["Client_ID"], f["Airline_ID"]) for f in store["Flight"]] == [(2, 1), (1, 2)]
+
+def test_check_integrity_reports_problems():
+    """Test that the checker finds orphans, duplicates and a stale sequence."""
+    records = {
+        "Client": [{"ID": 1}, {"ID": 1}, {"Name": "No ID"}, "junk"],
+        "Airline": [{"ID": "7"}],
+        "Flight": [{"Client_ID": 1, "Airline_ID": 9}, {"Client_ID": None, "Airline_ID": None}],
+        "Next ID": {"Client": 1, "Airline": 1},
+    }
+    assert check_integrity(records) == [
+        ("Client", 1, "duplicate ID 1"),
+        ("Client", 2, "has no ID"),
+        ("Client", 3, "is not a record"),
+        ("Airline", 0, "ID '7' is not a number"),
+        ("Flight", 0, "Airline_ID 9 has no Airline"),
+        ("Next ID", None, "next Client ID 1 is already in use"),
+    ]
+
+def test_sample_data_is_consistent():
+    """Test that the shipped sample file passes the checker."""
+    assert check_integrity(load_records(DATA_PATH)) == []
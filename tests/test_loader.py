@@ -0,0 +1,80 @@
+import sys
+import os
+import shutil
+import threading
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+import pytest
+from backends import JsonBackend, SQLiteBackend, StorageBackend, migrate_json_to_sqlite
+from loader import BackgroundLoader
+from records import RecordStore
+from storage import load_records
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), '../data/test_records.json')
+
+
+class FailingBackend(StorageBackend):
+    """A backend whose load always fails."""
+
+    def load(self, compact=False, progress=None):
+        raise OSError("disk unreadable")
+
+
+def run_loader(backend, **callbacks):
+    """Load through a BackgroundLoader, then poll what it queued."""
+    loader = BackgroundLoader(backend, **callbacks)
+    assert loader.wait(timeout=30)
+    assert loader.poll() is False
+    return loader
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "json":
+        path = str(tmp_path / "records.json")
+        shutil.copy(DATA_PATH, path)
+        backend = JsonBackend(path, str(tmp_path / "journal.jsonl"))
+    else:
+        path = str(tmp_path / "records.db")
+        migrate_json_to_sqlite(DATA_PATH, path)
+        backend = SQLiteBackend(path)
+    yield backend
+    backend.close()
+
+
+def test_batches_come_before_the_indexed_store(backend):
+    """Batches are reported as read, then indexing starts, then the store is handed over."""
+    events = []
+    loader = run_loader(backend,
+                        on_batch=lambda record_type, batch: events.append((record_type, len(batch))),
+                        on_indexing=lambda: events.append("indexing"),
+                        on_loaded=lambda records: events.append(records))
+    expected = load_records(DATA_PATH)
+    assert events[0][0] == "Client"
+    assert events.index("indexing") == len(events) - 2
+    records = events[-1]
+    assert isinstance(records, RecordStore) and records is loader.records
+    assert records.text_index is not None
+    for record_type in ("Client", "Airline", "Flight"):
+        assert loader.counts[record_type] == len(expected[record_type])
+        assert sum(size for event, size in events[:-2] if event == record_type) == len(expected[record_type])
+        assert records[record_type] == expected[record_type]
+    assert loader.timings["read"] <= loader.timings["loaded"]
+
+
+def test_load_error_is_reported():
+    """A failed load calls on_error instead of on_loaded."""
+    errors, loaded = [], []
+    loader = run_loader(FailingBackend(), on_loaded=loaded.append, on_error=errors.append)
+    assert isinstance(errors[0], OSError) and loaded == []
+    assert loader.records is None
+
+
+def test_callbacks_run_only_when_polled(backend):
+    """The worker thread queues its callbacks; poll() runs them on the calling thread."""
+    threads = []
+    loader = BackgroundLoader(backend, on_batch=lambda record_type, batch: threads.append(threading.get_ident()),
+                              on_loaded=lambda records: threads.append(threading.get_ident()))
+    assert loader.wait(timeout=30)
+    assert threads == []
+    assert loader.poll() is False
+    assert threads and set(threads) == {threading.get_ident()}
@@ -0,0 +1,116 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+import pytest
+tk = pytest.importorskip("tkinter")
+from paged_view import PagedTreeview, clamp_offset, scroll_fractions
+from records import ChangeSet
+
+
+class FakeTree:
+    """Stands in for ttk.Treeview so the paging can be tested without a display."""
+
+    def __init__(self):
+        self.values = {}
+        self.shown = []
+        self.inserts = 0
+
+    def insert(self, parent, index, values):
+        self.inserts += 1
+        item = f"I{self.inserts}"
+        self.values[item] = values
+        self.shown.append(item)
+        return item
+
+    def item(self, item, values):
+        self.values[item] = values
+
+    def move(self, item, parent, index):
+        self.shown.insert(index, item)
+
+    def detach(self, *items):
+        self.shown = [item for item in self.shown if item not in items]
+
+    def selection(self):
+        return ()
+
+
+class FakeVar:
+    def set(self, value):
+        self.value = value
+
+
+class FakeScrollbar:
+    def set(self, first, last):
+        self.position = (first, last)
+
+
+@pytest.fixture
+def view():
+    paged = PagedTreeview.__new__(PagedTreeview)
+    paged.tree = FakeTree()
+    paged.scrollbar = FakeScrollbar()
+    paged.count_var = FakeVar()
+    paged.visible_rows = 10
+    paged.buffer_rows = 2
+    paged.rows = []
+    paged.row_values = None
+    paged.offset = 0
+    paged._items = []
+    paged._attached = 0
+    return paged
+
+def test_clamp_offset():
+    assert clamp_offset(-5, 100, 10) == 0
+    assert clamp_offset(95, 100, 10) == 90
+    assert clamp_offset(3, 5, 10) == 0
+
+def test_scroll_fractions():
+    assert scroll_fractions(0, 0, 10) == (0.0, 1.0)
+    assert scroll_fractions(50, 100, 10) == (0.5, 0.6)
+
+def test_only_window_materialised(view):
+    """Test that a large list only creates the visible rows plus the buffer."""
+    view.set_rows(list(range(100000)), lambda row: (row,))
+    assert view.tree.inserts == 12
+    assert view.count_var.value == "100000 records (showing 1-12)"
+
+def test_scrolling_reuses_items(view):
+    """Test that scrolling rewrites existing items instead of inserting new ones."""
+    view.set_rows(list(range(1000)), lambda row: (row,))
+    view.scroll_to(500)
+    assert view.tree.inserts == 12
+    assert [view.tree.values[item] for item in view.tree.shown[:3]] == [(500,), (501,), (502,)]
+    assert view.scrollbar.position == (0.5, 0.51)
+
+def test_short_list_detaches_items(view):
+    """Test that switching to a shorter list hides the unused pooled items."""
+    view.set_rows(list(range(50)))
+    view.set_rows([("a",), ("b",)])
+    assert [view.tree.values[item] for item in view.tree.shown] == [("a",), ("b",)]
+    view.set_rows(list(range(50)))
+    assert len(view.tree.shown) == 12
+    assert view.tree.inserts == 12
+
+def test_apply_changes_update_touches_one_item(view):
+    """Test that an update rewrites only the item showing the record."""
+    rows = [{"ID": i, "Name": f"Client {i}"} for i in range(100)]
+    view.set_rows(rows, lambda row: (row["ID"], row["Name"]), lambda row: f"Client:{row['ID']}")
+    writes = []
+    view.tree.item = lambda item, values: writes.append((item, values))
+    rows[3]["Name"] = "Renamed"
+    changes = ChangeSet()
+    changes.updated.append(("Client", "Client:3", rows[3]))
+    view.apply_changes(changes)
+    assert writes == [(view._items[3], (3, "Renamed"))]
+
+def test_apply_changes_insert_outside_window(view):
+    """Test that appending past the window only updates the count."""
+    rows = [{"ID": i} for i in range(100)]
+    view.set_rows(rows, lambda row: (row["ID"],), lambda row: f"Client:{row['ID']}")
+    rows.append({"ID": 100})
+    changes = ChangeSet()
+    changes.inserted.append(("Client", "Client:100", rows[-1]))
+    view.tree.item = None  # any Tk call would fail
+    view.apply_changes(changes)
+    assert view.count_var.value == "101 records (showing 1-12)"
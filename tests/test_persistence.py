@@ -0,0 +1,108 @@
+import sys
+import os
+import threading
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+import pytest
+from backends import JsonBackend, StorageBackend
+from persistence import PersistenceWorker
+from records import RecordStore, create_record
+from storage import load_records
+
+
+class RecordingBackend(StorageBackend):
+    """Keeps the batches it is asked to write; can be made to fail or wait."""
+
+    def __init__(self, fail=False):
+        self.batches = []
+        self.compacted = 0
+        self.fail = fail
+        self.release = threading.Event()
+        self.release.set()
+
+    def write(self, entries):
+        self.release.wait()
+        if self.fail:
+            raise OSError("disk full")
+        self.batches.append(list(entries))
+
+    def compact(self, records):
+        assert records is None  # the worker must not copy the records the GUI edits
+        self.compacted += 1
+
+
+@pytest.fixture
+def records():
+    return RecordStore({"Client": [], "Airline": [], "Flight": []})
+
+
+def test_rapid_edits_are_coalesced(records):
+    """Test that edits submitted together are written in one batch."""
+    backend = RecordingBackend()
+    saved = []
+    worker = PersistenceWorker(backend, records, on_saved=saved.append, coalesce_delay=0.5)
+    for number in range(5):
+        worker.submit({"op": "create", "type": "Client", "record": {"ID": number}})
+    assert worker.flush(timeout=5)
+    worker.close()
+    worker.poll()
+    assert [len(batch) for batch in backend.batches] == [5]
+    assert saved == [5]
+    assert backend.compacted == 1
+
+def test_submit_copies_the_record(records):
+    """Test that a record edited after submit is written as it was."""
+    backend = RecordingBackend()
+    backend.release.clear()
+    worker = PersistenceWorker(backend, records)
+    record = {"ID": 1, "Name": "Before"}
+    worker.submit({"op": "create", "type": "Client", "record": record})
+    record["Name"] = "After"
+    backend.release.set()
+    worker.close()
+    assert backend.batches[0][0]["record"]["Name"] == "Before"
+
+def test_errors_are_reported_through_poll(records):
+    """Test that a failed write reaches on_error when polled, not as an exception."""
+    backend = RecordingBackend(fail=True)
+    errors = []
+    worker = PersistenceWorker(backend, records, on_error=errors.append)
+    worker.submit({"op": "delete", "type": "Client", "client_id": 1})
+    assert worker.flush(timeout=5)
+    assert errors == []  # nothing runs until the GUI thread polls
+    worker.poll()
+    worker.close()
+    assert isinstance(errors[0], OSError)
+    assert backend.compacted == 0
+
+def test_close_while_gui_thread_is_busy(records):
+    """Test that close() returns while the worker has outcomes nobody has polled."""
+    backend = RecordingBackend()
+    backend.release.clear()
+    saved = []
+    worker = PersistenceWorker(backend, records, on_saved=saved.append)
+    worker.submit({"op": "create", "type": "Client", "record": {"ID": 1}})
+    closer = threading.Thread(target=worker.close)
+    closer.start()
+    backend.release.set()
+    closer.join(timeout=5)
+    assert not closer.is_alive()
+    assert saved == []
+    assert len(backend.batches) == 1
+
+def test_close_writes_pending_edits(tmp_path):
+    """Test that closing the worker leaves every edit in the journal."""
+    file_path = str(tmp_path / "records.json")
+    journal_path = str(tmp_path / "records.jsonl")
+    backend = JsonBackend(file_path, journal_path)
+    records = RecordStore({"Client": [], "Airline": [], "Flight": []})
+    worker = PersistenceWorker(backend, records, coalesce_delay=5)
+    for name in ("Ann", "Bob", "Cat"):
+        create_record(records, {"Name": name}, "Client")
+        worker.submit({"op": "create", "type": "Client", "record": records["Client"][-1]})
+    worker.close()
+    backend.close()
+    with pytest.raises(RuntimeError):
+        worker.submit({"op": "delete", "type": "Client", "client_id": 1})
+    assert worker.pending == 0
+    loaded = load_records(file_path, journal_path)
+    assert [client["Name"] for client in loaded["Client"]] == ["Ann", "Bob", "Cat"]
@@ -0,0 +1,67 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+import pytest
+from query_cache import QueryCache
+from records import RecordStore, client_itinerary, create_record, search_records, update_record
+
+
+@pytest.fixture
+def store():
+    return RecordStore({
+        "Client": [{"ID": 1, "Type": "Client", "Name": "John Doe"}],
+        "Airline": [{"ID": 1, "Type": "Airline", "Company Name": "British Airways"}],
+        "Flight": [{"Client_ID": 1, "Airline_ID": 1, "Type": "Flight", "Date": "2025-10-01T10:00:00",
+                    "Start City": "Berlin", "End City": "London"}],
+    })
+
+
+def test_lru_eviction_and_stats():
+    """The least recently used result goes first and every lookup is counted."""
+    cache = QueryCache(maxsize=2)
+    calls = []
+    compute = lambda key: lambda: calls.append(key) or key
+    for key in ("a", "b", "a", "c", "b"):
+        cache.cached(key, (0,), compute(key))
+    assert calls == ["a", "b", "c", "b"]
+    assert cache.stats() == {"hits": 1, "misses": 4, "stale": 0, "evictions": 2,
+                             "size": 2, "maxsize": 2, "hit_rate": 0.2}
+
+
+def test_new_version_recomputes():
+    """A result is only reused for the versions it was computed at."""
+    cache = QueryCache()
+    assert cache.cached("q", (1,), lambda: "old") == "old"
+    assert cache.cached("q", (2,), lambda: "new") == "new"
+    assert cache.cached("q", (2,), lambda: "newer") == "new"
+    assert cache.stale == 1 and len(cache) == 1
+
+
+def test_disabled_cache_stores_nothing():
+    """maxsize 0 computes every time."""
+    cache = QueryCache(maxsize=0)
+    assert cache.cached("q", (), lambda: 1) == 1
+    assert len(cache) == 0 and cache.misses == 1
+
+
+def test_store_invalidates_by_type(store):
+    """CRUD on a type a query reads invalidates it; other types do not."""
+    assert search_records(store, 1, "Client")[0]["Name"] == "John Doe"
+    assert search_records(store, 1, "Client")[0]["Name"] == "John Doe"
+    assert store.query_cache.hits == 1
+    create_record(store, {"Company Name": "Iberia"}, "Airline")
+    search_records(store, 1, "Client")
+    assert store.query_cache.hits == 2
+    assert [a["Company Name"] for _, a in client_itinerary(store, 1)] == ["British Airways"]
+    update_record(store, "Airline", {"Company Name": "BA"}, airline_id=1)
+    assert [a["Company Name"] for _, a in client_itinerary(store, 1)] == ["BA"]
+    create_record(store, {"Client_ID": 1, "Airline_ID": 2, "Date": "2025-12-01T10:00:00",
+                          "Start City": "London", "End City": "Madrid"}, "Flight")
+    assert len(search_records(store, 1, "Flight")) == 2
+    assert len(client_itinerary(store, 1)) == 2
+
+
+def test_results_are_copies(store):
+    """Changing a returned list does not change the cached one."""
+    search_records(store, 1, "Flight").clear()
+    assert len(search_records(store, 1, "Flight")) == 1
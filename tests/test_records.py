@@ -1,5 +1,6 @@
 import sys, os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
 import src.records as records
 import pytest
 import json
@@ -140,6 +141,14 @@ def test_update_record_valid_client(mock_records, capsys):    # Updating an exis
     assert updated["Name"] == "Johnathan Doe"
     assert updated["Phone Number"] == "9155559999"
 
+def test_update_record_keeps_id_and_type(mock_records):    # ID and Type in the data are ignored
+    store = records.RecordStore(mock_records)
+    result = records.update_record(store, "Client", {"ID": 30, "Type": "Airline", "Name": "Jon Doe"}, client_id="1")
+    assert result == 1
+    assert store["Client"][0] == {"ID": 1, "Type": "Client", "Name": "Jon Doe"}
+    assert store.get_record("Client", 1) is store["Client"][0]
+    assert store.get_record("Client", 30) is None
+
 def test_update_record_invalid_client_id(mock_records):     # Updating a client with an invalid ID
     updated_client = {"Name": "Invalid Person"}
     result = records.update_record(mock_records, "Client", updated_client, client_id="99")
@@ -199,3 +208,188 @@ def test_delete_record_invalid_type(mock_records):      # Deleting an invalid ty
     result = records.delete_record(mock_records,"Invalid Type")
     assert result == -2
 
+
+#Test for the indexed RecordStore
+def test_record_store_indexes(mock_records):   # Indexes are built from the lists
+    store = records.RecordStore(mock_records)
+    assert store.get_record("Client", 2)["Name"] == "Nic Moe"
+    assert store.get_record("Airline", 1)["Company Name"] == "British Airways"
+    assert [f["Start City"] for f in store.flights_for_client(1)] == ["Berlin"]
+    assert [f["Start City"] for f in store.flights_for_airline(2)] == ["Juarez"]
+
+def test_record_store_tracks_mutations(mock_records):   # CRUD keeps the indexes correct
+    store = records.RecordStore(mock_records)
+    records.create_record(store, {"Name": "Ada Lovelace"}, "Client")
+    assert records.search_records(store, "3", "Client")[0]["Name"] == "Ada Lovelace"
+
+    records.update_record(store, "Flight", {"Client_ID": 3}, client_id="1", airline_id="1")
+    assert records.search_records(store, "1", "Flight") == -1
+    assert records.search_records(store, "3", "Flight")[0]["Start City"] == "Berlin"
+
+    records.delete_record(store, "Client", client_id="3")
+    assert records.search_records(store, "3", "Client") == -1
+    assert all(c["ID"] != 3 for c in store["Client"])
+
+def test_record_store_shares_lists(mock_records):   # Plain dicts see changes made through a store
+    store = records.RecordStore(mock_records)
+    records.delete_record(store, "Airline", airline_id="2")
+    assert len(mock_records["Airline"]) == 1
+
+#Test for ID allocation
+def test_create_record_ids_not_reused(mock_records):   # Deleted IDs are never handed out again
+    store = records.RecordStore(mock_records)
+    records.create_record(store, {"Name": "Ada Lovelace"}, "Client")
+    records.delete_record(store, "Client", client_id="3")
+    records.create_record(store, {"Name": "Alan Turing"}, "Client")
+    assert store["Client"][-1]["ID"] == 4
+    assert store[records.SEQUENCE_KEY]["Client"] == 5
+
+def test_create_record_empty_list():   # The first record of a type gets ID 1
+    store = records.RecordStore({"Client": [], "Airline": [], "Flight": []})
+    records.create_record(store, {"Company Name": "Delta Airlines"}, "Airline")
+    assert store["Airline"][0]["ID"] == 1
+
+def test_sequence_seeded_from_saved_value(mock_records):   # A saved sequence is respected
+    mock_records[records.SEQUENCE_KEY] = {"Client": 10, "Airline": 1}
+    store = records.RecordStore(mock_records)
+    assert store.allocate_id("Client") == 10
+    assert store.allocate_id("Airline") == 3
+
+#Test for change sets
+def test_change_set_create_update_delete(mock_records):   # CRUD calls report what they changed
+    store = records.RecordStore(mock_records)
+    changes = records.ChangeSet()
+    records.create_record(store, {"Name": "Ada Lovelace"}, "Client", changes=changes)
+    records.update_record(store, "Client", {"Name": "Ada King"}, client_id="3", changes=changes)
+    records.delete_record(store, "Flight", client_id="1", airline_id="1", changes=changes)
+    assert [key for _, key, _ in changes.inserted] == ["Client:3"]
+    assert [(key, record["Name"]) for _, key, record in changes.updated] == [("Client:3", "Ada King")]
+    assert [record["Start City"] for _, _, record in changes.removed] == ["Berlin"]
+    assert [key for _, key, _ in changes.for_type("Client").removed] == []
+
+def test_change_set_empty_on_failure(mock_records):   # Failed calls change nothing
+    changes = records.ChangeSet()
+    records.update_record(mock_records, "Client", {"Name": "Nobody"}, client_id="99", changes=changes)
+    records.delete_record(mock_records, "Airline", airline_id="99", changes=changes)
+    assert not changes
+
+#Test for flight date and route queries
+@pytest.fixture
+def flight_store():
+    flights = [{"Client_ID": 1, "Airline_ID": 1, "Type": "Flight", "Date": f"2025-10-{day:02d}T09:00:00",
+                "Start City": start, "End City": end}
+               for day, start, end in [(20, "London", "Paris"), (13, "London", "Rome"), (15, "Paris", "London"),
+                                       (13, "London", "Paris"), (27, "London", "Paris"), (17, "Rome", "Paris")]]
+    return records.RecordStore({"Client": [{"ID": 1}], "Airline": [{"ID": 1}], "Flight": flights})
+
+def test_query_flights_by_date_range(flight_store):   # Range is start inclusive, end exclusive, in date order
+    week = records.query_flights(flight_store, "2025-10-13", "2025-10-20")
+    assert [(f["Date"][:10], f["End City"]) for f in week] == [
+        ("2025-10-13", "Rome"), ("2025-10-13", "Paris"), ("2025-10-15", "London"), ("2025-10-17", "Paris")]
+    assert records.count_flights(flight_store, "2025-10-13", "2025-10-20") == 4
+    assert records.count_flights(flight_store, end_date="2025-10-01") == 0
+    assert records.count_flights(flight_store) == 6
+
+def test_query_flights_by_route_with_paging(flight_store):   # Route and origin indexes, offset and limit
+    assert records.count_flights(flight_store, start_city="London", end_city="Paris") == 3
+    assert records.count_flights(flight_store, "2025-10-13", "2025-10-20", start_city="London") == 2
+    assert records.count_flights(flight_store, end_city="Paris") == 4
+    assert records.query_flights(flight_store, start_city="Berlin") == []
+    page = records.query_flights(flight_store, start_city="London", end_city="Paris", offset=1, limit=1)
+    assert [f["Date"][:10] for f in page] == ["2025-10-20"]
+
+def test_flight_indexes_follow_crud(flight_store):   # Create, update and delete keep the sorted indexes current
+    records.create_record(flight_store, {"Client_ID": 1, "Airline_ID": 1, "Date": "2025-10-14T08:00:00",
+                                         "Start City": "London", "End City": "Paris"}, "Flight")
+    assert records.count_flights(flight_store, "2025-10-14", "2025-10-15", "London", "Paris") == 1
+    records.update_record(flight_store, "Flight", {"Date": "2025-11-01T08:00:00", "End City": "Oslo"},
+                          client_id="1", airline_id="1")
+    # The first flight in the list (2025-10-20 London to Paris) was the one updated
+    assert records.count_flights(flight_store, start_city="London", end_city="Paris") == 3
+    assert [f["Date"][:10] for f in records.query_flights(flight_store, end_city="Oslo")] == ["2025-11-01"]
+    records.delete_record(flight_store, "Flight", client_id="1", airline_id="1")
+    assert records.count_flights(flight_store) == 0
+    assert flight_store.flights_by_route == {}
+
+#Test for flight parent checks
+def test_create_flight_casts_and_checks_ids(mock_records):   # GUI strings are cast, missing parents refused
+    store = records.RecordStore(mock_records)
+    flight = {"Client_ID": "2", "Airline_ID": "1", "Date": "2025-12-01T08:00:00", "Start City": "Paris", "End City": "Rome"}
+    assert records.create_record(store, flight, "Flight") == "Entry has been created successfully"
+    assert store["Flight"][-1]["Client_ID"] == 2 and store["Flight"][-1]["Airline_ID"] == 1
+    assert store.flights_for_client(2)[-1] is store["Flight"][-1]
+    assert records.create_record(store, dict(flight, Client_ID="9"), "Flight") == -1
+    assert records.create_record(store, dict(flight, Airline_ID="x"), "Flight") == -1
+    assert len(store["Flight"]) == 3
+
+def test_sorted_flights_merge_pending():   # Flights added in any order come out in date order
+    sorted_flights = records.SortedFlights()
+    for day in (5, 3, 9, 3, 1):
+        sorted_flights.add({"Date": f"2025-10-{day:02d}", "Day": day})
+    assert len(sorted_flights) == 5
+    assert [f["Day"] for f in sorted_flights.range()] == [1, 3, 3, 5, 9]
+    sorted_flights.add({"Date": "2025-10-04", "Day": 4})
+    assert [f["Day"] for f in sorted_flights.range("2025-10-03", "2025-10-06")] == [3, 3, 4, 5]
+
+#Test for bulk updates and deletes
+def test_bulk_delete_flights_by_predicate(flight_store):   # One call removes every matching flight
+    flight_store["Airline"].append({"ID": 2})
+    flight_store.reindex()
+    records.update_record(flight_store, "Flight", {"Airline_ID": 2}, client_id="1", airline_id="1")
+    changes = records.bulk_delete_records(flight_store, "Flight", where={"Airline_ID": 1}, end_date="2025-10-17")
+    assert len(changes.removed) == 3
+    assert [f["Date"][:10] for f in records.query_flights(flight_store)] == ["2025-10-17", "2025-10-20", "2025-10-27"]
+    assert records.bulk_delete_records(flight_store, "Flight") == -1
+    assert records.bulk_delete_records(flight_store, "Boat", ids=[1]) == -2
+
+def test_bulk_update_and_delete_by_ids(mock_records):   # IDs are cast, parents and policies checked
+    store = records.RecordStore(mock_records)
+    changes = records.bulk_update_records(store, "Client", {"City": "Leeds"}, ids=["1", 2, 99])
+    assert [c["City"] for c in store["Client"]] == ["Leeds", "Leeds"]
+    assert len(changes.updated) == 2
+    assert records.bulk_update_records(store, "Client", {"ID": 5}, ids=[1]) == -1
+    assert records.bulk_update_records(store, "Flight", {"Airline_ID": "7"}, ids=[1]) == -1
+    assert records.bulk_update_records(store, "Client", {"City": "York"}, ids=["x"]) == -1
+    assert records.bulk_delete_records(store, "Client", ids=[1, 2], on_delete="restrict") == -3
+    assert len(store["Client"]) == 2
+    changes = records.bulk_delete_records(store, "Client", where={"City": "Leeds"})
+    assert store["Client"] == [] and store["Flight"] == []
+    assert len(changes.for_type("Flight").removed) == 2
+
+def test_itinerary_and_manifest_follow_crud(mock_records):   # Join views use the indexes and stay current
+    store = records.RecordStore(mock_records)
+    records.create_record(store, {"Client_ID": "1", "Airline_ID": "2", "Date": "2025-09-01T08:00:00",
+                                  "Start City": "London", "End City": "Dallas"}, "Flight")
+    itinerary = records.client_itinerary(store, "1")
+    assert [(f["Date"][:10], a["Company Name"]) for f, a in itinerary] == [
+        ("2025-09-01", "American Airlines"), ("2025-10-01", "British Airways")]
+    assert [c["Name"] for f, c in records.airline_manifest(store, 2)] == ["John Doe", "Nic Moe"]
+    assert [c["ID"] for c in records.airline_passengers(store, 2)] == [2, 1]
+    records.update_record(store, "Flight", {"Airline_ID": 1}, client_id=2, airline_id=2)
+    assert [c["ID"] for c in records.airline_passengers(store, 2)] == [1]
+    assert [c["ID"] for c in records.airline_passengers(store, 1)] == [1, 2]
+    records.delete_record(store, "Client", client_id=1)
+    assert records.airline_passengers(store, 2) == [] and records.client_itinerary(store, 1) == -1
+    assert [c["ID"] for c in records.airline_passengers(store, 1)] == [2]
+    assert records.airline_manifest(store, 9) == -1
+
+def test_update_flight_picks_first_in_list(mock_records):   # Same flight as a replay of the saved list would pick
+    mock_records["Flight"][1]["Airline_ID"] = 1
+    store = records.RecordStore(mock_records)
+    records.update_record(store, "Flight", {"Client_ID": 1}, client_id="2", airline_id="1")
+    assert [f["Start City"] for f in store.flights_for_client(1)] == ["Berlin", "Juarez"]
+    records.update_record(store, "Flight", {"Client_ID": 2}, client_id="1", airline_id="1")
+    assert [f["Start City"] for f in store.flights_for_client(1)] == ["Juarez"]
+    records.update_record(store, "Flight", {"Client_ID": 1}, client_id="2", airline_id="1")
+    # The bucket now holds Juarez before Berlin, the Flight list the reverse
+    records.update_record(store, "Flight", {"End City": "Oslo"}, client_id="1", airline_id="1")
+    assert [(f["Start City"], f["End City"]) for f in store["Flight"]] == [("Berlin", "Oslo"), ("Juarez", "El Paso")]
+
+def test_plain_dict_edited_directly(mock_records):   # A plain dict is read afresh by every call
+    assert records.search_records(mock_records, "1", "Client")[0]["Name"] == "John Doe"
+    mock_records["Client"][0] = {"ID": 5, "Type": "Client", "Name": "Replaced"}
+    mock_records["Client"][1]["ID"] = 6
+    assert records.search_records(mock_records, "1", "Client") == -1
+    assert records.search_records(mock_records, "5", "Client")[0]["Name"] == "Replaced"
+    assert records.update_record(mock_records, "Client", {"Name": "Moved"}, client_id="2") == -1
+    assert records.update_record(mock_records, "Client", {"Name": "Moved"}, client_id="6") == 1
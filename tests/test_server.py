@@ -0,0 +1,113 @@
+import sys
+import os
+import json
+import shutil
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+import pytest
+from backends import JsonBackend, RemoteBackend
+from server import RecordServer
+from storage import load_records
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), '../data/test_records.json')
+
+
+@pytest.fixture
+def served(tmp_path):
+    """A RecordServer on a free port, run by an event loop on another thread."""
+    path = str(tmp_path / "records.json")
+    shutil.copy(DATA_PATH, path)
+    backend = JsonBackend(path, str(tmp_path / "journal.jsonl"))
+    server = RecordServer(backend, commit_delay=0.02)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    listener = asyncio.run_coroutine_threadsafe(server.start("127.0.0.1", 0), loop).result(10)
+    port = listener.sockets[0].getsockname()[1]
+    yield server, RemoteBackend(f"http://127.0.0.1:{port}"), backend
+    asyncio.run_coroutine_threadsafe(server.stop(), loop).result(10)
+    loop.call_soon_threadsafe(listener.close)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(10)
+    backend.close()
+
+
+def test_crud_and_errors(served):
+    """Records are created, read, updated and deleted over HTTP; bad requests get an error status."""
+    server, remote, backend = served
+    created = remote.request("POST", "/records/Client", {"Name": "Ada", "City": "Leeds"})["record"]
+    assert remote.request("GET", f"/records/Client/{created['ID']}")["records"][0]["City"] == "Leeds"
+    remote.request("PATCH", f"/records/Client/{created['ID']}", {"City": "York"})
+    assert server.records.get_record("Client", created["ID"])["City"] == "York"
+    assert remote.request("GET", "/records/Client/1/itinerary")["records"][0]["flight"]["Client_ID"] == 1
+    with pytest.raises(OSError, match="409"):
+        remote.request("DELETE", "/records/Airline/1?on_delete=restrict")
+    with pytest.raises(OSError, match="409"):
+        remote.request("POST", "/records/Client", {"ID": 1, "Name": "Twin"})
+    with pytest.raises(OSError, match="404"):
+        remote.request("PATCH", "/records/Client/999", {"City": "York"})
+    remote.request("DELETE", f"/records/Client/{created['ID']}")
+    assert server.records.get_record("Client", created["ID"]) is None
+    assert "Emma Thompson" in [c["Name"] for c in remote.request("GET", "/search?type=Client&q=emma")["records"]]
+
+
+def test_cursor_pages_survive_inserts(served):
+    """Following next_cursor lists every record once, even if records are added between pages."""
+    server, remote, backend = served
+    # Flights sharing a date, so pages end part way through a date
+    for client_id in range(2, 7):
+        remote.request("POST", "/records/Flight",
+                       {"Client_ID": client_id, "Airline_ID": 2, "Date": "2025-10-20T10:30:00"})
+    for record_type in ("Client", "Flight"):
+        seen = []
+        page = remote.request("GET", f"/records/{record_type}?limit=2")
+        remote.request("POST", "/records/Client", {"Name": "Late"})
+        while True:
+            seen.extend(json.dumps(record, sort_keys=True) for record in page["records"])
+            if page["next_cursor"] is None:
+                break
+            page = remote.request("GET", f"/records/{record_type}?limit=2&cursor={page['next_cursor']}")
+        assert len(seen) == len(set(seen))
+        assert len(seen) == len(server.records[record_type])
+
+
+def test_pages_list_clients_created_with_lower_ids(served):
+    """A client created with a free ID below the newest one is still listed, in ID order."""
+    server, remote, backend = served
+    for record_id in (1000, 500):
+        remote.request("POST", "/records/Client", {"ID": record_id, "Name": f"Client {record_id}"})
+    ids = []
+    page = remote.request("GET", "/records/Client?limit=3")
+    while True:
+        ids.extend(client["ID"] for client in page["records"])
+        if page["next_cursor"] is None:
+            break
+        page = remote.request("GET", f"/records/Client?limit=3&cursor={page['next_cursor']}")
+    assert ids == sorted(ids) and ids[-2:] == [500, 1000]
+    assert len(ids) == len(server.records["Client"])
+
+
+def test_concurrent_writes_are_group_committed(served):
+    """Writes sent at once are all saved, in fewer commits than writes, and survive a reload."""
+    server, remote, backend = served
+    before = len(server.records["Client"])
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda n: remote.request("POST", "/records/Client", {"Name": f"Agent {n}"}), range(40)))
+    assert server.committed == 40
+    assert server.commits < 40
+    records = load_records(backend.file_path, backend.journal_path)
+    assert len(records["Client"]) == before + 40
+    assert len({client["ID"] for client in records["Client"]}) == before + 40
+
+
+def test_remote_backend_round_trip(served):
+    """RemoteBackend loads the server's records and saves its edits through the journal endpoint."""
+    server, remote, backend = served
+    records = remote.load()
+    assert len(records["Flight"]) == len(server.records["Flight"])
+    entry = {"op": "update", "type": "Client", "data": {"City": "Hull"}, "client_id": 1, "airline_id": None}
+    assert remote.apply(records, entry)
+    assert server.records.get_record("Client", 1)["City"] == "Hull"
+    assert not remote.apply(records, {"op": "delete", "type": "Client", "client_id": 999, "airline_id": None})
@@ -2,16 +2,18 @@ import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
 import pytest
-from storage import load_records, save_records
+from storage import load_records, save_records, backup_paths, iter_records, append_journal, compact_journal, wait_for_compaction, COMPACTING_SUFFIX
 
 @pytest.fixture
 def temp_file():
     file_path = '../test_records.json'  
-    if os.path.exists(file_path):
-        os.remove(file_path)
+    for path in [file_path] + backup_paths(file_path):
+        if os.path.exists(path):
+            os.remove(path)
     yield file_path
-    if os.path.exists(file_path):
-        os.remove(file_path)
+    for path in [file_path] + backup_paths(file_path):
+        if os.path.exists(path):
+            os.remove(path)
 
 def test_load_nonexistent(temp_file):
     """Test loading from a non-existent file returns empty nested dict."""
@@ -87,3 +89,139 @@ def test_storage_crud_cycle(temp_file):
     after_delete = load_records(temp_file)
     assert after_delete == []
 
+
+def make_records():
+    return {
+        "Client": [{"ID": 1, "Type": "Client", "Name": "Journal Client"}],
+        "Airline": [{"ID": 1, "Type": "Airline", "Company Name": "Journal Air"}],
+        "Flight": []
+    }
+
+def test_journal_replay(tmp_path):
+    """Test that journaled edits are replayed on top of the snapshot."""
+    file_path = str(tmp_path / "records.json")
+    journal_path = str(tmp_path / "records.jsonl")
+    records = make_records()
+    save_records(records, file_path)
+
+    flight = {"Client_ID": 1, "Airline_ID": 1, "Date": "2025-10-01T10:00:00", "Start City": "Berlin", "End City": "London"}
+    append_journal(records, {"op": "create", "type": "Client", "record": {"ID": 2, "Type": "Client", "Name": "New Client"}}, journal_path)
+    append_journal(records, {"op": "create", "type": "Flight", "record": flight}, journal_path)
+    append_journal(records, {"op": "update", "type": "Client", "data": {"Name": "Renamed"}, "client_id": 1}, journal_path)
+    append_journal(records, {"op": "delete", "type": "Airline", "airline_id": 1, "on_delete": "nullify"}, journal_path)
+
+    loaded = load_records(file_path, journal_path)
+    assert [c["Name"] for c in loaded["Client"]] == ["Renamed", "New Client"]
+    assert loaded["Flight"] == [dict(flight, Airline_ID=None)]
+    assert loaded["Airline"] == []
+    assert loaded["Journal Seq"] == 4
+    assert loaded.allocate_id("Client") == 3
+
+def test_journal_replay_keeps_deleted_ids_used(tmp_path):
+    """Test that an ID created and deleted in the journal is not handed out again after a reload."""
+    file_path = str(tmp_path / "records.json")
+    journal_path = str(tmp_path / "records.jsonl")
+    save_records(make_records(), file_path)
+    records = load_records(file_path, journal_path)
+    append_journal(records, {"op": "create", "type": "Client", "record": {"ID": 2, "Type": "Client", "Name": "Gone"}}, journal_path)
+    append_journal(records, {"op": "delete", "type": "Client", "client_id": 2}, journal_path)
+    assert load_records(file_path, journal_path).allocate_id("Client") == 3
+    compact_journal(None, file_path, journal_path, threshold=0, background=False)
+    assert load_records(file_path)["Next ID"]["Client"] == 3
+
+def test_journal_torn_line(tmp_path):
+    """Test that a half written last journal line is ignored."""
+    file_path = str(tmp_path / "records.json")
+    journal_path = str(tmp_path / "records.jsonl")
+    records = make_records()
+    save_records(records, file_path)
+    append_journal(records, {"op": "delete", "type": "Client", "client_id": 1}, journal_path)
+    with open(journal_path, 'a') as f:
+        f.write('{"op": "delete", "type": "Airl')
+    loaded = load_records(file_path, journal_path)
+    assert loaded["Client"] == []
+    assert len(loaded["Airline"]) == 1
+
+def test_journal_compaction(tmp_path):
+    """Test that a large journal is folded into the snapshot in the background."""
+    file_path = str(tmp_path / "records.json")
+    journal_path = str(tmp_path / "records.jsonl")
+    records = load_records(file_path, journal_path)
+    for i in range(1, 4):
+        record = {"ID": i, "Type": "Airline", "Company Name": f"Air {i}"}
+        records.add_record("Airline", record)
+        append_journal(records, {"op": "create", "type": "Airline", "record": record}, journal_path)
+
+    assert compact_journal(records, file_path, journal_path, threshold=10) is not None
+    append_journal(records, {"op": "delete", "type": "Airline", "airline_id": 2}, journal_path)
+    wait_for_compaction()
+
+    assert not os.path.exists(journal_path + COMPACTING_SUFFIX)
+    assert len(load_records(file_path)["Airline"]) == 3
+    loaded = load_records(file_path, journal_path)
+    assert [a["ID"] for a in loaded["Airline"]] == [1, 3]
+
+def test_journal_compaction_from_stored_edits(tmp_path):
+    """Test that compacting without the records rebuilds the snapshot from the file and journal."""
+    file_path = str(tmp_path / "records.json")
+    journal_path = str(tmp_path / "records.jsonl")
+    records = make_records()
+    save_records(records, file_path)
+    records = load_records(file_path, journal_path)
+    append_journal(records, {"op": "delete", "type": "Client", "client_id": 1}, journal_path)
+
+    compact_journal(None, file_path, journal_path, threshold=0, background=False)
+
+    assert not os.path.exists(journal_path + COMPACTING_SUFFIX)
+    assert not os.path.exists(journal_path)
+    snapshot = load_records(file_path)
+    assert snapshot["Client"] == []
+    assert snapshot["Journal Seq"] == 1
+    assert load_records(file_path, journal_path)["Airline"] == records["Airline"]
+
+def test_save_keeps_backups(tmp_path):
+    """Test that each save keeps the previous snapshots as rotated backups."""
+    file_path = str(tmp_path / "records.json")
+    for i in range(1, 5):
+        save_records({"Client": [], "Airline": [{"ID": i}], "Flight": []}, file_path, backups=2)
+    assert load_records(file_path)["Airline"] == [{"ID": 4}]
+    assert [load_records(path)["Airline"] for path in backup_paths(file_path, 2)] == [[{"ID": 3}], [{"ID": 2}]]
+    assert not os.path.exists(file_path + ".3")
+    assert not os.path.exists(file_path + ".tmp")
+
+def test_load_falls_back_to_backup(tmp_path):
+    """Test that a truncated snapshot is replaced by the newest valid backup."""
+    file_path = str(tmp_path / "records.json")
+    save_records({"Client": [{"ID": 1}], "Airline": [], "Flight": []}, file_path)
+    save_records({"Client": [{"ID": 1}, {"ID": 2}], "Airline": [], "Flight": []}, file_path)
+    with open(file_path, 'w') as f:
+        f.write('{"Client": [{"ID"')
+    assert load_records(file_path)["Client"] == [{"ID": 1}]
+
+def test_streaming_load_matches_json_load():
+    """Test that the streaming loader gives the same records as json.load."""
+    file_path = os.path.join(os.path.dirname(__file__), '../data/test_records.json')
+    assert load_records(file_path, streaming=True) == load_records(file_path)
+
+def test_iter_records_batches(tmp_path):
+    """Test that records are yielded in batches even with tiny read chunks."""
+    file_path = str(tmp_path / "records.json")
+    records = {
+        "Client": [{"ID": i, "Type": "Client", "Name": f"Client {i}"} for i in range(1, 6)],
+        "Airline": [],
+        "Flight": [{"Client_ID": 1, "Airline_ID": 2, "Date": "2025-10-01T10:00:00"}],
+        "Next ID": {"Client": 6, "Airline": 1}
+    }
+    save_records(records, file_path)
+    batches = list(iter_records(file_path, batch_size=2, chunk_size=3))
+    assert [(key, len(batch) if isinstance(batch, list) else batch) for key, batch in batches] == [
+        ("Client", 2), ("Client", 2), ("Client", 1), ("Airline", 0), ("Flight", 1),
+        ("Next ID", {"Client": 6, "Airline": 1})]
+    assert load_records(file_path, streaming=True) == records
+
+def test_streaming_load_corrupted(tmp_path):
+    """Test that a truncated file is reported rather than half loaded."""
+    file_path = str(tmp_path / "records.json")
+    with open(file_path, 'w') as f:
+        f.write('{"Client": [{"ID": 1}, {"ID": 2')
+    assert load_records(file_path, streaming=True) == {"Client": [], "Airline": [], "Flight": []}
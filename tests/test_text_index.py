@@ -0,0 +1,84 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+import pytest
+from records import RecordStore, create_record, delete_record, search_text, update_record
+from text_index import TextIndex, field_tokens, query_terms
+
+
+@pytest.fixture
+def store():
+    store = RecordStore({
+        "Client": [
+            {"ID": 1, "Type": "Client", "Name": "Emma Thompson", "City": "London",
+             "Zip Code": "SW1A 1AA", "Phone Number": "+44 20 1234 5678"},
+            {"ID": 2, "Type": "Client", "Name": "James Patel", "City": "Manchester",
+             "Zip Code": "M1 1FN", "Phone Number": "+44 161 234 5678"},
+            {"ID": 3, "Type": "Client", "Name": "Emily Thomas", "City": "Londonderry",
+             "Zip Code": "BT48 6AA", "Phone Number": "028 7136 5151"},
+        ],
+        "Airline": [
+            {"ID": 1, "Type": "Airline", "Company Name": "British Airways"},
+            {"ID": 2, "Type": "Airline", "Company Name": "Air France"},
+        ],
+        "Flight": [],
+    })
+    store.build_text_index()
+    return store
+
+def names(results):
+    return [record.get("Name") or record.get("Company Name") for record in results]
+
+def test_tokens_and_terms():
+    """Test that phone numbers are reduced to digits and words are lower cased."""
+    assert field_tokens("Phone Number", "+44 (20) 1234-5678") == ["442012345678"]
+    assert field_tokens("Name", "Mary-Jane O'Neil") == ["mary", "jane", "o", "neil"]
+    assert query_terms("  Emma  LON ") == ["emma", "lon"]
+    assert query_terms("+44 20 12") == ["442012"]
+
+def test_prefix_search(store):
+    """Test that every query word must start a word of the record."""
+    assert names(search_text(store, "em", "Client")) == ["Emily Thomas", "Emma Thompson"]
+    # Ordered by the longest query word, "london" before "londonderry"
+    assert names(search_text(store, "em lon", "Client")) == ["Emma Thompson", "Emily Thomas"]
+    assert names(search_text(store, "emma londonderry", "Client")) == []
+    assert names(search_text(store, "SW1A", "Client")) == ["Emma Thompson"]
+    assert names(search_text(store, "air", "Airline")) == ["Air France", "British Airways"]
+
+def test_substring_and_phone_search(store):
+    """Test that names match on any part of a word and phones on their digits."""
+    assert names(search_text(store, "omps", "Client")) == ["Emma Thompson"]
+    assert names(search_text(store, "+44 161", "Client")) == ["James Patel"]
+    assert names(search_text(store, "4420", "Client")) == ["Emma Thompson"]
+    assert names(search_text(store, "ways", "Airline")) == ["British Airways"]
+    # Parts of a phone number other than the start do not match
+    assert search_text(store, "5678", "Client") == []
+
+def test_limit_and_invalid_type(store):
+    """Test that results stop at the limit and unknown types are rejected."""
+    assert len(search_text(store, "e", "Client", limit=1)) == 1
+    assert search_text(store, "emma", "Flight") == -2
+    assert search_text(store, "", "Client") == []
+
+def test_index_follows_crud(store):
+    """Test that create, update and delete keep the index current."""
+    create_record(store, {"Name": "Zed Zulu", "City": "Zurich", "Phone Number": "0041 44 555"}, "Client")
+    new_id = store["Client"][-1]["ID"]
+    assert names(search_text(store, "zul", "Client")) == ["Zed Zulu"]
+    update_record(store, "Client", {"Name": "Yan Yolo"}, client_id=new_id)
+    assert search_text(store, "zul", "Client") == []
+    assert names(search_text(store, "yolo zur", "Client")) == ["Yan Yolo"]
+    delete_record(store, "Client", client_id=new_id)
+    assert search_text(store, "yolo", "Client") == []
+    assert "yolo" not in store.text_index.tokens["Client"]
+    assert not any("yol" in trigram for trigram in store.text_index.trigrams["Client"])
+
+def test_rebuild_matches_incremental(store):
+    """Test that building the index at once gives the same postings as adding records one by one."""
+    incremental = TextIndex()
+    for record_type in ("Client", "Airline"):
+        for record in store[record_type]:
+            incremental.add(record_type, record)
+    assert incremental.postings == store.text_index.postings
+    assert incremental.tokens == store.text_index.tokens
+    assert incremental.trigrams == store.text_index.trigrams